@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the ETL hot paths, on a synthetic corpus (see synth_wiktextract.py).
+
+Cases: read_jsonl, extract_rows, write_csv, filter_mul (_filter_mul_lines), merge (_merge_csvs),
+short_prefix_policy (_apply_short_prefix_policy) and polish (cmd_polish). Each case's inputs are
+prepared outside the timed region; the best of `--repeat` runs is reported as items/s, and one
+more run under tracemalloc gives the peak Python heap.
+
+cmd_polish runs against a scratch ETL directory under the bench's temp dir, so real runs and
+app assets are never touched.
+
+Usage:
+  python3 etl/bench.py --lines 200000 --json bench.json
+  python3 etl/bench.py --lines 200000 --baseline bench.json   # exit 1 on time or memory regressions
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    from etl import cli
+    from etl import synth_wiktextract as synth
+    from etl import wiktextract_to_neologotron as w2n
+except ImportError:  # run as a script from etl/
+    import cli
+    import synth_wiktextract as synth
+    import wiktextract_to_neologotron as w2n
+
+# metric -> smallest absolute increase reported by --baseline (peak_mem_kb is the tracemalloc peak)
+BENCH_FLOORS = {"wall_s": 0.5, "cpu_s": 0.5, "peak_mem_kb": 1024}
+
+
+class Case:
+    """A timed callable returning the number of items it processed; `prepare` runs untimed before each call."""
+
+    def __init__(self, name: str, run: Callable[[], int], unit: str = "lines",
+                 prepare: Optional[Callable[[], None]] = None) -> None:
+        self.name = name
+        self.run = run
+        self.unit = unit
+        self.prepare = prepare
+
+
+class Corpus:
+    """Synthetic inputs shared by the cases, built lazily under `work_dir`."""
+
+    def __init__(self, work_dir: Path, lines: int, seed: int, source: Optional[Path] = None) -> None:
+        self.work_dir = work_dir
+        self.lines = lines
+        self.seed = seed
+        self._source = source
+        self._entries: Optional[List[dict]] = None
+
+    @property
+    def path(self) -> Path:
+        if self._source is None:
+            self._source = self.work_dir / "synth.jsonl.gz"
+            synth.write_corpus(self._source, self.lines, self.seed)
+        return self._source
+
+    @property
+    def entries(self) -> List[dict]:
+        if self._entries is None:
+            self._entries = list(w2n.read_jsonl(str(self.path)))
+        return self._entries
+
+    def rows(self, translingual: bool):
+        return w2n.extract_rows(self.entries, {"fr"}, translingual)
+
+    def csv_dir(self, name: str, translingual: bool) -> Path:
+        out = self.work_dir / name
+        if not out.exists():
+            out.mkdir(parents=True)
+            prefixes, roots, suffixes = self.rows(translingual)
+            w2n.write_csv(str(out / "neologotron_prefixes.csv"), w2n.PREFIX_HEADERS, prefixes)
+            w2n.write_csv(str(out / "neologotron_suffixes.csv"), w2n.SUFFIX_HEADERS, suffixes)
+            w2n.write_csv(str(out / "neologotron_racines.csv"), w2n.ROOT_HEADERS, roots)
+        return out
+
+
+def _csv_rows(csv_dir: Path) -> int:
+    total = 0
+    for name in cli.CSV_FILES:
+        with open(csv_dir / name, "r", encoding="utf-8", newline="") as f:
+            total += sum(1 for _ in csv.DictReader(f))
+    return total
+
+
+def build_cases(corpus: Corpus) -> Dict[str, Callable[[], Case]]:
+    """Case factories by name, in report order; a factory does the case's one-off setup."""
+    work = corpus.work_dir
+
+    def read_jsonl() -> Case:
+        path = str(corpus.path)
+        return Case("read_jsonl", lambda: sum(1 for _ in w2n.read_jsonl(path)))
+
+    def extract_rows() -> Case:
+        entries = corpus.entries
+
+        def run() -> int:
+            w2n.extract_rows(entries, {"fr"}, True)
+            return len(entries)
+        return Case("extract_rows", run, "entries")
+
+    def write_csv() -> Case:
+        prefixes, roots, suffixes = corpus.rows(True)
+        out = work / "write_csv"
+        out.mkdir(exist_ok=True)
+
+        def run() -> int:
+            w2n.write_csv(str(out / "p.csv"), w2n.PREFIX_HEADERS, prefixes)
+            w2n.write_csv(str(out / "s.csv"), w2n.SUFFIX_HEADERS, suffixes)
+            w2n.write_csv(str(out / "r.csv"), w2n.ROOT_HEADERS, roots)
+            return len(prefixes) + len(roots) + len(suffixes)
+        return Case("write_csv", run, "rows")
+
+    def filter_mul() -> Case:
+        src, dst = corpus.path, work / "mul.jsonl.gz"
+        return Case("filter_mul", lambda: cli._filter_mul_lines(src, dst)[0])
+
+    def merge() -> Case:
+        fr, mul = corpus.csv_dir("csv_fr", False), corpus.csv_dir("csv_mul", True)
+        n = _csv_rows(fr) + _csv_rows(mul)
+        out = work / "merged"
+
+        def run() -> int:
+            cli._merge_csvs(fr, mul, out)
+            return n
+        return Case("merge", run, "rows")
+
+    def short_prefix_policy() -> Case:
+        src = corpus.csv_dir("csv_mul", True)
+        dst = work / "policy"
+        policy = json.loads(cli.SHORT_PREFIX_POLICY_PATH.read_text("utf-8"))
+        n = _csv_rows(src)
+
+        def prepare() -> None:
+            shutil.rmtree(dst, ignore_errors=True)
+            shutil.copytree(src, dst)
+
+        def run() -> int:
+            cli._apply_short_prefix_policy(dst, policy)
+            return n
+        return Case("short_prefix_policy", run, "rows", prepare)
+
+    def polish() -> Case:
+        run_dir = work / "etl" / "runs" / "bench"
+        if not (run_dir / "merged").exists():
+            cli._merge_csvs(corpus.csv_dir("csv_fr", False), corpus.csv_dir("csv_mul", True), run_dir / "merged")
+        n = _csv_rows(run_dir / "merged")
+        cli._open_run_store(run_dir).close()  # build the store once, outside the timed region
+        gloss_map = cli.ETL_DIR / "gloss_map_fr.sample.json"
+        args = argparse.Namespace(run="bench", max_chars=80, map=str(gloss_map), out_dir=None)
+
+        def run() -> int:
+            cli.cmd_polish(args)
+            return n
+        return Case("polish", run, "rows")
+
+    return {"read_jsonl": read_jsonl, "extract_rows": extract_rows, "write_csv": write_csv,
+            "filter_mul": filter_mul, "merge": merge, "short_prefix_policy": short_prefix_policy,
+            "polish": polish}
+
+
+def measure(case: Case, repeat: int = 3, memory: bool = True) -> Dict[str, object]:
+    """Best-of-`repeat` wall/CPU time and throughput; peak traced heap from one extra run."""
+    best_wall = best_cpu = float("inf")
+    items = 0
+    sink = io.StringIO()
+    for _ in range(max(1, repeat)):
+        if case.prepare:
+            case.prepare()
+        with contextlib.redirect_stdout(sink):
+            t0, c0 = time.perf_counter(), time.process_time()
+            items = case.run()
+            wall, cpu = time.perf_counter() - t0, time.process_time() - c0
+        best_wall, best_cpu = min(best_wall, wall), min(best_cpu, cpu)
+        sink.seek(0)
+        sink.truncate()
+    result: Dict[str, object] = {
+        "items": items,
+        "unit": case.unit,
+        "wall_s": round(best_wall, 4),
+        "cpu_s": round(best_cpu, 4),
+        "items_per_s": round(items / best_wall, 1) if best_wall > 0 else None,
+    }
+    if memory:
+        if case.prepare:
+            case.prepare()
+        tracemalloc.start()
+        try:
+            with contextlib.redirect_stdout(sink):
+                case.run()
+            result["peak_mem_kb"] = tracemalloc.get_traced_memory()[1] // 1024
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def run_bench(work_dir: Path, lines: int, seed: int = 0, cases: Optional[List[str]] = None,
+              repeat: int = 3, memory: bool = True, corpus_path: Optional[Path] = None) -> Dict[str, object]:
+    """Run the selected cases (default all) and return {"corpus": ..., "cases": {name: result}}."""
+    corpus = Corpus(work_dir, lines, seed, corpus_path)
+    factories = build_cases(corpus)
+    unknown = [c for c in cases or [] if c not in factories]
+    if unknown:
+        raise ValueError(f"unknown case(s): {', '.join(unknown)}; known: {', '.join(factories)}")
+    saved = cli.ETL_DIR, cli.APP_SEED_DIR
+    cli.ETL_DIR, cli.APP_SEED_DIR = work_dir / "etl", work_dir / "assets"
+    (work_dir / "etl").mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(saved[0] / "gloss_map_fr.sample.json", work_dir / "etl" / "gloss_map_fr.sample.json")
+    results: Dict[str, Dict[str, object]] = {}
+    try:
+        for name in cases or list(factories):
+            with contextlib.redirect_stdout(io.StringIO()):  # setup prints progress (merge, store build)
+                case = factories[name]()
+            results[name] = measure(case, repeat, memory)
+    finally:
+        cli.ETL_DIR, cli.APP_SEED_DIR = saved
+    path = corpus.path
+    return {"corpus": {"path": str(path), "lines": corpus.lines if corpus_path is None else None,
+                       "bytes": path.stat().st_size, "seed": seed},
+            "cases": results}
+
+
+def print_report(report: Dict[str, object]) -> None:
+    c = report["corpus"]
+    label = f"synthetic, {c['lines']:,} lines, seed {c['seed']}" if c["lines"] is not None else c["path"]
+    print(f"Corpus: {label} ({c['bytes']:,} bytes)")
+    print(f"{'case':<20} {'items':>9} {'wall':>9} {'cpu':>9} {'items/s':>12} {'peak mem':>10}")
+    for name, r in report["cases"].items():
+        peak = r.get("peak_mem_kb")
+        print(f"{name:<20} {r['items']:>9,} {r['wall_s']:>8.3f}s {r['cpu_s']:>8.3f}s "
+              f"{r['items_per_s'] or 0:>12,.0f} {cli._fmt_bytes(peak * 1024) if peak is not None else 'n/a':>10}"
+              f"  {r['unit']}")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmark ETL hot paths on a synthetic wiktextract corpus")
+    ap.add_argument("--lines", type=int, default=100_000, help="synthetic corpus size (default 100000)")
+    ap.add_argument("--seed", type=int, default=0, help="corpus seed (default 0)")
+    ap.add_argument("--corpus", help="use this JSONL(.gz) instead of generating one")
+    ap.add_argument("--cases", help="comma-separated subset of cases (default: all)")
+    ap.add_argument("--repeat", type=int, default=3, help="timed runs per case; the best is kept (default 3)")
+    ap.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    ap.add_argument("--json", help="also write the results to this JSON file")
+    ap.add_argument("--baseline", help="earlier --json results; exit status 1 when a case regressed")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="relative slowdown counted as a regression (default 0.2)")
+    ap.add_argument("--keep", action="store_true", help="keep the work directory (corpus, CSVs) and print its path")
+    args = ap.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="neologotron-bench-"))
+    try:
+        cases = [c.strip() for c in args.cases.split(",") if c.strip()] if args.cases else None
+        try:
+            report = run_bench(work_dir, args.lines, args.seed, cases, args.repeat, not args.no_memory,
+                               Path(args.corpus) if args.corpus else None)
+        except ValueError as ex:
+            print(f"[ERROR] {ex}", file=sys.stderr)
+            return 2
+    finally:
+        if args.keep:
+            print(f"Work directory: {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    if args.baseline:
+        base = json.loads(Path(args.baseline).read_text("utf-8"))["cases"]
+        regressions = cli._metric_regressions(report["cases"], base, args.tolerance, BENCH_FLOORS)
+        for line in regressions:
+            print(f"[REGRESSION] {line}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
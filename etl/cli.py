@@ -8,7 +8,8 @@ Neologotron CSVs, merge, and export to the Android app assets.
 User interaction is minimal by design: confirm or override default URLs upfront,
 then the tool runs end-to-end.
 
-Dependencies: Python 3.10+. No external Unix tools required.
+Dependencies: Python 3.10+. No external Unix tools required. NumPy is optional
+and only speeds up the gloss classifier (langid.py) when installed.
 """
 from __future__ import annotations
 
@@ -26,13 +27,39 @@ from datetime import datetime
 from pathlib import Path
 from typing import Callable, Dict, Iterable, List, Tuple
 import hashlib
+import heapq
+import random
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from http.client import HTTPException
+from urllib.error import HTTPError, URLError
 from urllib.request import urlopen, Request
 from subprocess import run, CalledProcessError, Popen, PIPE
 
+try:
+    from etl import tracing
+    from etl.langid import LangId, gloss_texts
+    from etl.profiling import StageProfiler
+    from etl.wiktextract_to_neologotron import (
+        PRODUCTIVITY_COUNTS_NAME, AhoCorasick, load_productivity_counts, peak_rss_kb, productivity_weight, read_jsonl,
+    )
+except ImportError:  # run as a script from etl/
+    import tracing
+    from langid import LangId, gloss_texts
+    from profiling import StageProfiler
+    from wiktextract_to_neologotron import (
+        PRODUCTIVITY_COUNTS_NAME, AhoCorasick, load_productivity_counts, peak_rss_kb, productivity_weight, read_jsonl,
+    )
+
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
 ETL_DIR = REPO_ROOT / "etl"
 APP_SEED_DIR = REPO_ROOT / "app" / "src" / "main" / "assets" / "seed"
+TRANSFORM_SCRIPT = ETL_DIR / "wiktextract_to_neologotron.py"
+AI_CACHE_PATH = ETL_DIR / "cache" / "ai_cache.sqlite"
 
 DEFAULT_URL_FR = "https://kaikki.org/dictionary/downloads/fr/fr-extract.jsonl.gz"
 DEFAULT_URL_ALL_RAW = "https://kaikki.org/dictionary/raw-wiktextract-data.jsonl.gz"
@@ -48,6 +75,14 @@ def _ensure_dir(p: Path) -> None:
     p.mkdir(parents=True, exist_ok=True)
 
 
+_STAGE_LOCAL = threading.local()
+
+
+def _live_progress() -> bool:
+    """False inside wizard stages that run concurrently: their `\r` progress lines would overwrite each other."""
+    return not getattr(_STAGE_LOCAL, "quiet", False)
+
+
 def _fmt_bytes(n: float) -> str:
     units = ["B", "KB", "MB", "GB", "TB"]
     i = 0
@@ -72,13 +107,14 @@ def _download(url: str, dest: Path) -> None:
     _ensure_dir(dest.parent)
     req = Request(url, headers={"User-Agent": "neologotron-etl/1.0"})
     start = time.time()
-    with urlopen(req) as r, open(dest, "wb") as f:
+    with tracing.span("download", "io", url=url) as span, urlopen(req) as r, open(dest, "wb") as f:
         total_len = r.headers.get("Content-Length")
         total_len = int(total_len) if total_len and total_len.isdigit() else None
         downloaded = 0
         chunk = 1024 * 512  # 512KB chunks
         last_draw = 0.0
         line_len = 0
+        live = _live_progress()
         while True:
             buf = r.read(chunk)
             if not buf:
@@ -87,6 +123,10 @@ def _download(url: str, dest: Path) -> None:
             downloaded += len(buf)
             now = time.time()
             if now - last_draw >= 0.25:  # redraw 4x/sec
+                last_draw = now
+                tracing.counter(f"download {dest.name}", bytes=downloaded)
+                if not live:
+                    continue
                 elapsed = now - start
                 speed = downloaded / elapsed if elapsed > 0 else 0.0
                 if total_len:
@@ -100,7 +140,7 @@ def _download(url: str, dest: Path) -> None:
                 sys.stdout.write("\r" + msg + (" " * pad))
                 sys.stdout.flush()
                 line_len = len(msg)
-                last_draw = now
+        span["bytes"] = downloaded
         # Final line
         elapsed = max(0.001, time.time() - start)
         speed = downloaded / elapsed
@@ -109,7 +149,7 @@ def _download(url: str, dest: Path) -> None:
         else:
             msg = f"  {_fmt_bytes(downloaded)}  at {_fmt_bytes(speed)}/s"
         pad = max(0, line_len - len(msg))
-        sys.stdout.write("\r" + msg + (" " * pad) + "\n")
+        sys.stdout.write(("\r" + msg + (" " * pad) if live else f"  {dest.name}:{msg}") + "\n")
         sys.stdout.flush()
 
 
@@ -124,7 +164,9 @@ def _filter_mul_lines(input_gz: Path, output_gz: Path) -> Tuple[int, int]:
     start = time.time()
     last_draw = 0.0
     line_len = 0
-    with gzip.open(input_gz, "rt", encoding="utf-8") as inp, gzip.open(output_gz, "wt", encoding="utf-8") as outp:
+    live = _live_progress()
+    with tracing.span("filter_mul_lines", "io") as span, \
+            gzip.open(input_gz, "rt", encoding="utf-8") as inp, gzip.open(output_gz, "wt", encoding="utf-8") as outp:
         while True:
             line = inp.readline()
             if not line:
@@ -140,6 +182,10 @@ def _filter_mul_lines(input_gz: Path, output_gz: Path) -> Tuple[int, int]:
                     outp.write(json.dumps(obj, ensure_ascii=False) + "\n")
             now = time.time()
             if now - last_draw >= 0.5:  # redraw 2x/sec
+                last_draw = now
+                tracing.counter("filter_mul lines", read=read, kept=kept)
+                if not live:
+                    continue
                 elapsed = now - start
                 speed = read / elapsed if elapsed > 0 else 0.0
                 # Try to estimate percent by compressed bytes consumed if available via file position; gzip doesn't expose reliably, so show counts.
@@ -148,19 +194,23 @@ def _filter_mul_lines(input_gz: Path, output_gz: Path) -> Tuple[int, int]:
                 sys.stdout.write("\r" + msg + (" " * pad))
                 sys.stdout.flush()
                 line_len = len(msg)
-                last_draw = now
-    sys.stdout.write("\n")
-    sys.stdout.flush()
+        span.update(read=read, kept=kept)
+    if live:
+        sys.stdout.write("\n")
+        sys.stdout.flush()
     print(f"  Kept {kept:,} / {read:,} lines")
     return read, kept
 
 
 def _run_transform(input_path: Path, out_dir: Path, *, lang: str, include_translingual: bool,
                    roots_from_translingual: bool = False, mul_fallback_classical: bool = False,
-                   origin_filter: str = "classical") -> None:
-    """Invoke wiktextract_to_neologotron.py with a spinner until completion."""
-    script = ETL_DIR / "wiktextract_to_neologotron.py"
-    cmd = [sys.executable, str(script),
+                   origin_filter: str = "classical", productivity_weights: bool = False,
+                   lemmas: Path | None = None, stats_out: Path | None = None,
+                   profile_dir: Path | None = None) -> Dict[str, object] | None:
+    """Invoke wiktextract_to_neologotron.py with a spinner until completion.
+    With `stats_out`, returns the metrics the script wrote there.
+    """
+    cmd = [sys.executable, str(TRANSFORM_SCRIPT),
            "--input", str(input_path),
            "--out-dir", str(out_dir),
            "--lang", lang,
@@ -171,35 +221,51 @@ def _run_transform(input_path: Path, out_dir: Path, *, lang: str, include_transl
         cmd.append("--roots-from-translingual")
     if mul_fallback_classical:
         cmd.append("--mul-fallback-classical")
+    if productivity_weights:
+        cmd.append("--productivity-weights")
+        if lemmas:
+            cmd.extend(["--lemmas", str(lemmas)])
+    if stats_out:
+        cmd.extend(["--stats-out", str(stats_out)])
+    if profile_dir:
+        cmd.extend(["--profile", str(profile_dir)])
+    trace_out = tracing.child_path(out_dir.name)
+    if trace_out:
+        cmd.extend(["--trace", str(trace_out)])
 
     # Show spinner while the subprocess runs; capture output to print after
     label = f"Transform {input_path.name} → {out_dir.name}"
     print("Running:", " ".join(cmd))
-    p = Popen(cmd, stdout=PIPE, stderr=PIPE, text=True)
-    frames = ["⠋","⠙","⠹","⠸","⠼","⠴","⠦","⠧","⠇","⠏"]
-    i = 0
-    start = time.time()
-    line_len = 0
-    try:
-        while True:
-            ret = p.poll()
-            now = time.time()
-            elapsed = now - start
-            spinner = frames[i % len(frames)]
-            msg = f"  {spinner} {label}  elapsed {_fmt_eta(elapsed)}"
-            pad = max(0, line_len - len(msg))
-            sys.stdout.write("\r" + msg + (" " * pad))
+    with tracing.span("transform", "subprocess", input=input_path.name, out=out_dir.name) as span:
+        p = Popen(cmd, stdout=PIPE, stderr=PIPE, text=True)
+        span["child_pid"] = p.pid
+        frames = ["⠋","⠙","⠹","⠸","⠼","⠴","⠦","⠧","⠇","⠏"]
+        i = 0
+        start = time.time()
+        line_len = 0
+        live = _live_progress()
+        try:
+            while True:
+                ret = p.poll()
+                now = time.time()
+                elapsed = now - start
+                spinner = frames[i % len(frames)]
+                msg = f"  {spinner} {label}  elapsed {_fmt_eta(elapsed)}"
+                pad = max(0, line_len - len(msg))
+                if live:
+                    sys.stdout.write("\r" + msg + (" " * pad))
+                    sys.stdout.flush()
+                    line_len = len(msg)
+                if ret is not None:
+                    break
+                time.sleep(0.1)
+                i += 1
+            out, err = p.communicate()
+        finally:
+            # Clear spinner line
+            sys.stdout.write("\r" + (" " * line_len) + "\r")
             sys.stdout.flush()
-            line_len = len(msg)
-            if ret is not None:
-                break
-            time.sleep(0.1)
-            i += 1
-        out, err = p.communicate()
-    finally:
-        # Clear spinner line
-        sys.stdout.write("\r" + (" " * line_len) + "\r")
-        sys.stdout.flush()
+    tracing.merge(trace_out)
 
     # Print subprocess output succinctly
     if out:
@@ -208,6 +274,9 @@ def _run_transform(input_path: Path, out_dir: Path, *, lang: str, include_transl
         sys.stderr.write(err)
     if p.returncode != 0:
         raise CalledProcessError(p.returncode, cmd)
+    if stats_out and stats_out.exists():
+        return json.loads(stats_out.read_text("utf-8"))
+    return None
 
 
 CSV_FILES = [
@@ -218,11 +287,43 @@ CSV_FILES = [
 
 SHORT_PREFIX_POLICY_PATH = ETL_DIR / "short_prefix_policy.json"
 
+GENERATOR_INDEX_NAME = "neologotron_generator_index.json"
+SEED_DELTA_NAME = "neologotron_seed_delta.json"
+SEED_MANIFEST_NAME = "neologotron_seed_manifest.json"
+RUN_STORE_NAME = "run.sqlite"
+THEMES_DIR_NAME = "themes"
+THEMES_INDEX_NAME = "themes_index.json"
+UNTAGGED_THEME = "_untagged"
+
+# (section in the index, CSV file, tag-like column). Roots use `domain` like GeneratorService does.
+GENERATOR_INDEX_SOURCES = [
+    ("prefixes", "neologotron_prefixes.csv", "tags"),
+    ("roots", "neologotron_racines.csv", "domain"),
+    ("suffixes", "neologotron_suffixes.csv", "tags"),
+]
+
 
-def _merge_csvs(fr_dir: Path, mul_dir: Path, out_dir: Path) -> Dict[str, int]:
-    """Merge FR-first with MUL supplemental by 'form'. Keep FR on conflicts."""
+def _merge_csvs(fr_dir: Path, mul_dir: Path, out_dir: Path, drops: Dict[str, int] | None = None) -> Dict[str, int]:
+    """Merge FR-first with MUL supplemental by 'form'. Keep FR on conflicts.
+    Rows left out are counted in `drops` (if given) as duplicate_form / empty_form.
+
+    Each transform scales productivity weights against its own most productive form, so when
+    they left their raw counts (productivity_counts.json), both sides are re-weighted against
+    the top count of the two before merging.
+    """
     _ensure_dir(out_dir)
     counts: Dict[str, int] = {}
+    prod = [load_productivity_counts(str(d)) or {} for d in (fr_dir, mul_dir)]
+    prod_top = max((c for side in prod for by_id in side.values() for c in by_id.values()), default=0)
+
+    def _reweight(rows: List[Dict[str, str]], by_id: Dict[str, int] | None) -> None:
+        if prod_top <= 0 or not by_id:
+            return
+        for rec in rows:
+            c = by_id.get(rec.get("id", ""))
+            if c is not None and "weight" in rec:
+                rec["weight"] = str(productivity_weight(c, prod_top))
+
     for name in CSV_FILES:
         src_fr = fr_dir / name
         src_mul = mul_dir / name
@@ -244,10 +345,14 @@ def _merge_csvs(fr_dir: Path, mul_dir: Path, out_dir: Path) -> Dict[str, int]:
 
         fr_rows = _load(src_fr)
         mul_rows = _load(src_mul)
+        _reweight(fr_rows, prod[0].get(name))
+        _reweight(mul_rows, prod[1].get(name))
 
         # First FR rows
         for rec in fr_rows:
-            forms_seen[rec.get("form", "")] = rec
+            f = rec.get("form", "")
+            if f:
+                forms_seen[f] = rec
         # Then MUL rows only if new form
         for rec in mul_rows:
             f = rec.get("form", "")
@@ -255,6 +360,10 @@ def _merge_csvs(fr_dir: Path, mul_dir: Path, out_dir: Path) -> Dict[str, int]:
                 forms_seen[f] = rec
 
         rows = list(forms_seen.values())
+        if drops is not None:
+            empty = sum(1 for rec in (*fr_rows, *mul_rows) if not rec.get("form", ""))
+            drops["empty_form"] = drops.get("empty_form", 0) + empty
+            drops["duplicate_form"] = drops.get("duplicate_form", 0) + len(fr_rows) + len(mul_rows) - empty - len(rows)
         with open(dst, "w", encoding="utf-8", newline="") as f:
             w = csv.DictWriter(f, fieldnames=headers)
             w.writeheader()
@@ -264,17 +373,20 @@ def _merge_csvs(fr_dir: Path, mul_dir: Path, out_dir: Path) -> Dict[str, int]:
     return counts
 
 
-def _apply_short_prefix_policy(csv_dir: Path, policy: Dict[str, List[str]]) -> None:
-    """Remove short prefixes not explicitly allowed and any denied prefixes."""
+def _apply_short_prefix_policy(csv_dir: Path, policy: Dict[str, List[str]]) -> Dict[str, int]:
+    """Remove short prefixes not explicitly allowed and any denied prefixes.
+    Returns the number of removed rows per reason.
+    """
     prefixes_csv = csv_dir / "neologotron_prefixes.csv"
+    drops = {"policy_deny": 0, "policy_short": 0}
     if not prefixes_csv.exists():
-        return
+        return drops
     allow = {p.lower() for p in policy.get("allow", [])}
     deny = {p.lower() for p in policy.get("deny", [])}
     with open(prefixes_csv, "r", encoding="utf-8", newline="") as f:
         reader = list(csv.DictReader(f))
         if not reader:
-            return
+            return drops
         headers = reader[0].keys()
     filtered: List[Dict[str, str]] = []
     removed = 0
@@ -283,9 +395,11 @@ def _apply_short_prefix_policy(csv_dir: Path, policy: Dict[str, List[str]]) -> N
         base = form.strip().strip("-")
         if base in deny:
             removed += 1
+            drops["policy_deny"] += 1
             continue
         if len(base) <= 2 and base not in allow:
             removed += 1
+            drops["policy_short"] += 1
             continue
         filtered.append(row)
     if removed:
@@ -294,52 +408,713 @@ def _apply_short_prefix_policy(csv_dir: Path, policy: Dict[str, List[str]]) -> N
         writer = csv.DictWriter(f, fieldnames=headers)
         writer.writeheader()
         writer.writerows(filtered)
+    return drops
+
+
+def _split_tags(raw: str | None) -> List[str]:
+    """Split a tags/domain cell exactly like GeneratorService.effectiveWeight (comma, trim, lowercase)."""
+    out: List[str] = []
+    for t in (raw or "").split(","):
+        t = t.strip().lower()
+        if t and t not in out:
+            out.append(t)
+    return out
+
+
+def _parse_weight(raw: str | None) -> float:
+    try:
+        w = float(raw) if raw not in (None, "") else 1.0
+    except ValueError:
+        w = 1.0
+    return w if w > 0 and w == w else 0.0
+
+
+def _alias_table(weights: List[float]) -> Tuple[List[float], List[int]]:
+    """Build a Walker/Vose alias table: draw i uniformly, keep i if u < prob[i], else take alias[i].
+    All-zero weights degrade to uniform, as GeneratorService.weightedRandom does.
+    """
+    n = len(weights)
+    if n == 0:
+        return [], []
+    total = sum(weights)
+    scaled = [x * n / total for x in weights] if total > 0 else [1.0] * n
+    prob = [1.0] * n
+    alias = list(range(n))
+    small = [i for i, x in enumerate(scaled) if x < 1.0]
+    large = [i for i, x in enumerate(scaled) if x >= 1.0]
+    while small and large:
+        s = small.pop()
+        g = large.pop()
+        prob[s] = scaled[s]
+        alias[s] = g
+        scaled[g] = (scaled[g] + scaled[s]) - 1.0
+        (small if scaled[g] < 1.0 else large).append(g)
+    # Leftovers are 1.0 up to rounding error
+    return [round(p, 6) for p in prob], alias
+
+
+def _tag_postings(row_tags: List[List[int]], vocab_size: int) -> List[List[int]]:
+    """Invert row→tag ids into per-tag posting lists of row indices (ascending)."""
+    if vocab_size == 0:
+        return []
+    postings: List[List[int]] = [[] for _ in range(vocab_size)]
+    for i, ts in enumerate(row_tags):
+        for t in ts:
+            postings[t].append(i)
+    return postings
+
+
+def _build_generator_index(csv_dir: Path) -> Dict[str, object]:
+    """Precompute the generator sampling index for the three seed CSVs in csv_dir.
+
+    Layout: one shared tag vocabulary (sorted, id = position), then per section the row ids
+    in CSV order, a global alias table over base weights, and for every tag id its posting
+    list (row indices), summed base weight and alias table over that posting list.
+
+    The tables draw exactly like GeneratorService.effectiveWeight (w·(1 + matches·intensity),
+    0 without a match): pick a selected tag by `total`, a row from its table, then keep the row
+    with probability (1/matches + intensity) / (1 + intensity), else redraw. See etl/README.md.
+    """
+    sections: Dict[str, Tuple[List[str], List[float], List[List[str]]]] = {}
+    vocab_set = set()
+    for section, name, tag_col in GENERATOR_INDEX_SOURCES:
+        path = csv_dir / name
+        ids: List[str] = []
+        weights: List[float] = []
+        tags: List[List[str]] = []
+        if path.exists():
+            _, rows = _load_csv(path)
+            for rec in rows:
+                ids.append(rec.get("id") or "")
+                weights.append(_parse_weight(rec.get("weight")))
+                ts = _split_tags(rec.get(tag_col))
+                tags.append(ts)
+                vocab_set.update(ts)
+        sections[section] = (ids, weights, tags)
+    vocab = sorted(vocab_set)
+    tag_id = {t: i for i, t in enumerate(vocab)}
+    index: Dict[str, object] = {"format": 1, "tags": vocab}
+    for section, (ids, weights, tags) in sections.items():
+        row_tags = [[tag_id[t] for t in ts] for ts in tags]
+        postings = _tag_postings(row_tags, len(vocab))
+        prob, alias = _alias_table(weights)
+        per_tag = []
+        for rows in postings:
+            tprob, talias = _alias_table([weights[i] for i in rows])
+            per_tag.append({
+                "rows": rows,
+                "total": round(sum(weights[i] for i in rows), 6),
+                "prob": tprob,
+                "alias": talias,
+            })
+        index[section] = {"ids": ids, "prob": prob, "alias": alias, "postings": per_tag}
+    return index
+
+
+def _write_generator_index(csv_dir: Path) -> Path:
+    index = _build_generator_index(csv_dir)
+    out = csv_dir / GENERATOR_INDEX_NAME
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+    print(f"Generator index: {len(index['tags'])} tags → {out}")
+    return out
+
+
+def _file_sha256(path: Path) -> str | None:
+    if not path.exists():
+        return None
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for buf in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(buf)
+    return h.hexdigest()
+
+
+def _row_digest(headers: List[str], rec: Dict[str, str]) -> bytes:
+    blob = "\x1f".join(f"{h}={rec.get(h) or ''}" for h in headers)
+    return hashlib.blake2b(blob.encode("utf-8"), digest_size=16).digest()
 
 
-def _copy_to_assets(src_dir: Path) -> None:
-    _ensure_dir(APP_SEED_DIR)
+def _diff_seed_csv(old_path: Path, new_path: Path) -> Dict[str, object]:
+    """Keyed diff by `id` as a streaming hash join.
+
+    Build side: the previous export, reduced to id → 16-byte row digest (rows are not kept).
+    Probe side: the new CSV, streamed once; added/changed rows are emitted in full.
+    Whatever is left on the build side was removed.
+    """
+    old: Dict[str, bytes] = {}
+    if old_path.exists():
+        with open(old_path, "r", encoding="utf-8", newline="") as f:
+            r = csv.DictReader(f)
+            headers = r.fieldnames or []
+            for rec in r:
+                rid = rec.get("id") or rec.get("form") or ""
+                if rid:
+                    old[rid] = _row_digest(headers, rec)
+    added: List[Dict[str, str]] = []
+    changed: List[Dict[str, str]] = []
+    with open(new_path, "r", encoding="utf-8", newline="") as f:
+        r = csv.DictReader(f)
+        headers = r.fieldnames or []
+        for rec in r:
+            rid = rec.get("id") or rec.get("form") or ""
+            if not rid:
+                continue
+            prev = old.pop(rid, None)
+            if prev is None:
+                added.append(rec)
+            elif prev != _row_digest(headers, rec):
+                changed.append(rec)
+    return {"added": added, "changed": changed, "removed": sorted(old)}
+
+
+def _seed_delta(src_dir: Path, dst_dir: Path) -> Dict[str, object] | None:
+    """Diff the CSVs about to be exported against those currently in dst_dir; returns the next
+    versioned delta, or None when nothing changed. Nothing is written.
+    """
+    delta_path = dst_dir / SEED_DELTA_NAME
+    base_version = None
+    if delta_path.exists():
+        try:
+            base_version = int(json.loads(delta_path.read_text("utf-8")).get("version"))
+        except (ValueError, TypeError, json.JSONDecodeError):
+            base_version = None
+    files: Dict[str, object] = {}
     for name in CSV_FILES:
         src = src_dir / name
-        dst = APP_SEED_DIR / name
-        print(f"Copying {src.name} → {dst}")
-        # Copy with progress
-        total = src.stat().st_size if src.exists() else 0
-        copied = 0
-        start = time.time()
-        last_draw = 0.0
-        line_len = 0
-        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
-            while True:
-                buf = fsrc.read(1024 * 1024)
-                if not buf:
+        if not src.exists():
+            continue
+        old = dst_dir / name
+        new_hash = _file_sha256(src)
+        old_hash = _file_sha256(old)
+        if new_hash == old_hash:
+            continue
+        entry: Dict[str, object] = {"sha256": new_hash, "base_sha256": old_hash}
+        entry.update(_diff_seed_csv(old, src))
+        files[name] = entry
+    if not files:
+        print("Seed delta: no changes since last export")
+        return None
+    delta = {
+        "format": 1,
+        "version": (base_version or 0) + 1,
+        "base_version": base_version,
+        # only one delta is kept: a device whose CSVs do not match every base_sha256 must reseed fully
+        "on_base_mismatch": "full_reseed",
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "files": files,
+    }
+    for name, entry in files.items():
+        print(f"Seed delta v{delta['version']} {name}: +{len(entry['added'])} ~{len(entry['changed'])} -{len(entry['removed'])}")
+    return delta
+
+
+def _stage_seed_delta(delta: Dict[str, object], src_dir: Path) -> Path:
+    """Write the delta into src_dir (temp file + os.replace); returns its path."""
+    out = src_dir / SEED_DELTA_NAME
+    tmp = out.with_name(f".{out.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(delta, ensure_ascii=False, indent=1) + "\n", encoding="utf-8")
+    os.replace(tmp, out)
+    return out
+
+
+def _write_seed_delta(src_dir: Path, dst_dir: Path) -> Path | None:
+    """Write the next delta into src_dir and dst_dir; returns the dst_dir copy, or None when nothing changed."""
+    delta = _seed_delta(src_dir, dst_dir)
+    if delta is None:
+        return None
+    dst = dst_dir / SEED_DELTA_NAME
+    _atomic_copy(_stage_seed_delta(delta, src_dir), dst)
+    return dst
+
+
+def _copy_fd(in_fd: int, out_fd: int, size: int) -> None:
+    """Copy size bytes kernel-side (copy_file_range, then sendfile); read/write if neither is usable."""
+    copied = 0
+    for name in ("copy_file_range", "sendfile"):
+        fn = getattr(os, name, None)
+        if fn is None:
+            continue
+        try:
+            while copied < size:
+                if name == "sendfile":
+                    n = fn(out_fd, in_fd, copied, size - copied)
+                else:
+                    n = fn(in_fd, out_fd, size - copied)
+                if n == 0:
                     break
-                fdst.write(buf)
-                copied += len(buf)
-                now = time.time()
-                if now - last_draw >= 0.25:
-                    elapsed = now - start
-                    speed = copied / elapsed if elapsed > 0 else 0.0
-                    if total:
-                        eta = _fmt_eta((total - copied) / speed if speed > 0 else 0)
-                        pct = f"{(copied/total)*100:5.1f}%"
-                        msg = f"  {pct} {_fmt_bytes(copied)}/{_fmt_bytes(total)}  at {_fmt_bytes(speed)}/s  ETA {eta}"
-                    else:
-                        msg = f"  {_fmt_bytes(copied)}  at {_fmt_bytes(speed)}/s"
-                    pad = max(0, line_len - len(msg))
-                    sys.stdout.write("\r" + msg + (" " * pad))
-                    sys.stdout.flush()
-                    line_len = len(msg)
-                    last_draw = now
-        # Finalize line
-        elapsed = max(0.001, time.time() - start)
-        speed = copied / elapsed
-        if total:
-            msg = f"  100.0% {_fmt_bytes(copied)}/{_fmt_bytes(total)}  at {_fmt_bytes(speed)}/s  ETA 0:00"
-        else:
-            msg = f"  {_fmt_bytes(copied)}  at {_fmt_bytes(speed)}/s"
-        pad = max(0, line_len - len(msg))
-        sys.stdout.write("\r" + msg + (" " * pad) + "\n")
-        sys.stdout.flush()
+                copied += n
+            return
+        except OSError:
+            if copied:
+                raise
+    while True:
+        buf = os.read(in_fd, 1024 * 1024)
+        if not buf:
+            return
+        os.write(out_fd, buf)
+
+
+def _atomic_copy(src: Path, dst: Path) -> None:
+    """Write dst through a temp file in the same directory, then os.replace it into place."""
+    tmp = dst.with_name(f".{dst.name}.{os.getpid()}.tmp")
+    try:
+        with open(src, "rb") as fsrc, open(tmp, "wb") as fdst:
+            _copy_fd(fsrc.fileno(), fdst.fileno(), os.fstat(fsrc.fileno()).st_size)
+            fdst.flush()
+            os.fsync(fdst.fileno())
+        os.replace(tmp, dst)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def _sync_file(src: Path, dst: Path) -> Dict[str, object]:
+    """Copy src over dst unless their contents already match; returns its manifest entry."""
+    digest = _file_sha256(src)
+    same = dst.exists() and dst.stat().st_size == src.stat().st_size and _file_sha256(dst) == digest
+    if same:
+        print(f"Unchanged {src.name}")
+    else:
+        _atomic_copy(src, dst)
+        print(f"Copied {src.name} → {dst} ({_fmt_bytes(src.stat().st_size)})")
+    return {"bytes": src.stat().st_size, "sha256": digest}
+
+
+def _copy_to_assets(src_dir: Path, assets_dir: Path | None = None) -> None:
+    """Sync exported seeds into the app assets (or `assets_dir`): unchanged files keep their mtime
+    (no Gradle asset rebuild), changed ones are replaced atomically, and a manifest lists sizes/digests.
+
+    The delta is computed first but only moved into the assets once every CSV and the index are in
+    place, then the manifest last: a failed copy never leaves a new delta over the old CSVs.
+    """
+    dest = assets_dir or APP_SEED_DIR
+    _ensure_dir(dest)
+    delta = _seed_delta(src_dir, dest)
+    staged = _stage_seed_delta(delta, src_dir) if delta is not None else None
+    names = [name for name in (*CSV_FILES, GENERATOR_INDEX_NAME) if (src_dir / name).exists()]
+    files: Dict[str, object] = {}
+    for name in names:
+        files[name] = _sync_file(src_dir / name, dest / name)
+    if staged is not None:
+        _atomic_copy(staged, dest / SEED_DELTA_NAME)
+    if (dest / SEED_DELTA_NAME).exists():
+        delta = dest / SEED_DELTA_NAME
+        files[SEED_DELTA_NAME] = {"bytes": delta.stat().st_size, "sha256": _file_sha256(delta)}
+    manifest = src_dir / SEED_MANIFEST_NAME
+    with open(manifest, "w", encoding="utf-8") as f:
+        json.dump({"format": 1, "files": files}, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    _sync_file(manifest, dest / SEED_MANIFEST_NAME)
+
+
+def _strip_accents(text: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFD", text) if unicodedata.category(c) != "Mn")
+
+
+def _theme_slug(tag: str) -> str:
+    base = _strip_accents(tag)
+    return re.sub(r"[^a-z0-9]+", "_", base.lower()).strip("_") or UNTAGGED_THEME
+
+
+def _csv_line(values: List[str]) -> bytes:
+    buf = io.StringIO()
+    csv.writer(buf).writerow(values)
+    return buf.getvalue().encode("utf-8")
+
+
+def _shard_by_theme(src_dir: Path, out_dir: Path) -> Dict[str, object]:
+    """Partition the seed CSVs into per-theme shards in a single pass over each CSV.
+
+    Every row is written once, into the shard of its first tag (its "home" theme). Each of
+    its other tags gets a reference [home, byte offset, byte length] into that shard, so a
+    theme is loaded from its own shard plus a few ranged reads. Rows without tags go to
+    `_untagged`. Writes out_dir/<theme>/<csv> and out_dir/themes_index.json.
+    """
+    tag_cols = {name: col for _, name, col in GENERATOR_INDEX_SOURCES}
+    themes: Dict[str, Dict[str, object]] = {}
+
+    def _theme(slug: str, label: str) -> Dict[str, object]:
+        return themes.setdefault(slug, {"label": label, "files": {}, "refs": {}})
+
+    for name in CSV_FILES:
+        src = src_dir / name
+        if not src.exists():
+            continue
+        shards: Dict[str, io.BytesIO] = {}
+        rows_in: Dict[str, int] = {}
+        with open(src, "r", encoding="utf-8", newline="") as f:
+            r = csv.DictReader(f)
+            headers = r.fieldnames or []
+            header_line = _csv_line(headers)
+            for rec in r:
+                tags = _split_tags(rec.get(tag_cols[name]))
+                slugs: List[str] = []
+                for t in tags:
+                    slug = _theme_slug(t)
+                    if slug not in slugs:
+                        slugs.append(slug)
+                        _theme(slug, t)
+                if not slugs:
+                    slugs = [UNTAGGED_THEME]
+                    _theme(UNTAGGED_THEME, "")
+                home = slugs[0]
+                buf = shards.get(home)
+                if buf is None:
+                    buf = shards[home] = io.BytesIO()
+                    buf.write(header_line)
+                line = _csv_line([rec.get(h) or "" for h in headers])
+                offset = buf.tell()
+                buf.write(line)
+                rows_in[home] = rows_in.get(home, 0) + 1
+                for other in slugs[1:]:
+                    themes[other]["refs"].setdefault(name, []).append([home, offset, len(line)])
+        for slug, buf in shards.items():
+            dst = out_dir / slug / name
+            _ensure_dir(dst.parent)
+            dst.write_bytes(buf.getvalue())
+            themes[slug]["files"][name] = {"rows": rows_in[slug], "bytes": dst.stat().st_size}
+    index = {"format": 1, "themes": dict(sorted(themes.items()))}
+    _ensure_dir(out_dir)
+    with open(out_dir / THEMES_INDEX_NAME, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=1)
+        f.write("\n")
+    _prune_shards(out_dir, index)
+    return index
+
+
+def _prune_shards(root: Path, index: Dict[str, object]) -> List[Path]:
+    """Delete `<theme>/<seed csv>` files under root that `index` no longer lists (themes that lost
+    all their rows); theme directories left empty go too. Other files are never touched.
+    """
+    keep = {(slug, name) for slug, meta in index["themes"].items() for name in meta["files"]}
+    removed: List[Path] = []
+    if not root.is_dir():
+        return removed
+    for theme_dir in sorted(p for p in root.iterdir() if p.is_dir()):
+        for name in CSV_FILES:
+            path = theme_dir / name
+            if path.is_file() and (theme_dir.name, name) not in keep:
+                path.unlink()
+                removed.append(path)
+        if not any(theme_dir.iterdir()):
+            theme_dir.rmdir()
+    return removed
+
+
+# ---------------------------
+# Run store (SQLite)
+# ---------------------------
+# One database per run, built once from the merged CSVs. Subcommands query it instead of
+# re-parsing CSVs; CSV files are only written as export artifacts.
+
+RUN_STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (name TEXT PRIMARY KEY, kind TEXT NOT NULL, headers TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS rows (
+    rid INTEGER PRIMARY KEY,
+    file TEXT NOT NULL,
+    ord INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    id TEXT,
+    form TEXT,
+    lang TEXT,
+    tags TEXT,
+    gloss TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rows_file_ord ON rows(file, ord);
+CREATE INDEX IF NOT EXISTS rows_key ON rows(key);
+CREATE INDEX IF NOT EXISTS rows_id ON rows(id);
+CREATE INDEX IF NOT EXISTS rows_form ON rows(form);
+CREATE INDEX IF NOT EXISTS rows_lang ON rows(lang);
+CREATE TABLE IF NOT EXISTS row_tags (tag TEXT NOT NULL, rid INTEGER NOT NULL, PRIMARY KEY (tag, rid)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS decisions (key TEXT PRIMARY KEY, action TEXT NOT NULL, updates TEXT, ts REAL, reviewer TEXT);
+CREATE TABLE IF NOT EXISTS ai_suggestions (
+    id TEXT PRIMARY KEY, gloss TEXT, pos_out TEXT, raw TEXT NOT NULL, source TEXT
+);
+CREATE TABLE IF NOT EXISTS provenance (rid INTEGER NOT NULL, stage TEXT NOT NULL, detail TEXT);
+CREATE INDEX IF NOT EXISTS provenance_rid ON provenance(rid);
+CREATE TABLE IF NOT EXISTS scores (
+    rid INTEGER PRIMARY KEY, uncertainty REAL NOT NULL, impact REAL NOT NULL, priority REAL NOT NULL, reasons TEXT
+);
+CREATE INDEX IF NOT EXISTS scores_priority ON scores(priority);
+CREATE TABLE IF NOT EXISTS review_skips (key TEXT PRIMARY KEY, n INTEGER NOT NULL);
+"""
+
+
+def _csv_kind(name: str) -> str:
+    return "prefix" if "prefixes" in name else ("suffix" if "suffixes" in name else "root")
+
+
+def _row_key(rec: Dict[str, str]) -> str:
+    return rec.get("id") or rec.get("form") or ""
+
+
+# Review state keyed by row key (or AI candidate id), carried over when the store is rebuilt
+RUN_STORE_KEPT_TABLES = ("decisions", "review_skips", "ai_suggestions")
+
+
+def _checkpoint_run_store(path: Path) -> None:
+    """Fold the WAL back into the database file so it can be read (or replaced) on its own.
+
+    Raises RuntimeError when another connection (e.g. a review session) keeps the WAL busy.
+    """
+    conn = sqlite3.connect(path, timeout=30.0)
+    try:
+        busy, _, _ = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+    finally:
+        conn.close()
+    if busy:
+        raise RuntimeError(f"{path} is in use (review session still open?); close it and retry")
+
+
+def _carry_review_state(conn: sqlite3.Connection, old_path: Path) -> Dict[str, int]:
+    """Copy decisions, skips and AI suggestions from the store being replaced into `conn`."""
+    conn.execute("ATTACH DATABASE ? AS old", (str(old_path),))
+    counts: Dict[str, int] = {}
+    try:
+        for table in RUN_STORE_KEPT_TABLES:
+            old_cols = [r[1] for r in conn.execute(f"PRAGMA old.table_info({table})")]
+            if not old_cols:
+                continue
+            cols = ", ".join(c for c in (r[1] for r in conn.execute(f"PRAGMA main.table_info({table})")) if c in old_cols)
+            cur = conn.execute(f"INSERT OR REPLACE INTO main.{table}({cols}) SELECT {cols} FROM old.{table}")
+            counts[table] = cur.rowcount
+        conn.commit()
+    finally:
+        conn.execute("DETACH DATABASE old")
+    return counts
+
+
+def _build_run_store(run_dir: Path) -> Path:
+    """(Re)create runs/<run>/run.sqlite from merged/ CSVs, importing legacy review decisions.
+    Provenance records which side of the merge (csv_fr or csv_mul) each row came from.
+
+    Rebuilding an existing store keeps its review state (decisions, skips, AI suggestions): they
+    are keyed by row key, not rid, and copied over before the new file replaces the old one.
+    """
+    merged_dir = run_dir / "merged"
+    path = run_dir / RUN_STORE_NAME
+    tmp = path.with_name(path.name + ".tmp")
+    if tmp.exists():
+        tmp.unlink()
+    if path.exists():
+        _checkpoint_run_store(path)
+    kept: Dict[str, int] = {}
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.executescript(RUN_STORE_SCHEMA)
+        total = 0
+        for name in CSV_FILES:
+            src = merged_dir / name
+            if not src.exists():
+                continue
+            fr_forms = set()
+            fr_csv = run_dir / "csv_fr" / name
+            if fr_csv.exists() and (run_dir / "csv_mul").exists():
+                with open(fr_csv, "r", encoding="utf-8", newline="") as f:
+                    fr_forms = {rec.get("form", "") for rec in csv.DictReader(f)}
+            with open(src, "r", encoding="utf-8", newline="") as f:
+                r = csv.DictReader(f)
+                headers = r.fieldnames or []
+                conn.execute("INSERT INTO files(name, kind, headers) VALUES (?, ?, ?)",
+                             (name, _csv_kind(name), json.dumps(headers)))
+                for ord_, rec in enumerate(r):
+                    lang = (rec.get("root_lang") or rec.get("ety_lang") or "").lower() or None
+                    tags = rec.get("tags") if "tags" in rec else rec.get("domain")
+                    cur = conn.execute(
+                        "INSERT INTO rows(file, ord, key, id, form, lang, tags, gloss, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (name, ord_, _row_key(rec), rec.get("id") or None, rec.get("form") or None, lang,
+                         tags or None, rec.get("gloss") or None, json.dumps(rec, ensure_ascii=False)),
+                    )
+                    rid = cur.lastrowid
+                    conn.executemany("INSERT OR IGNORE INTO row_tags(tag, rid) VALUES (?, ?)",
+                                     [(t, rid) for t in _split_tags(tags)])
+                    side = ("fr" if rec.get("form", "") in fr_forms else "mul") if fr_forms else "merged"
+                    conn.execute("INSERT INTO provenance(rid, stage, detail) VALUES (?, ?, ?)",
+                                 (rid, "merge", json.dumps({"side": side, "sources": rec.get("sources") or ""})))
+                    total += 1
+        for key, dec in _load_decisions(_decisions_path(run_dir)).items():
+            conn.execute("INSERT OR REPLACE INTO decisions(key, action, updates, ts) VALUES (?, ?, ?, ?)",
+                         (key, dec.get("action") or "", json.dumps(dec.get("updates") or {}, ensure_ascii=False), None))
+        conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('built', ?)", (datetime.now().isoformat(timespec="seconds"),))
+        conn.row_factory = sqlite3.Row
+        _score_run_store(conn)
+        _ensure_fts(conn)
+        conn.commit()
+        if path.exists():
+            kept = _carry_review_state(conn, path)
+    finally:
+        conn.close()
+    os.replace(tmp, path)
+    for suffix in ("-wal", "-shm"):  # stale after the checkpoint; they must not be applied to the new file
+        stale = path.with_name(path.name + suffix)
+        if stale.exists():
+            stale.unlink()
+    print(f"Run store: {total} rows → {path}")
+    if any(kept.values()):
+        print("  Kept review state: " + ", ".join(f"{n} {t}" for t, n in kept.items() if n))
+    return path
+
+
+def _open_run_store(run_dir: Path) -> sqlite3.Connection:
+    """Open the run store in WAL mode so several reviewers can write while others read."""
+    path = run_dir / RUN_STORE_NAME
+    if not path.exists():
+        _build_run_store(run_dir)
+    conn = sqlite3.connect(path, timeout=30.0)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    cols = {r["name"] for r in conn.execute("PRAGMA table_info(decisions)")}
+    if "reviewer" not in cols:
+        conn.execute("ALTER TABLE decisions ADD COLUMN reviewer TEXT")
+        conn.commit()
+    if conn.execute("SELECT name FROM sqlite_master WHERE name = 'scores'").fetchone() is None:
+        conn.executescript(RUN_STORE_SCHEMA)
+        _score_run_store(conn)
+        conn.commit()
+    _ensure_fts(conn)
+    return conn
+
+
+def _ensure_fts(conn: sqlite3.Connection) -> bool:
+    """Create and fill the FTS5 index over form, gloss, ety_desc and tags if missing.
+    Returns False when this SQLite build lacks FTS5; searches then fall back to substring scans.
+    """
+    if conn.execute("SELECT name FROM sqlite_master WHERE name = 'rows_fts'").fetchone() is not None:
+        return True
+    try:
+        conn.execute("CREATE VIRTUAL TABLE rows_fts USING fts5(form, gloss, ety_desc, tags,"
+                     " tokenize = 'unicode61 remove_diacritics 2')")
+    except sqlite3.OperationalError:
+        return False
+    conn.execute("INSERT INTO rows_fts(rowid, form, gloss, ety_desc, tags)"
+                 " SELECT rid, form, gloss, json_extract(data, '$.ety_desc'), tags FROM rows")
+    conn.commit()
+    return True
+
+
+def _fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query: every word must match (as a prefix).
+    Text that already uses FTS5 syntax (quotes, AND/OR/NOT/NEAR, column:) is passed through.
+    """
+    if '"' in text or re.search(r"\b(AND|OR|NOT|NEAR)\b|\w:", text):
+        return text
+    return " ".join(f'"{t}"*' for t in re.findall(r"\w+", text))
+
+
+def _literal_fts_query(text: str) -> str:
+    """Every whitespace-separated token as a quoted phrase: always valid FTS5, no operators."""
+    return " ".join('"' + t.replace('"', '""') + '"' for t in text.split() if re.search(r"\w", t)) or '""'
+
+
+def _checked_search_query(conn: sqlite3.Connection, text: str) -> str:
+    """The search text itself, or its literal form when FTS5 rejects it (`vie:`, `bio AND`, `C++ OR`).
+
+    Prints a warning when falling back, so malformed input never ends in a traceback.
+    """
+    if conn.execute("SELECT name FROM sqlite_master WHERE name = 'rows_fts'").fetchone() is None:
+        return text
+    try:
+        conn.execute("SELECT rowid FROM rows_fts WHERE rows_fts MATCH ? LIMIT 1", (_fts_query(text),)).fetchall()
+        return text
+    except sqlite3.OperationalError as ex:
+        literal = _literal_fts_query(text)
+        print(f"[WARN] Search syntax not understood ({ex}); searching {literal} as plain words instead.",
+              file=sys.stderr)
+        return literal
+
+
+def _search_rids(conn: sqlite3.Connection, query: str) -> Tuple[str, List[object]]:
+    """SQL condition (on `rows`) and params selecting rows that match the query."""
+    if conn.execute("SELECT name FROM sqlite_master WHERE name = 'rows_fts'").fetchone() is not None:
+        return "rid IN (SELECT rowid FROM rows_fts WHERE rows_fts MATCH ?)", [_fts_query(query)]
+    words = [w.lower() for w in re.findall(r"\w+", query)]
+    cols = ("form", "gloss", "json_extract(data, '$.ety_desc')", "tags")
+    blob = "lower(" + " || ' ' || ".join(f"coalesce({c}, '')" for c in cols) + ")"
+    return " AND ".join(f"instr({blob}, ?) > 0" for _ in words) or "1", words
+
+
+def _search(conn: sqlite3.Connection, query: str, limit: int = 20) -> List[sqlite3.Row]:
+    """Ranked matches (bm25; form and gloss weigh more than etymology and tags)."""
+    if conn.execute("SELECT name FROM sqlite_master WHERE name = 'rows_fts'").fetchone() is not None:
+        sql = ("SELECT r.rid, r.id, r.file, r.form, r.gloss, r.lang, r.tags, bm25(rows_fts, 4.0, 2.0, 1.0, 1.0) AS rank"
+               " FROM rows_fts JOIN rows r ON r.rid = rows_fts.rowid WHERE rows_fts MATCH ? ORDER BY rank LIMIT ?")
+        return conn.execute(sql, (_fts_query(query), limit)).fetchall()
+    where, params = _search_rids(conn, query)
+    sql = f"SELECT rid, id, file, form, gloss, lang, tags, 0.0 AS rank FROM rows WHERE {where} ORDER BY rid LIMIT ?"
+    return conn.execute(sql, (*params, limit)).fetchall()
+
+
+def _facet_counts(conn: sqlite3.Connection, where: str, params: List[object]) -> Dict[str, List[Tuple[str, int]]]:
+    """Counts by origin language and by tag over the rows matching an SQL condition on `rows`."""
+    sub = f"SELECT rid FROM rows WHERE {where}"
+    langs = conn.execute(f"SELECT coalesce(lang, '?') AS k, COUNT(*) AS n FROM rows WHERE rid IN ({sub})"
+                         " GROUP BY k ORDER BY n DESC, k", params).fetchall()
+    tags = conn.execute(f"SELECT tag AS k, COUNT(*) AS n FROM row_tags WHERE rid IN ({sub})"
+                        " GROUP BY tag ORDER BY n DESC, tag", params).fetchall()
+    return {"origin": [(r["k"], r["n"]) for r in langs], "tag": [(r["k"], r["n"]) for r in tags]}
+
+
+def _store_files(conn: sqlite3.Connection) -> Dict[str, List[str]]:
+    """CSV name → headers, in CSV_FILES order, for files present in the store."""
+    found = {r["name"]: json.loads(r["headers"]) for r in conn.execute("SELECT name, headers FROM files")}
+    return {name: found[name] for name in CSV_FILES if name in found}
+
+
+def _store_rows(conn: sqlite3.Connection, name: str, where: str = "", params: Iterable[object] = ()) -> Iterable[Dict[str, str]]:
+    """Stream rows of one CSV in original order, optionally restricted by an SQL condition on `rows`."""
+    sql = "SELECT data FROM rows WHERE file = ?" + (f" AND ({where})" if where else "") + " ORDER BY ord"
+    for r in conn.execute(sql, (name, *params)):
+        yield json.loads(r["data"])
+
+
+def _decision_for(conn: sqlite3.Connection, key: str) -> dict | None:
+    """Primary-key lookup: cost does not depend on how many decisions exist."""
+    r = conn.execute("SELECT action, updates, reviewer FROM decisions WHERE key = ?", (key,)).fetchone()
+    if r is None:
+        return None
+    return {"id": key, "action": r["action"], "updates": json.loads(r["updates"] or "{}"), "reviewer": r["reviewer"]}
+
+
+# Write transactions retried on SQLITE_BUSY after the connection's busy timeout, with backoff
+WRITE_RETRIES = 5
+
+
+def _write_txn(conn: sqlite3.Connection, fn: Callable[[], None]) -> None:
+    """Run `fn` in its own short BEGIN IMMEDIATE transaction and commit.
+
+    The write lock is held only for the statements in `fn`, never across a prompt, so other
+    reviewers on the same run (WAL) only ever wait milliseconds for it.
+    """
+    if conn.in_transaction:
+        conn.commit()
+    for attempt in range(WRITE_RETRIES):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError as ex:
+            if "locked" not in str(ex) and "busy" not in str(ex) or attempt == WRITE_RETRIES - 1:
+                raise
+            time.sleep(0.05 * 2 ** attempt)
+            continue
+        try:
+            fn()
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        return
+
+
+def _record_decision(conn: sqlite3.Connection, record: dict, reviewer: str | None = None) -> None:
+    """Upsert one decision inside the current transaction; the caller decides when to commit."""
+    conn.execute(
+        "INSERT OR REPLACE INTO decisions(key, action, updates, ts, reviewer) VALUES (?, ?, ?, ?, ?)",
+        (record["id"], record["action"], json.dumps(record.get("updates") or {}, ensure_ascii=False),
+         time.time(), reviewer),
+    )
 
 
 def _decisions_path(run_dir: Path) -> Path:
@@ -365,38 +1140,127 @@ def _load_decisions(path: Path) -> Dict[str, dict]:
     return m
 
 
-def _append_decision(path: Path, record: dict) -> None:
-    _ensure_dir(path.parent)
-    with open(path, "a", encoding="utf-8") as f:
-        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+# Per-reason uncertainty, combined as independent probabilities: 1 - Π(1 - w)
+UNCERTAINTY_WEIGHTS = {
+    "empty_gloss": 1.0,
+    "short_gloss": 0.8,
+    "long_gloss": 0.3,
+    "no_origin": 0.5,
+    "no_tags": 0.4,
+    "english_gloss": 0.6,
+    "uppercase_form": 0.5,
+    "duplicate": 0.3,
+}
+
 
+def _dup_key(text: str) -> str:
+    return re.sub(r"[\W_]+", " ", text.casefold()).strip()
 
-def _is_uncertain(rec: Dict[str, str]) -> bool:
+
+def _uncertainty_reasons(rec: Dict[str, str], form_counts: Dict[str, int], gloss_counts: Dict[str, int],
+                         p_en: float = 0.0) -> List[str]:
     gloss = (rec.get("gloss") or "").strip()
     origin = (rec.get("origin") or "").strip()
     tags = (rec.get("tags") or rec.get("domain") or "").strip()
     form = (rec.get("form") or "").strip()
-    # Simple heuristics: short/empty gloss, missing origin, empty tags, suspicious form
-    if len(gloss) < 6:
-        return True
+    reasons: List[str] = []
+    if not gloss:
+        reasons.append("empty_gloss")
+    elif len(gloss) < 6:
+        reasons.append("short_gloss")
+    elif len(gloss) > 120:
+        reasons.append("long_gloss")
     if not origin:
-        return True
+        reasons.append("no_origin")
     if not tags:
-        return True
+        reasons.append("no_tags")
+    if gloss and p_en >= 0.5:
+        reasons.append("english_gloss")
     if any(c.isupper() for c in form if c.isalpha()):
-        return True
-    return False
+        reasons.append("uppercase_form")
+    if form_counts.get(_dup_key(form), 0) > 1 or (gloss and gloss_counts.get(_dup_key(gloss), 0) > 1):
+        reasons.append("duplicate")
+    return reasons
+
 
+def _score_run_store(conn: sqlite3.Connection) -> int:
+    """Compute uncertainty, impact and review priority for every row (stored in `scores`).
 
-def _review_loop(headers: List[str], rows: List[Dict[str, str]], decisions: Dict[str, dict], dec_path: Path, limit: int | None, show_all: bool) -> int:
+    uncertainty: combined weight of the reasons above, in [0, 1); english_gloss counts in proportion
+    to the language classifier's confidence.
+    impact: 0.5 + 0.5 × generator weight / max weight, since heavier rows are drawn more often.
+    priority: uncertainty × impact; review serves the highest first.
+    """
+    form_counts: Dict[str, int] = {}
+    gloss_counts: Dict[str, int] = {}
+    max_w = 0.0
+    for r in conn.execute("SELECT form, gloss, json_extract(data, '$.weight') AS weight FROM rows"):
+        fk = _dup_key(r["form"] or "")
+        form_counts[fk] = form_counts.get(fk, 0) + 1
+        if r["gloss"]:
+            gk = _dup_key(r["gloss"])
+            gloss_counts[gk] = gloss_counts.get(gk, 0) + 1
+        max_w = max(max_w, _parse_weight(r["weight"]))
+    out = []
+    rows = conn.execute("SELECT rid, data FROM rows").fetchall()
+    recs = [json.loads(r["data"]) for r in rows]
+    english = _english_scores([(rec.get("gloss") or "").strip() for rec in recs])
+    for r, rec, p_en in zip(rows, recs, english):
+        reasons = _uncertainty_reasons(rec, form_counts, gloss_counts, p_en)
+        keep = 1.0
+        for reason in reasons:
+            w = UNCERTAINTY_WEIGHTS[reason]
+            keep *= 1.0 - (w * p_en if reason == "english_gloss" else w)
+        uncertainty = 1.0 - keep
+        impact = 0.5 + 0.5 * (_parse_weight(rec.get("weight")) / max_w if max_w > 0 else 1.0)
+        out.append((r["rid"], round(uncertainty, 4), round(impact, 4), round(uncertainty * impact, 4), ",".join(reasons)))
+    conn.execute("DELETE FROM scores")
+    conn.executemany("INSERT INTO scores(rid, uncertainty, impact, priority, reasons) VALUES (?, ?, ?, ?, ?)", out)
+    return len(out)
+
+
+def _review_queue(conn: sqlite3.Connection, names: List[str], where: str, params: List[object],
+                  show_all: bool) -> Iterable[Tuple[Dict[str, str], sqlite3.Row]]:
+    """Yield undecided rows by priority from a heap of (skips, -priority, rid).
+
+    Only the three sort keys are loaded up front; each row's data is fetched when popped.
+    Rows skipped in earlier sessions sink below unseen ones, so a new session resumes
+    with the next most valuable entries instead of the first rows of the file.
+    """
+    sql = (
+        "SELECT s.rid, s.priority, coalesce(k.n, 0) AS skips FROM scores s"
+        " JOIN rows r ON r.rid = s.rid LEFT JOIN review_skips k ON k.key = r.key"
+        f" WHERE s.rid IN (SELECT rid FROM rows WHERE file IN ({','.join('?' * len(names))}) AND ({where}))"
+        + ("" if show_all else " AND s.uncertainty > 0")
+    )
+    heap = [(r["skips"], -r["priority"], r["rid"]) for r in conn.execute(sql, (*names, *params))]
+    heapq.heapify(heap)
+    while heap:
+        _, _, rid = heapq.heappop(heap)
+        row = conn.execute(
+            "SELECT r.data, s.priority, s.reasons FROM rows r JOIN scores s ON s.rid = r.rid WHERE r.rid = ?", (rid,)
+        ).fetchone()
+        yield json.loads(row["data"]), row
+
+
+def _review_loop(queue: Iterable[Tuple[Dict[str, str], sqlite3.Row]], conn: sqlite3.Connection, limit: int | None,
+                 reviewer: str | None = None) -> int:
     count = 0
-    for rec in rows:
+
+    def _decide(record: dict) -> None:
+        _write_txn(conn, lambda: _record_decision(conn, record, reviewer))
+
+    def _skip(key: str) -> None:
+        # Leave undecided; later sessions serve it after unseen entries
+        _write_txn(conn, lambda: conn.execute("INSERT INTO review_skips(key, n) VALUES (?, 1)"
+                                              " ON CONFLICT(key) DO UPDATE SET n = n + 1", (key,)))
+
+    for rec, score in queue:
         rid = rec.get("id") or rec.get("form")
         if not rid:
             continue
-        if rid in decisions:
-            continue
-        if not show_all and not _is_uncertain(rec):
+        # Another reviewer may have decided it since the slice was selected
+        if _decision_for(conn, rid) is not None:
             continue
         # Show compact view
         print("-" * 60)
@@ -406,17 +1270,18 @@ def _review_loop(headers: List[str], rows: List[Dict[str, str]], decisions: Dict
             print(f"tags: {rec.get('tags','')}")
         if 'domain' in rec:
             print(f"domain: {rec.get('domain','')}")
+        print(f"priority: {score['priority']:.2f}  ({(score['reasons'] or '-').replace(',', ', ')})")
         print("Actions: [a]ccept  [e]dit  [r]eject  [s]kip  [q]uit")
         while True:
             cmd = input("> ").strip().lower()
             if cmd in ("a", ""):
-                _append_decision(dec_path, {"id": rid, "action": "accept"})
+                _decide({"id": rid, "action": "accept"})
                 break
             if cmd == "r":
-                _append_decision(dec_path, {"id": rid, "action": "reject"})
+                _decide({"id": rid, "action": "reject"})
                 break
             if cmd == "s":
-                # Leave undecided for future sessions
+                _skip(rid)
                 break
             if cmd == "e":
                 print("Enter field=value (comma-separated). Known fields include: gloss, origin, tags, domain, connector, pos_out, def_template, weight")
@@ -428,7 +1293,7 @@ def _review_loop(headers: List[str], rows: List[Dict[str, str]], decisions: Dict
                     if "=" in pair:
                         k, v = pair.split("=", 1)
                         updates[k.strip()] = v.strip()
-                _append_decision(dec_path, {"id": rid, "action": "edit", "updates": updates})
+                _decide({"id": rid, "action": "edit", "updates": updates})
                 break
             if cmd == "q":
                 return count
@@ -443,61 +1308,109 @@ def cmd_review(args) -> int:
     if not run_dir or not run_dir.exists():
         print("No run directory found. Run 'python etl/cli.py wizard' first.", file=sys.stderr)
         return 2
-    merged_dir = run_dir / "merged"
-    dec_path = _decisions_path(run_dir)
-    decisions = _load_decisions(dec_path)
+    conn = _open_run_store(run_dir)
     targets = []
     if args.csv in ("prefixes", "all"):
-        targets.append(merged_dir / "neologotron_prefixes.csv")
+        targets.append("neologotron_prefixes.csv")
     if args.csv in ("suffixes", "all"):
-        targets.append(merged_dir / "neologotron_suffixes.csv")
+        targets.append("neologotron_suffixes.csv")
     if args.csv in ("roots", "all"):
-        targets.append(merged_dir / "neologotron_racines.csv")
-    total = 0
-    origin_langs = None
+        targets.append("neologotron_racines.csv")
+
+    # Pre-filters become SQL over the indexed columns; decided rows are excluded up front
+    where = ["key <> ''", "key NOT IN (SELECT key FROM decisions)"]
+    params: List[object] = []
     if args.origin_lang:
-        origin_langs = {x.strip().lower() for x in args.origin_lang.split(",") if x.strip()}
-    domain_terms = None
+        origin_langs = sorted({x.strip().lower() for x in args.origin_lang.split(",") if x.strip()})
+        where.append(f"lang IN ({','.join('?' * len(origin_langs))})")
+        params.extend(origin_langs)
     if args.domains:
         domain_terms = [x.strip().lower() for x in args.domains.split(",") if x.strip()]
-
+        where.append("(" + " OR ".join("instr(lower(coalesce(tags, '')), ?) > 0" for _ in domain_terms) + ")")
+        params.extend(domain_terms)
+    if getattr(args, "query", None):
+        cond, qparams = _search_rids(conn, _checked_search_query(conn, args.query))
+        where.append(cond)
+        params.extend(qparams)
+    # Disjoint slices for parallel reviewers: --slice 2/3 keeps every third row, offset 1
+    if getattr(args, "slice", None):
+        try:
+            k, n = (int(x) for x in args.slice.split("/", 1))
+            if not 1 <= k <= n:
+                raise ValueError
+        except ValueError:
+            print(f"Invalid --slice '{args.slice}' (expected K/N with 1 <= K <= N)", file=sys.stderr)
+            conn.close()
+            return 2
+        where.append("rid % ? = ?")
+        params.extend([n, k - 1])
     # Optional ID restriction
-    ids_set = None
     if getattr(args, 'ids_file', None):
         p = Path(args.ids_file)
         if p.exists():
-            ids_set = {line.strip() for line in p.read_text(encoding='utf-8').splitlines() if line.strip()}
+            ids = [line.strip() for line in p.read_text(encoding='utf-8').splitlines() if line.strip()]
+            conn.execute("CREATE TEMP TABLE review_ids (id TEXT PRIMARY KEY)")
+            conn.executemany("INSERT OR IGNORE INTO review_ids(id) VALUES (?)", [(i,) for i in ids])
+            where.append("id IN (SELECT id FROM review_ids)")
 
-    for path in targets:
-        if not path.exists():
-            continue
-        headers, rows = _load_csv(path)
-        # Apply pre-filters
-        if origin_langs:
-            def _row_lang(rec: Dict[str, str]) -> str | None:
-                return (rec.get("root_lang") or rec.get("ety_lang") or "").lower() or None
-            rows = [r for r in rows if _row_lang(r) in origin_langs]
-        if domain_terms:
-            def _has_domain(rec: Dict[str, str]) -> bool:
-                text = (rec.get("domain") or rec.get("tags") or "").lower()
-                return any(t in text for t in domain_terms)
-            rows = [r for r in rows if _has_domain(r)]
-        if ids_set is not None:
-            rows = [r for r in rows if (r.get('id') or '') in ids_set]
-
-        reviewed = _review_loop(headers, rows, decisions, dec_path, args.limit, args.show_all)
-        total += reviewed
-    print(f"Saved decisions to: {dec_path}")
+    try:
+        queue = _review_queue(conn, targets, " AND ".join(where), params, args.show_all)
+        total = _review_loop(queue, conn, args.limit, getattr(args, "reviewer", None))
+    finally:
+        conn.close()
+    print(f"Saved decisions to: {run_dir / RUN_STORE_NAME}")
     print(f"Reviewed {total} entries")
     return 0
 
 
+def cmd_search(args) -> int:
+    run_dir = ETL_DIR / "runs" / args.run if args.run else _latest_run_dir()
+    if not run_dir or not run_dir.exists():
+        print("No run directory found. Run 'python etl/cli.py wizard' first.", file=sys.stderr)
+        return 2
+    conn = _open_run_store(run_dir)
+    try:
+        start = time.perf_counter()
+        query = _checked_search_query(conn, args.query)
+        hits = _search(conn, query, args.limit)
+        where, params = _search_rids(conn, query)
+        facets = _facet_counts(conn, where, params)
+        elapsed = (time.perf_counter() - start) * 1000
+    finally:
+        conn.close()
+    total = sum(n for _, n in facets["origin"])
+    print(f"{total} matches for {args.query!r} ({elapsed:.1f} ms); top {len(hits)}:")
+    for h in hits:
+        print(f"  {h['rank']:7.2f}  [{_csv_kind(h['file'])}] {h['id'] or ''}  {h['form'] or ''}  — {(h['gloss'] or '')[:70]}")
+    print("Origins: " + ", ".join(f"{k}:{n}" for k, n in facets["origin"][:args.facets]))
+    print("Tags: " + ", ".join(f"{k}:{n}" for k, n in facets["tag"][:args.facets]))
+    return 0
+
+
+def cmd_score(args) -> int:
+    run_dir = ETL_DIR / "runs" / args.run if args.run else _latest_run_dir()
+    if not run_dir or not run_dir.exists():
+        print("No run directory found. Run 'python etl/cli.py wizard' first.", file=sys.stderr)
+        return 2
+    conn = _open_run_store(run_dir)
+    try:
+        n = _score_run_store(conn)
+        conn.commit()
+        print(f"Scored {n} rows. Highest review priority:")
+        cur = conn.execute("SELECT r.id, r.form, s.priority, s.reasons FROM scores s JOIN rows r ON r.rid = s.rid"
+                           " ORDER BY s.priority DESC LIMIT ?", (args.top,))
+        for r in cur:
+            print(f"  {r['priority']:.2f}  {r['id'] or ''}  {r['form'] or ''}  ({r['reasons'] or '-'})")
+    finally:
+        conn.close()
+    return 0
+
+
 def cmd_import_ai(args) -> int:
     run_dir = ETL_DIR / "runs" / args.run if args.run else _latest_run_dir()
     if not run_dir or not run_dir.exists():
         print("No run directory found. Run 'python etl/cli.py wizard' first.", file=sys.stderr)
         return 2
-    merged_dir = run_dir / "merged"
     out_dir = Path(args.out_dir) if args.out_dir else (run_dir / "ai_imported")
     ai_path = Path(args.ai_jsonl)
     if not ai_path.exists():
@@ -529,7 +1442,7 @@ def cmd_import_ai(args) -> int:
             altfor = (obj.get("alt_form_for") or "").strip()
             prefer = obj.get("prefer_canon")
             rat = (obj.get("rationale") or "").strip()
-            suggestions[_id] = {"gloss": sg, "pos_out": po}
+            suggestions[_id] = {"gloss": sg, "pos_out": po, "raw": line}
             # Build an action plan entry if advanced fields present or keep==false was skipped above
             action = None
             target = None
@@ -553,54 +1466,48 @@ def cmd_import_ai(args) -> int:
         print("No applicable AI suggestions found.")
         return 0
 
-    # Index merged rows by id to enrich actions with form/type
-    id_to_meta: Dict[str, Dict[str, str]] = {}
-    for name in CSV_FILES:
-        path = merged_dir / name
-        if not path.exists():
-            continue
-        headers, rows = _load_csv(path)
-        typ = "prefix" if "prefixes" in name else ("suffix" if "suffixes" in name else "root")
-        for rec in rows:
-            rid = rec.get("id") or ""
-            if rid:
-                id_to_meta[rid] = {"form": rec.get("form") or "", "type": typ}
-
-    # Enrich actions_plan with form/type
-    for a in actions_plan:
-        meta = id_to_meta.get(a["id"], {})
-        if meta:
-            a.setdefault("form", meta.get("form", ""))
-            a.setdefault("type", meta.get("type", ""))
-
-    # Apply to CSVs (only gloss/pos_out). Canon/alt/exclude are written as a plan for review.
-    changed_total = 0
-    for name in CSV_FILES:
-        src = merged_dir / name
-        if not src.exists():
-            continue
-        headers, rows = _load_csv(src)
-        changed = 0
-        for rec in rows:
-            rid = rec.get("id") or ""
-            if rid in suggestions:
-                sug = suggestions[rid]
-                sg = sug.get("gloss") or ""
-                po = sug.get("pos_out") or ""
-                if sg:
-                    rec["gloss"] = sg
-                if po and "suffixes" in name:
-                    rec["pos_out"] = po
-                changed += 1
-                edited_ids.append(rid)
-        if changed:
-            _write_csv(out_dir / name, headers, rows)
-            changed_total += changed
-            print(f"  Applied AI to {name}: {changed} rows")
-        else:
-            # Still write original if other files changed, to keep set complete
-            if out_dir.exists():
+    conn = _open_run_store(run_dir)
+    try:
+        conn.executemany(
+            "INSERT OR REPLACE INTO ai_suggestions(id, gloss, pos_out, raw, source) VALUES (?, ?, ?, ?, ?)",
+            [(k, v["gloss"], v["pos_out"], v["raw"], str(ai_path)) for k, v in suggestions.items()],
+        )
+        conn.commit()
+
+        # Enrich actions_plan with form/type
+        for a in actions_plan:
+            meta = conn.execute("SELECT form, file FROM rows WHERE id = ? LIMIT 1", (a["id"],)).fetchone()
+            if meta:
+                a.setdefault("form", meta["form"] or "")
+                a.setdefault("type", _csv_kind(meta["file"]))
+
+        # Apply to CSVs (only gloss/pos_out). Canon/alt/exclude are written as a plan for review.
+        changed_total = 0
+        for name, headers in _store_files(conn).items():
+            rows = list(_store_rows(conn, name))
+            changed = 0
+            for rec in rows:
+                rid = rec.get("id") or ""
+                if rid in suggestions:
+                    sug = suggestions[rid]
+                    sg = sug.get("gloss") or ""
+                    po = sug.get("pos_out") or ""
+                    if sg:
+                        rec["gloss"] = sg
+                    if po and "suffixes" in name:
+                        rec["pos_out"] = po
+                    changed += 1
+                    edited_ids.append(rid)
+            if changed:
                 _write_csv(out_dir / name, headers, rows)
+                changed_total += changed
+                print(f"  Applied AI to {name}: {changed} rows")
+            else:
+                # Still write original if other files changed, to keep set complete
+                if out_dir.exists():
+                    _write_csv(out_dir / name, headers, rows)
+    finally:
+        conn.close()
 
     if changed_total == 0:
         print("No matching IDs from AI file were found in merged CSVs.")
@@ -642,36 +1549,31 @@ def cmd_apply_review(args) -> int:
     if not run_dir or not run_dir.exists():
         print("No run directory found. Run 'python etl/cli.py wizard' first.", file=sys.stderr)
         return 2
-    merged_dir = run_dir / "merged"
     out_dir = Path(args.out_dir) if args.out_dir else (run_dir / "export_reviewed")
-    dec_path = _decisions_path(run_dir)
-    decisions = _load_decisions(dec_path)
-    print(f"Applying decisions from {decisions and dec_path or '(none)'}")
-    for name in CSV_FILES:
-        src = merged_dir / name
-        if not src.exists():
-            continue
-        headers, rows = _load_csv(src)
-        out_rows: List[Dict[str, str]] = []
-        for rec in rows:
-            rid = rec.get("id") or rec.get("form")
-            dec = decisions.get(rid)
-            if not dec:
-                out_rows.append(rec)
-                continue
-            if dec.get("action") == "reject":
-                continue
-            if dec.get("action") == "edit":
-                updates = dec.get("updates", {})
-                new_rec = dict(rec)
-                for k, v in updates.items():
-                    if k in headers:
-                        new_rec[k] = v
-                out_rows.append(new_rec)
-            else:
+    conn = _open_run_store(run_dir)
+    try:
+        n_dec = conn.execute("SELECT COUNT(*) FROM decisions").fetchone()[0]
+        print(f"Applying {n_dec} decisions from {run_dir / RUN_STORE_NAME}")
+        for name, headers in _store_files(conn).items():
+            out_rows: List[Dict[str, str]] = []
+            cur = conn.execute(
+                "SELECT r.data, d.action, d.updates FROM rows r LEFT JOIN decisions d ON d.key = r.key"
+                " WHERE r.file = ? ORDER BY r.ord", (name,))
+            for row in cur:
+                rec = json.loads(row["data"])
+                if row["action"] == "reject":
+                    continue
+                if row["action"] == "edit":
+                    updates = json.loads(row["updates"] or "{}")
+                    for k, v in updates.items():
+                        if k in headers:
+                            rec[k] = v
                 out_rows.append(rec)
-        _write_csv(out_dir / name, headers, out_rows)
-        print(f"  {name}: {len(out_rows)} rows")
+            _write_csv(out_dir / name, headers, out_rows)
+            print(f"  {name}: {len(out_rows)} rows")
+    finally:
+        conn.close()
+    _write_generator_index(out_dir)
     # Copy to assets
     _copy_to_assets(out_dir)
     print("Exported reviewed CSVs and updated app assets. Use Debug → Reset database to reload.")
@@ -730,18 +1632,87 @@ def _load_map(path: Path | None) -> Dict[str, str]:
         return json.load(f)
 
 
-def _apply_map(text: str, m: Dict[str, str]) -> str:
-    if not text or not m:
-        return text
-    # Exact phrase map first
-    if text in m:
-        return m[text]
-    # Try lowercase match
-    low = text.lower()
-    for k, v in m.items():
-        if low == k.lower():
-            return v
-    return text
+def _fold_with_offsets(text: str) -> Tuple[str, List[int] | None]:
+    """Case-fold text; when folding changes its length (ß → ss), also map folded offsets back to text offsets."""
+    folded = text.casefold()
+    if len(folded) == len(text):
+        return folded, None
+    parts: List[str] = []
+    offsets: List[int] = []
+    for i, ch in enumerate(text):
+        f = ch.casefold()
+        parts.append(f)
+        offsets.extend([i] * len(f))
+    offsets.append(len(text))
+    return "".join(parts), offsets
+
+
+class _PhraseMap:
+    """Compiled gloss map for polish, built once and shared by all CSVs.
+
+    A gloss matching a key as a whole (exact, then case-folded) is replaced outright. Otherwise,
+    with `phrases`, key occurrences inside the gloss are replaced: leftmost-longest, non-overlapping,
+    on word boundaries, found in one Aho–Corasick scan whatever the map size. Callers can turn
+    phrase replacement off per gloss (polish keeps it for glosses the classifier rates English).
+    """
+
+    def __init__(self, m: Dict[str, str], phrases: bool = True) -> None:
+        self.raw = m
+        self.folded: Dict[str, str] = {}
+        for k, v in m.items():
+            key = k.strip().casefold()
+            if key:
+                self.folded.setdefault(key, v)
+        self.exact_hits = 0
+        self.phrase_hits = 0
+        self._ac: AhoCorasick | None = None
+        if phrases and self.folded:
+            ac = AhoCorasick()
+            for key, v in self.folded.items():
+                ac.add(key, v)
+            self._ac = ac.build()
+
+    def __bool__(self) -> bool:
+        return bool(self.raw)
+
+    @property
+    def phrases(self) -> bool:
+        return self._ac is not None
+
+    def apply(self, text: str, phrases: bool = True) -> str:
+        if not text or not self.raw:
+            return text
+        hit = self.raw.get(text)
+        if hit is None:
+            hit = self.folded.get(text.strip().casefold())
+        if hit is not None:
+            self.exact_hits += 1
+            return hit
+        if self._ac is None or not phrases:
+            return text
+        folded, offsets = _fold_with_offsets(text)
+        matches = sorted(self._ac.iter_matches(folded), key=lambda m: (m[0], m[0] - m[1]))
+        out: List[str] = []
+        pos = 0  # in folded coordinates
+        last = 0  # in text coordinates
+        for start, end, value in matches:
+            if start < pos:
+                continue
+            if folded[start].isalnum() and start > 0 and folded[start - 1].isalnum():
+                continue
+            if folded[end - 1].isalnum() and end < len(folded) and folded[end].isalnum():
+                continue
+            a, b = (offsets[start], offsets[end]) if offsets else (start, end)
+            if text[a].isupper() and value[:1].islower():
+                value = value[0].upper() + value[1:]
+            out.append(text[last:a])
+            out.append(value)
+            last, pos = b, end
+            self.phrase_hits += 1
+        if not out:
+            return text
+        out.append(text[last:])
+        return "".join(out)
 
 
 def cmd_polish(args) -> int:
@@ -749,28 +1720,170 @@ def cmd_polish(args) -> int:
     if not run_dir or not run_dir.exists():
         print("No run directory found. Run 'python etl/cli.py wizard' first.", file=sys.stderr)
         return 2
-    merged_dir = run_dir / "merged"
+    t0, c0 = time.perf_counter(), time.process_time()
     out_dir = Path(args.out_dir) if args.out_dir else (run_dir / "polished")
-    fmap = _load_map(Path(args.map) if args.map else None)
+    # Compiled once: the case-folded index and the phrase automaton serve all three CSVs.
+    fmap = _PhraseMap(_load_map(Path(args.map) if args.map else None), phrases=not getattr(args, "no_phrases", False))
     total = 0
-    for name in CSV_FILES:
-        src = merged_dir / name
-        if not src.exists():
-            continue
-        headers, rows = _load_csv(src)
-        for rec in rows:
-            g = rec.get("gloss") or ""
-            g = _apply_map(g, fmap)
-            g = _shorten_gloss(g, args.max_chars)
-            rec["gloss"] = g
-        _write_csv(out_dir / name, headers, rows)
-        total += len(rows)
-        print(f"  Polished {name}: {len(rows)} rows (max {args.max_chars} chars)")
+    shortened = 0
+    english = 0
+    conn = _open_run_store(run_dir)
+    try:
+        for name, headers in _store_files(conn).items():
+            rows = list(_store_rows(conn, name))
+            glosses = [rec.get("gloss") or "" for rec in rows]
+            # Phrases are EN→FR: substituting inside glosses that are already French only risks false hits.
+            p_en = _english_scores(glosses) if fmap.phrases else [0.0] * len(rows)
+            for rec, g, p in zip(rows, glosses, p_en):
+                english += p >= 0.5
+                g = fmap.apply(g, phrases=p >= 0.5)
+                short = _shorten_gloss(g, args.max_chars)
+                shortened += short != g
+                rec["gloss"] = short
+            _write_csv(out_dir / name, headers, rows)
+            total += len(rows)
+            print(f"  Polished {name}: {len(rows)} rows (max {args.max_chars} chars)")
+    finally:
+        conn.close()
+    if fmap:
+        print(f"  Gloss map: {fmap.exact_hits} whole glosses replaced, {fmap.phrase_hits} phrases inside glosses")
+    _write_generator_index(out_dir)
     _copy_to_assets(out_dir)
     print("Copied polished CSVs into app assets. Use Debug → Reset database to reload.")
+    metrics = _stage_metrics([run_dir / RUN_STORE_NAME], [out_dir / name for name in CSV_FILES],
+                             time.perf_counter() - t0, time.process_time() - c0,
+                             {"rows_out": total, "glosses_shortened": shortened,
+                              "map_whole": fmap.exact_hits, "map_phrases": fmap.phrase_hits,
+                              "english_glosses": english})
+    _append_metrics(run_dir / METRICS_NAME, "polish", metrics)
     return 0
 
 
+def _latest_stage_metrics(run_dir: Path) -> Dict[str, Dict[str, object]]:
+    """Last recorded metrics per stage from a run's metrics.jsonl."""
+    out: Dict[str, Dict[str, object]] = {}
+    path = run_dir / METRICS_NAME
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    rec = json.loads(line)
+                    out[rec["stage"]] = rec
+    return out
+
+
+# metric -> smallest absolute increase worth reporting (filters timer noise on tiny runs)
+REGRESSION_FLOORS = {"wall_s": 0.5, "cpu_s": 0.5, "peak_rss_kb": 16 * 1024}
+
+
+def _metric_regressions(cur: Dict[str, Dict[str, object]], base: Dict[str, Dict[str, object]],
+                        tolerance: float = 0.2, floors: Dict[str, float] | None = None) -> List[str]:
+    """Metrics that grew by more than `tolerance` (relative) over the baseline.
+
+    `floors` maps each metric to check to its smallest reportable increase (default REGRESSION_FLOORS:
+    wall time, CPU time and peak RSS of the wizard stages).
+    """
+    found: List[str] = []
+    for stage, m in cur.items():
+        b = base.get(stage)
+        if not b:
+            continue
+        for key, floor in (REGRESSION_FLOORS if floors is None else floors).items():
+            new, old = m.get(key), b.get(key)
+            if new is None or old is None:
+                continue
+            if new - old > max(floor, tolerance * old):
+                found.append(f"{stage}.{key}: {old} → {new} (+{(new - old) / old:.0%})" if old else
+                             f"{stage}.{key}: {old} → {new}")
+    return found
+
+
+def cmd_metrics(args) -> int:
+    run_dir = ETL_DIR / "runs" / args.run if args.run else _latest_run_dir()
+    if not run_dir or not run_dir.exists():
+        print("No run directory found. Run 'python etl/cli.py wizard' first.", file=sys.stderr)
+        return 2
+    cur = _latest_stage_metrics(run_dir)
+    if not cur:
+        print(f"No metrics recorded in {run_dir / METRICS_NAME}", file=sys.stderr)
+        return 2
+    base = _latest_stage_metrics(ETL_DIR / "runs" / args.baseline) if args.baseline else {}
+    print(f"{'stage':<14} {'wall':>8} {'cpu':>8} {'in':>10} {'out':>10} {'lines/s':>10} {'peak RSS':>10}  dropped")
+    for stage, m in cur.items():
+        rss = m.get("peak_rss_kb")
+        dropped = ", ".join(f"{k}={v}" for k, v in (m.get("dropped") or {}).items())
+        print(f"{stage:<14} {m['wall_s']:>7.2f}s {m['cpu_s']:>7.2f}s {_fmt_bytes(m['bytes_in']):>10} "
+              f"{_fmt_bytes(m['bytes_out']):>10} {m.get('lines_per_s') or '':>10} "
+              f"{_fmt_bytes(rss * 1024) if rss else 'n/a':>10}  {dropped}")
+    if not args.baseline:
+        return 0
+    regressions = _metric_regressions(cur, base, args.tolerance)
+    for line in regressions:
+        print(f"[REGRESSION] {line}")
+    if not regressions:
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 1 if regressions else 0
+
+
+def cmd_shard_themes(args) -> int:
+    run_dir = ETL_DIR / "runs" / args.run if args.run else _latest_run_dir()
+    if not run_dir or not run_dir.exists():
+        print("No run directory found. Run 'python etl/cli.py wizard' first.", file=sys.stderr)
+        return 2
+    src_dir = run_dir / args.src
+    if not src_dir.exists():
+        print(f"Source CSVs not found: {src_dir}", file=sys.stderr)
+        return 2
+    out_dir = Path(args.out_dir) if args.out_dir else (run_dir / THEMES_DIR_NAME)
+    index = _shard_by_theme(src_dir, out_dir)
+    themes = index["themes"]
+    print(f"Wrote {len(themes)} theme shards to: {out_dir}")
+    for slug, meta in themes.items():
+        own = sum(v["rows"] for v in meta["files"].values())
+        refs = sum(len(v) for v in meta["refs"].values())
+        print(f"  {slug}: {own} rows, {refs} refs")
+    if args.to_assets:
+        dst_root = APP_SEED_DIR / THEMES_DIR_NAME
+        for path in sorted(out_dir.rglob("*")):
+            if path.is_file():
+                dst = dst_root / path.relative_to(out_dir)
+                _ensure_dir(dst.parent)
+                _sync_file(path, dst)
+        stale = _prune_shards(dst_root, index)
+        if stale:
+            print(f"Removed {len(stale)} stale shard(s) from {dst_root}")
+    return 0
+
+
+LANGID_MODEL_NAME = "langid.json"
+_LANGID: Dict[Path, Tuple[int, LangId | None]] = {}
+
+
+def _langid_model() -> LangId | None:
+    """Classifier trained by `train-langid` (etl/cache/langid.json), reloaded when the file changes."""
+    path = ETL_DIR / "cache" / LANGID_MODEL_NAME
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _LANGID.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, LangId.load(path))
+        _LANGID[path] = cached
+    return cached[1]
+
+
+def _english_scores(texts: List[str]) -> List[float]:
+    """P(English) per gloss, scored in one batch by the trained classifier.
+
+    The stopword heuristic below answers 0.0 or 1.0 without a model (see `train-langid`), and for
+    glosses too short for the model to judge ("study of", "fear of"), which are typical of affixes.
+    """
+    model = _langid_model()
+    probs = model.english_proba(texts) if model is not None else [None] * len(texts)
+    return [p if p is not None else (1.0 if _lang_hint_is_english(t) else 0.0) for t, p in zip(texts, probs)]
+
+
 def _lang_hint_is_english(text: str) -> bool:
     if not text:
         return False
@@ -787,41 +1900,114 @@ def _lang_hint_is_english(text: str) -> bool:
     return False
 
 
+AI_GROUPS_NAME = "groups.json"
+
+
+# Normalized glosses shorter than this carry no meaning to share ("", "-", "x"): never grouped
+MIN_GROUP_GLOSS_CHARS = 2
+
+
+def _gloss_key(kind: str, gloss: str, cand_id: str) -> str:
+    """Grouping key for AI candidates: same morph type and same gloss up to case, accents, punctuation, spacing.
+
+    Empty or near-empty glosses are keyed by candidate id, so unrelated forms never share an answer.
+    """
+    norm = " ".join(re.findall(r"[^\W_]+", _strip_accents(gloss.casefold())))
+    if len(norm) < MIN_GROUP_GLOSS_CHARS:
+        return f"{kind}#{cand_id}"
+    return f"{kind}:{norm}"
+
+
+def _group_candidates(candidates: List[Dict[str, str]]) -> List[List[Dict[str, str]]]:
+    """Group candidates by `_gloss_key`, keeping first-seen order; the first member represents the group."""
+    groups: Dict[str, List[Dict[str, str]]] = {}
+    for cand in candidates:
+        groups.setdefault(_gloss_key(cand["type"], cand["gloss"], cand["id"]), []).append(cand)
+    return list(groups.values())
+
+
+def _fan_out(resp: str, groups: Dict[str, List[str]]) -> List[str]:
+    """Copy the answer for a group representative to every member id; other answers pass through."""
+    out: List[str] = []
+    for obj in _ai_objects(resp):
+        members = groups.get(obj.get("id")) if isinstance(obj.get("id"), str) else None
+        for mid in members or [obj.get("id")]:
+            out.append(json.dumps({**obj, "id": mid}, ensure_ascii=False))
+    return out or [resp]
+
+
+def cmd_train_langid(args) -> int:
+    """Train the gloss language classifier from a run's raw dumps (FR extract vs enwiktionary glosses)."""
+    run_dir = ETL_DIR / "runs" / args.run if args.run else _latest_run_dir()
+    fr_path = Path(args.fr) if args.fr else (run_dir / "raw" / "fr-extract.jsonl.gz" if run_dir else None)
+    en_path = Path(args.en) if args.en else (run_dir / "raw" / "raw-enwiktionary.jsonl.gz" if run_dir else None)
+    for label, path in (("French", fr_path), ("English", en_path)):
+        if path is None or not path.exists():
+            print(f"[ERROR] No {label} dump found ({path or 'no run'}); pass --fr/--en or run the wizard without --fr-only.",
+                  file=sys.stderr)
+            return 2
+    t0 = time.perf_counter()
+    print(f"Sampling up to {args.max:,} glosses per language from {fr_path.name} and {en_path.name}…")
+    fr = gloss_texts(read_jsonl(str(fr_path), limit_lines=args.scan_lines), args.max, args.seed)
+    en = gloss_texts(read_jsonl(str(en_path), limit_lines=args.scan_lines), args.max, args.seed)
+    print(f"Training on {len(fr):,} French and {len(en):,} English glosses…")
+    try:
+        model, accuracy = LangId.train(fr, en)
+    except ValueError as ex:
+        print(f"[ERROR] {ex}", file=sys.stderr)
+        return 2
+    out = Path(args.out) if args.out else ETL_DIR / "cache" / LANGID_MODEL_NAME
+    model.save(out)
+    print(f"Held-out accuracy: {accuracy:.1%} ({time.perf_counter() - t0:.1f}s)")
+    print(f"Saved {out}")
+    return 0
+
+
 def cmd_prep_ai(args) -> int:
-    import random
     run_dir = ETL_DIR / "runs" / args.run if args.run else _latest_run_dir()
     if not run_dir or not run_dir.exists():
         print("No run directory found. Run 'python etl/cli.py wizard' first.", file=sys.stderr)
         return 2
-    merged_dir = run_dir / "merged"
     ai_dir = run_dir / "ai"
     _ensure_dir(ai_dir)
 
-    # Collect candidates from all CSVs
+    # Collect candidates from the run store (only the columns needed)
     candidates: List[Dict[str, str]] = []
-    for name in CSV_FILES:
-        path = merged_dir / name
-        if not path.exists():
-            continue
-        headers, rows = _load_csv(path)
-        typ = "prefix" if "prefixes" in name else ("suffix" if "suffixes" in name else "root")
-        for rec in rows:
-            gloss = (rec.get("gloss") or "").strip()
-            ety = (rec.get("ety_lang") or rec.get("root_lang") or "").strip()
-            if len(gloss) >= args.min_len or _lang_hint_is_english(gloss) or ety.lower() in {"mul", "en"}:
-                candidates.append({
-                    "id": rec.get("id") or "",
-                    "type": typ,
-                    "form": rec.get("form") or "",
-                    "gloss": gloss,
-                    "ety_lang": ety,
-                })
+    conn = _open_run_store(run_dir)
+    try:
+        cur = conn.execute(
+            "SELECT id, file, form, gloss, json_extract(data, '$.ety_lang') AS ety_lang,"
+            " json_extract(data, '$.root_lang') AS root_lang FROM rows ORDER BY file, ord")
+        recs = cur.fetchall()
+    finally:
+        conn.close()
+    glosses = [(rec["gloss"] or "").strip() for rec in recs]
+    threshold = getattr(args, "en_threshold", 0.5)
+    for rec, gloss, p_en in zip(recs, glosses, _english_scores(glosses)):
+        ety = (rec["ety_lang"] or rec["root_lang"] or "").strip()
+        if len(gloss) >= args.min_len or p_en >= threshold or ety.lower() in {"mul", "en"}:
+            candidates.append({
+                "id": rec["id"] or "",
+                "type": _csv_kind(rec["file"]),
+                "form": rec["form"] or "",
+                "gloss": gloss,
+                "ety_lang": ety,
+            })
     random.shuffle(candidates)
-    pick = candidates[: max(0, args.count)]
+    if args.no_group:
+        groups = [[c] for c in candidates]
+    else:
+        groups = _group_candidates(candidates)
+    groups = groups[: max(0, args.count)]
+    pick = [g[0] for g in groups]
     out_jsonl = ai_dir / "candidates.jsonl"
     with open(out_jsonl, "w", encoding="utf-8") as f:
         for obj in pick:
             f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+    fanout = {g[0]["id"]: [c["id"] for c in g] for g in groups if len(g) > 1}
+    with open(ai_dir / AI_GROUPS_NAME, "w", encoding="utf-8") as f:
+        json.dump(fanout, f, ensure_ascii=False, indent=2)
+        f.write("\n")
     # Write a prompt template file for convenience
     prompt = f"""
 You are helping refine morphological glosses for a French neologism generator (Neologotron).
@@ -847,12 +2033,111 @@ Guidelines:
 """.strip()
     with open(ai_dir / "prompt.txt", "w", encoding="utf-8") as f:
         f.write(prompt + "\n")
+    members = sum(len(g) for g in groups)
     print(f"Prepared {len(pick)} AI candidates:\n  {out_jsonl}\nPrompt template:\n  {ai_dir / 'prompt.txt'}")
+    if members > len(pick):
+        print(f"Grouped {members} rows by gloss: {members - len(pick)} model calls saved ({ai_dir / AI_GROUPS_NAME})")
     return 0
 
 
-def _ai_cache_key(text: str) -> str:
-    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+AI_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    created REAL NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_used ON entries(used);
+"""
+
+
+def _ai_cache_key(prompt: str, args) -> str:
+    """Cache key over the prompt and every parameter that changes the answer."""
+    ident = json.dumps([args.model, args.temperature, args.max_tokens, prompt], ensure_ascii=False)
+    return hashlib.sha256(ident.encode("utf-8")).hexdigest()
+
+
+class _AICache:
+    """Shared answer cache in SQLite (WAL), safe for several workers and several ai-run processes.
+
+    Entries older than `max_age` seconds are dropped; above `max_bytes` the least recently used go first
+    (0 disables either limit).
+    """
+
+    EVICT_EVERY = 256
+
+    def __init__(self, path: Path, max_bytes: int = 0, max_age: float = 0.0) -> None:
+        _ensure_dir(path.parent)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(AI_CACHE_SCHEMA)
+        self.evict()
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or (self.max_age > 0 and now - row[1] > self.max_age):
+                self.misses += 1
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE entries SET used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries(key, value, bytes, created, used) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, len(value.encode("utf-8")), now, now),
+                )
+            self._puts += 1
+            due = self._puts % self.EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def evict(self) -> int:
+        """Apply the age and size limits; returns the number of entries removed."""
+        removed = 0
+        with self._lock, self._conn:
+            if self.max_age > 0:
+                removed += self._conn.execute("DELETE FROM entries WHERE created < ?",
+                                              (time.time() - self.max_age,)).rowcount
+            if self.max_bytes > 0:
+                total = self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM entries").fetchone()[0]
+                if total > self.max_bytes:
+                    drop = []
+                    for key, size in self._conn.execute("SELECT key, bytes FROM entries ORDER BY used"):
+                        if total <= self.max_bytes:
+                            break
+                        drop.append((key,))
+                        total -= size
+                    self._conn.executemany("DELETE FROM entries WHERE key = ?", drop)
+                    removed += len(drop)
+        return removed
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            n, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM entries").fetchone()
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": n, "bytes": size}
+
+    def close(self) -> None:
+        self.evict()
+        with self._lock:
+            self._conn.close()
 
 
 def _ai_stream_request(endpoint: str, payload: Dict[str, object], timeout: float) -> Iterable[str]:
@@ -863,35 +2148,498 @@ def _ai_stream_request(endpoint: str, payload: Dict[str, object], timeout: float
             yield line.decode("utf-8", errors="ignore")
 
 
-def _ai_fetch(prompt: str, args, cache_dir: Path,
-              request_fn: Callable[[str, Dict[str, object], float], Iterable[str]] | None = None) -> str:
-    key = _ai_cache_key(prompt)
-    cache_path = cache_dir / f"{key}.txt"
-    if cache_path.exists():
-        return cache_path.read_text("utf-8")
-    if request_fn is None:
-        request_fn = _ai_stream_request
-    payload = {
+class _RateLimiter:
+    """Token bucket shared by worker threads: at most `rate` acquisitions per second (0 = unlimited)."""
+
+    def __init__(self, rate: float) -> None:
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + 1.0 / self.rate
+        if wait > 0:
+            with tracing.span("rate_limit", "ai"):
+                time.sleep(wait)
+
+
+def _ai_retryable(ex: BaseException) -> bool:
+    if isinstance(ex, HTTPError):
+        return ex.code == 429 or ex.code >= 500
+    return isinstance(ex, (URLError, HTTPException, TimeoutError, ConnectionError))
+
+
+def _ai_chunk_text(line: str, usage: Dict[str, int] | None = None) -> str | None:
+    """Text carried by one streamed line: SSE `data:` events and NDJSON envelopes (OpenAI completions/chat,
+    Ollama generate/chat) are unwrapped; anything else is taken verbatim. None marks the end of the stream.
+    Token counts reported by the server are copied into `usage` when given.
+    """
+    body = line.strip()
+    if body.startswith("data:"):
+        body = body[5:].strip()
+        if body == "[DONE]":
+            return None
+    elif not body or body.startswith(":") or body.startswith("event:"):
+        return ""
+    try:
+        obj = json.loads(body)
+    except ValueError:
+        return line
+    if not isinstance(obj, dict):
+        return line
+    if usage is not None:
+        counts = obj.get("usage") if isinstance(obj.get("usage"), dict) else {}
+        for key, src in (("prompt_tokens", "prompt_eval_count"), ("completion_tokens", "eval_count")):
+            n = counts.get(key, obj.get(src))
+            if isinstance(n, int):
+                usage[key] = n
+    choices = obj.get("choices")
+    if isinstance(choices, list):
+        ch = choices[0] if choices and isinstance(choices[0], dict) else {}
+        delta = ch.get("delta") if isinstance(ch.get("delta"), dict) else ch.get("message")
+        text = ch.get("text") if "text" in ch else (delta or {}).get("content")
+        return text or ""
+    if "response" in obj and isinstance(obj["response"], str):
+        return obj["response"]
+    if isinstance(obj.get("message"), dict):
+        return obj["message"].get("content") or ""
+    return line
+
+
+class _AICalls:
+    """Per-call telemetry shared by worker threads: cache hits and model requests with their latency,
+    time to first token, bytes, tokens, retries and early stops.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.calls: List[Dict[str, object]] = []
+
+    def record(self, **fields) -> None:
+        with self._lock:
+            self.calls.append(fields)
+
+
+def _ai_read_stream(chunks: Iterable[str], expect: set | None = None,
+                    usage: Dict[str, int] | None = None) -> Tuple[str, float | None, bool]:
+    """Accumulate streamed text; stop as soon as a complete JSON object exists for every expected id.
+
+    An object that does not decode is awaited until a later line starts with "{": it is then taken
+    as malformed (e.g. an unterminated fragment) and scanning resumes on that line.
+    Returns (text, seconds to first token or None, stopped early).
+    """
+    start = time.perf_counter()
+    ttft = None
+    parts: List[str] = []
+    text = ""
+    found: set = set()
+    scan = 0
+    dec = json.JSONDecoder()
+    try:
+        for raw in chunks:
+            piece = _ai_chunk_text(raw, usage)
+            if piece is None:
+                break
+            if not piece:
+                continue
+            if ttft is None:
+                ttft = time.perf_counter() - start
+            parts.append(piece)
+            if not expect or "}" not in piece:
+                continue
+            text = "".join(parts)
+            i = text.find("{", scan)
+            while i != -1:
+                try:
+                    obj, end = dec.raw_decode(text, i)
+                except ValueError:
+                    nxt = text.find("\n{", i)
+                    if nxt == -1:
+                        break  # incomplete: wait for more text
+                    scan = i = nxt + 1  # malformed: the model moved on to the next object
+                    continue
+                if isinstance(obj, dict) and obj.get("id") in expect:
+                    found.add(obj["id"])
+                scan = end
+                i = text.find("{", end)
+            if found >= expect:
+                return text[:scan], ttft, True
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+    return "".join(parts), ttft, False
+
+
+def _ai_request(request_fn: Callable[[str, Dict[str, object], float], Iterable[str]], args,
+                payload: Dict[str, object], limiter: _RateLimiter | None = None,
+                expect: set | None = None, calls: _AICalls | None = None) -> str:
+    """Send one request with rate limiting and retries (exponential backoff with jitter).
+
+    The stream is parsed as it arrives and closed once every id in `expect` has a complete answer.
+    """
+    retries = max(0, int(getattr(args, "retries", 0) or 0))
+    backoff = float(getattr(args, "backoff", 0.5) or 0.0)
+    attempt = 0
+    while True:
+        if limiter is not None:
+            limiter.acquire()
+        start = time.perf_counter()
+        usage: Dict[str, int] = {}
+        try:
+            with tracing.span("ai_request", "ai", items=len(expect or ()), attempt=attempt) as span:
+                text, ttft, early = _ai_read_stream(request_fn(args.endpoint, payload, args.timeout), expect, usage)
+                span.update(ttft_ms=round(ttft * 1000, 1) if ttft is not None else None, early_stop=early)
+        except Exception as ex:
+            if attempt >= retries or not _ai_retryable(ex):
+                if calls is not None:  # failed calls (and the retries they used) count too
+                    calls.record(cache="miss", ids=sorted(expect or ()), ttft=None, latency=time.perf_counter() - start,
+                                 early_stop=False, retries=attempt, bytes=0, error=type(ex).__name__,
+                                 prompt_tokens=_approx_tokens(str(payload["prompt"])), completion_tokens=0,
+                                 tokens_estimated=True)
+                raise
+            delay = backoff * (2 ** attempt) * (1.0 + random.random() * 0.25)
+            print(f"[WARN] AI request failed ({ex}); retry {attempt + 1}/{retries} in {delay:.1f}s", file=sys.stderr)
+            with tracing.span("retry_backoff", "ai", error=str(ex)[:200]):
+                time.sleep(delay)
+            attempt += 1
+            continue
+        if calls is not None:
+            calls.record(cache="miss", ids=sorted(expect or ()), ttft=ttft, latency=time.perf_counter() - start,
+                         early_stop=early, retries=attempt, bytes=len(text.encode("utf-8")),
+                         prompt_tokens=usage.get("prompt_tokens", _approx_tokens(str(payload["prompt"]))),
+                         completion_tokens=usage.get("completion_tokens", _approx_tokens(text)),
+                         tokens_estimated=not usage)
+        return text
+
+
+def _ai_cache_get(cache: _AICache, prompt: str, args) -> str | None:
+    return cache.get(_ai_cache_key(prompt, args))
+
+
+def _ai_cache_put(cache: _AICache, prompt: str, args, text: str) -> None:
+    cache.put(_ai_cache_key(prompt, args), text)
+
+
+def _ai_payload(prompt: str, args, max_tokens: int | None = None) -> Dict[str, object]:
+    return {
         "model": args.model,
         "prompt": prompt,
         "temperature": args.temperature,
-        "max_tokens": args.max_tokens,
+        "max_tokens": args.max_tokens if max_tokens is None else max_tokens,
         "stream": True,
     }
-    text = "".join(request_fn(args.endpoint, payload, args.timeout))
-    cache_path.write_text(text, encoding="utf-8")
+
+
+def _ai_fetch(prompt: str, args, cache: _AICache,
+              request_fn: Callable[[str, Dict[str, object], float], Iterable[str]] | None = None,
+              limiter: _RateLimiter | None = None, calls: _AICalls | None = None) -> str:
+    cid = _candidate_id(prompt.rsplit("\n", 1)[-1])
+    cached = _ai_cache_get(cache, prompt, args)
+    if cached is not None:
+        tracing.instant("cache_hit", "ai", id=cid)
+        if calls is not None:
+            calls.record(cache="hit", ids=[cid] if cid else [], bytes=len(cached.encode("utf-8")))
+        return cached
+    if request_fn is None:
+        request_fn = _ai_stream_request
+    text = _ai_request(request_fn, args, _ai_payload(prompt, args), limiter, {cid} if cid else None, calls)
+    _ai_cache_put(cache, prompt, args, text)
     return text
 
 
-def _process_ai_batch(batch: List[str], tmpl: str, args, cache_dir: Path) -> List[str]:
-    out: List[str] = []
-    for line in batch:
+def _ai_objects(text: str) -> Iterable[Dict[str, object]]:
+    """Yield every top-level JSON object found in text (JSONL, fenced blocks or prose around them)."""
+    dec = json.JSONDecoder()
+    i = text.find("{")
+    while i != -1:
+        try:
+            obj, end = dec.raw_decode(text, i)
+        except ValueError:
+            i = text.find("{", i + 1)
+            continue
+        if isinstance(obj, dict):
+            yield obj
+        i = text.find("{", end)
+
+
+def _candidate_id(line: str) -> str | None:
+    try:
+        cid = json.loads(line).get("id")
+    except (ValueError, AttributeError):
+        return None
+    return cid if isinstance(cid, str) and cid else None
+
+
+def _approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _pack_groups(lines: Iterable[str], size: int, token_budget: int = 0,
+                 base_tokens: int = 0) -> Iterable[List[str]]:
+    """Group candidate lines: at most `size` per group (0 = no limit) and, if set, `token_budget` estimated tokens."""
+    group: List[str] = []
+    used = base_tokens
+    for line in lines:
+        cost = _approx_tokens(line)
+        if group and ((size > 0 and len(group) >= size) or (token_budget > 0 and used + cost > token_budget)):
+            yield group
+            group, used = [], base_tokens
+        group.append(line)
+        used += cost
+    if group:
+        yield group
+
+
+def _ai_fetch_packed(lines: List[str], tmpl: str, args, cache: _AICache,
+                     request_fn: Callable[[str, Dict[str, object], float], Iterable[str]] | None = None,
+                     limiter: _RateLimiter | None = None, calls: _AICalls | None = None) -> List[str]:
+    """Answer several candidates with one prompt; cache entries stay per item (keyed on the single-item prompt).
+
+    Candidates whose id is missing or malformed in the packed answer are retried on their own.
+    """
+    if request_fn is None:
+        request_fn = _ai_stream_request
+    results: List[str | None] = [None] * len(lines)
+    misses: List[int] = []
+    for i, line in enumerate(lines):
+        cached = _ai_cache_get(cache, f"{tmpl}\n{line}", args)
+        if cached is not None:
+            results[i] = cached.strip()
+            cid = _candidate_id(line)
+            tracing.instant("cache_hit", "ai", id=cid)
+            if calls is not None:
+                calls.record(cache="hit", ids=[cid] if cid else [], bytes=len(cached.encode("utf-8")))
+        else:
+            misses.append(i)
+    if len(misses) > 1:
+        prompt = tmpl + "\n" + "\n".join(lines[i] for i in misses)
+        expect = {cid for cid in (_candidate_id(lines[i]) for i in misses) if cid}
+        payload = _ai_payload(prompt, args, args.max_tokens * len(misses))
+        try:
+            text = _ai_request(request_fn, args, payload, limiter, expect, calls)
+        except Exception as ex:
+            print(f"[WARN] packed AI request failed ({ex}); retrying {len(misses)} items one by one", file=sys.stderr)
+            text = ""
+        by_id: Dict[str, str] = {}
+        for obj in _ai_objects(text):
+            cid = obj.get("id")
+            if isinstance(cid, str) and cid not in by_id:
+                by_id[cid] = json.dumps(obj, ensure_ascii=False)
+        for i in misses:
+            got = by_id.get(_candidate_id(lines[i]) or "")
+            if got is not None:
+                results[i] = got
+                _ai_cache_put(cache, f"{tmpl}\n{lines[i]}", args, got)
+    for i in misses:
+        if results[i] is None:
+            results[i] = _ai_fetch(f"{tmpl}\n{lines[i]}", args, cache, request_fn, limiter, calls).strip()
+    return [r or "" for r in results]
+
+
+def _ordered_map(fn: Callable[[object], object], items: Iterable[object], pool: ThreadPoolExecutor | None,
+                 window: int) -> Iterable[object]:
+    """Apply fn with at most `window` calls in flight; results come back in input order."""
+    if pool is None:
+        for it in items:
+            yield fn(it)
+        return
+    inflight: deque = deque()
+
+    def _next() -> object:
+        fut = inflight.popleft()
+        if fut.done():
+            return fut.result()
+        with tracing.span("wait_result", "pool", inflight=len(inflight) + 1):  # consumer stalled on the oldest call
+            return fut.result()
+
+    for it in items:
+        inflight.append(pool.submit(fn, it))
+        tracing.counter("pool inflight", calls=len(inflight))
+        if len(inflight) >= window:
+            yield _next()
+    while inflight:
+        yield _next()
+
+
+def _ai_responses(lines: Iterable[str], tmpl: str, args, cache: _AICache,
+                  pool: ThreadPoolExecutor | None = None, limiter: _RateLimiter | None = None,
+                  calls: _AICalls | None = None) -> Iterable[str]:
+    """Fetch one response per candidate line, in input order; failed requests yield "".
+
+    With `args.pack` > 1 or `args.pack_tokens` set, candidates are packed several to a prompt.
+    """
+    def _one(line: str) -> str:
         prompt = f"{tmpl}\n{line}"
-        resp = _ai_fetch(prompt, args, cache_dir)
-        resp = resp.strip()
-        if resp:
-            out.append(resp)
-    return out
+        try:
+            return _ai_fetch(prompt, args, cache, limiter=limiter, calls=calls).strip()
+        except Exception as ex:
+            print(f"[WARN] AI request gave up for {line[:60]}: {ex}", file=sys.stderr)
+            return ""
+
+    def _group(group: List[str]) -> List[str]:
+        try:
+            return _ai_fetch_packed(group, tmpl, args, cache, limiter=limiter, calls=calls)
+        except Exception:
+            return [_one(line) for line in group]
+
+    window = max(1, int(getattr(args, "concurrency", 1) or 1)) * 2
+    pack = max(1, int(getattr(args, "pack", 1) or 1))
+    pack_tokens = int(getattr(args, "pack_tokens", 0) or 0)
+    if pack == 1 and pack_tokens <= 0:
+        return _ordered_map(_one, lines, pool, window)
+    size = pack if pack > 1 else 0
+    groups = _pack_groups(lines, size, pack_tokens, _approx_tokens(tmpl))
+    return (resp for batch in _ordered_map(_group, groups, pool, window) for resp in batch)
+
+
+def _iter_candidate_lines(path: Path) -> Iterable[str]:
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+
+AI_CHECKPOINT_NAME = "checkpoint.txt"
+AI_LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0)
+
+
+def _percentile(values: List[float], q: float) -> float | None:
+    """Nearest-rank percentile of an ascending list."""
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, int(-(-q * len(values) // 100)) - 1))]
+
+
+def _ai_metrics(records: List[Dict[str, object]], wall: float) -> Dict[str, object]:
+    """Aggregate per-call telemetry into the summary written to ai/metrics.json."""
+    reqs = [r for r in records if r.get("cache") == "miss"]
+    failed = [r for r in reqs if r.get("error")]
+    hits = len(records) - len(reqs)
+    lats = sorted(float(r["latency"]) for r in reqs)
+    ttfts = sorted(float(r["ttft"]) for r in reqs if r.get("ttft") is not None)
+    hist = [0] * (len(AI_LATENCY_BUCKETS) + 1)
+    for lat in lats:
+        hist[next((i for i, b in enumerate(AI_LATENCY_BUCKETS) if lat <= b), len(AI_LATENCY_BUCKETS))] += 1
+    prompt_tokens = sum(int(r.get("prompt_tokens", 0)) for r in reqs)
+    completion_tokens = sum(int(r.get("completion_tokens", 0)) for r in reqs)
+    return {
+        "wall_s": round(wall, 3),
+        "lookups": len(records),
+        "cache_hits": hits,
+        "requests": len(reqs),
+        "hit_rate": hits / len(records) if records else 0.0,
+        "items_per_request": sum(len(r.get("ids", [])) for r in reqs) / len(reqs) if reqs else 0.0,
+        "latency_s": {q: _percentile(lats, p) for q, p in (("p50", 50), ("p90", 90), ("p99", 99), ("max", 100))},
+        "ttft_s": {q: _percentile(ttfts, p) for q, p in (("p50", 50), ("p99", 99))},
+        "latency_histogram": {"le": list(AI_LATENCY_BUCKETS) + ["inf"], "count": hist},
+        "tokens": {"prompt": prompt_tokens, "completion": completion_tokens,
+                   "estimated": any(r.get("tokens_estimated") for r in reqs),
+                   "completion_per_s": completion_tokens / sum(lats) if lats and sum(lats) > 0 else 0.0},
+        "bytes": sum(int(r.get("bytes", 0)) for r in records),
+        "retries": sum(int(r.get("retries", 0)) for r in reqs),
+        "failed": len(failed),
+        "errors": dict(Counter(str(r["error"]) for r in failed).most_common()),
+        "early_stops": sum(1 for r in reqs if r.get("early_stop")),
+    }
+
+
+def _print_ai_metrics(m: Dict[str, object]) -> None:
+    def _s(v):
+        return "n/a" if v is None else f"{v:.2f}s"
+    lat, ttft, tok = m["latency_s"], m["ttft_s"], m["tokens"]
+    approx = " (estimated)" if tok["estimated"] else ""
+    rows = [
+        ("lookups", f"{m['lookups']}  ({m['cache_hits']} cache hits, {m['hit_rate']:.0%})"),
+        ("requests", f"{m['requests']}  ({m['items_per_request']:.1f} items each, {m['retries']} retries, "
+                     f"{m['early_stops']} early stops)"),
+        ("failed", f"{m['failed']}" + (f"  ({', '.join(f'{k}: {n}' for k, n in m['errors'].items())})"
+                                       if m["errors"] else "")),
+        ("latency", f"p50 {_s(lat['p50'])}  p90 {_s(lat['p90'])}  p99 {_s(lat['p99'])}  max {_s(lat['max'])}"),
+        ("first token", f"p50 {_s(ttft['p50'])}  p99 {_s(ttft['p99'])}"),
+        ("tokens", f"{tok['prompt']} prompt, {tok['completion']} completion{approx}, "
+                   f"{tok['completion_per_s']:.1f}/s generated"),
+        ("bytes", _fmt_bytes(m["bytes"])),
+        ("wall", _fmt_eta(m["wall_s"])),
+    ]
+    print("AI run metrics:")
+    for name, value in rows:
+        print(f"  {name:<12} {value}")
+
+
+def _append_synced(f, lines: Iterable[str]) -> None:
+    """Append lines and fsync, so everything before a crash or Ctrl-C is on disk."""
+    for line in lines:
+        f.write(line + "\n")
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def _resume_ai_output(ai_dir: Path, groups: Dict[str, List[str]]) -> set:
+    """Return the checkpointed candidate ids and drop output lines that belong to any other candidate
+    (answers written just before a crash, or a torn last line).
+    """
+    ckpt = ai_dir / AI_CHECKPOINT_NAME
+    done = set(ckpt.read_text("utf-8").split()) if ckpt.exists() else set()
+    out_path = ai_dir / "output.jsonl"
+    if not out_path.exists():
+        return done
+    owner = {mid: rep for rep, members in groups.items() for mid in members}
+    keep: List[str] = []
+    with out_path.open("r", encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                continue
+            try:
+                oid = json.loads(line).get("id")
+            except (ValueError, AttributeError):
+                continue
+            if owner.get(oid, oid) in done:
+                keep.append(line)
+    tmp = out_path.with_name(out_path.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        f.writelines(keep)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, out_path)
+    return done
+
+
+class _ProgressLine:
+    """Single redrawn status line: completed/remaining, throughput and ETA."""
+
+    def __init__(self, label: str, total: int) -> None:
+        self.label = label
+        self.total = total
+        self.start = time.time()
+        self.last_draw = 0.0
+        self.line_len = 0
+
+    def update(self, done: int, force: bool = False) -> None:
+        now = time.time()
+        if not force and now - self.last_draw < 0.25:
+            return
+        elapsed = now - self.start
+        rate = done / elapsed if elapsed > 0 else 0.0
+        remain = max(0, self.total - done)
+        eta = _fmt_eta(remain / rate if rate > 0 else 0)
+        msg = f"  {self.label} {done}/{self.total} done, {remain} left  at {rate:.1f}/s  ETA {eta}"
+        pad = max(0, self.line_len - len(msg))
+        sys.stdout.write("\r" + msg + (" " * pad))
+        sys.stdout.flush()
+        self.line_len = len(msg)
+        self.last_draw = now
+
+    def finish(self, done: int) -> None:
+        self.update(done, force=True)
+        sys.stdout.write("\n")
+        sys.stdout.flush()
 
 
 def cmd_ai_run(args) -> int:
@@ -905,39 +2653,269 @@ def cmd_ai_run(args) -> int:
     if not cand_path.exists() or not prompt_path.exists():
         print("AI candidates or prompt not found. Run 'python etl/cli.py prep-ai' first.", file=sys.stderr)
         return 2
-    cache_dir = ai_dir / "cache"
-    _ensure_dir(cache_dir)
     template = prompt_path.read_text("utf-8").strip()
     out_path = ai_dir / "output.jsonl"
-    out_lines: List[str] = []
-    batch: List[str] = []
-    with cand_path.open("r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            batch.append(line)
-            if len(batch) >= args.batch:
-                out_lines.extend(_process_ai_batch(batch, template, args, cache_dir))
-                batch = []
-        if batch:
-            out_lines.extend(_process_ai_batch(batch, template, args, cache_dir))
-    with out_path.open("w", encoding="utf-8") as out:
-        for l in out_lines:
-            out.write(l + "\n")
+    ckpt_path = ai_dir / AI_CHECKPOINT_NAME
+    groups_path = ai_dir / AI_GROUPS_NAME
+    groups = json.loads(groups_path.read_text("utf-8")) if groups_path.exists() else {}
+    if args.resume:
+        done = _resume_ai_output(ai_dir, groups)
+    else:
+        done = set()
+        out_path.write_text("", encoding="utf-8")
+        ckpt_path.write_text("", encoding="utf-8")
+    # Completed candidates are skipped before any cache lookup or request.
+    todo = [l for l in _iter_candidate_lines(cand_path) if (_candidate_id(l) or l) not in done]
+    if done:
+        print(f"Resuming: {len(done)} candidates already done, {len(todo)} left")
+    pending: deque = deque()
+
+    def _feed() -> Iterable[str]:
+        for line in todo:
+            pending.append(_candidate_id(line) or line)
+            yield line
+
+    cache = _AICache(Path(args.cache) if args.cache else AI_CACHE_PATH,
+                     max_bytes=int(args.cache_max_mb * 1024 * 1024),
+                     max_age=args.cache_max_age_days * 86400.0)
+    fanned = 0
+    failed = 0
+    finished = 0
+    concurrency = max(1, args.concurrency)
+    limiter = _RateLimiter(args.rps)
+    calls = _AICalls()
+    progress = _ProgressLine("AI", len(todo))
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ai") if concurrency > 1 else None
+    try:
+        with out_path.open("a", encoding="utf-8") as out, ckpt_path.open("a", encoding="utf-8") as ckpt:
+            for resp in _ai_responses(_feed(), template, args, cache, pool, limiter, calls):
+                cid = pending.popleft()
+                finished += 1
+                if resp:
+                    lines = _fan_out(resp, groups) if groups else [resp]
+                    fanned += len(lines) - 1
+                    _append_synced(out, lines)
+                    _append_synced(ckpt, [cid])
+                else:
+                    failed += 1
+                progress.update(finished)
+        progress.finish(finished)
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+        stats = cache.stats()
+        cache.close()
+        with (ai_dir / "calls.jsonl").open("w", encoding="utf-8") as f:
+            for call in calls.calls:
+                f.write(json.dumps(call) + "\n")
+        metrics = _ai_metrics(calls.calls, time.time() - progress.start)
+        metrics["cache"] = stats
+        metrics["concurrency"] = concurrency
+        metrics["pack"] = getattr(args, "pack", 1)
+        with (ai_dir / "metrics.json").open("w", encoding="utf-8") as f:
+            json.dump(metrics, f, indent=2)
+            f.write("\n")
     print(f"Wrote AI output: {out_path}")
+    if failed:
+        print(f"{failed} candidates failed; rerun with --resume to retry only those")
+    if fanned:
+        print(f"Fanned out shared-gloss answers: {fanned} rows answered without their own call")
+    if calls.calls:
+        _print_ai_metrics(metrics)
+        print(f"  (per call: {ai_dir / 'calls.jsonl'}, summary: {ai_dir / 'metrics.json'})")
+    print(f"Cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%}); "
+          f"{stats['entries']} entries, {_fmt_bytes(stats['bytes'])} in {cache.path}")
     return 0
 
 
+STAGES_MEMO_NAME = "stages.json"
+METRICS_NAME = "metrics.jsonl"
+TRACE_NAME = "trace.json"
+STAGE_HASH_LIMIT = 64 * 1024 * 1024  # larger inputs (raw dumps) are identified by size + mtime instead
+
+
+def _path_sig(path: Path) -> str | None:
+    """Identity of a stage input: content hash for files up to STAGE_HASH_LIMIT, else size and mtime."""
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    if st.st_size <= STAGE_HASH_LIMIT:
+        return _file_sha256(path)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def _stage_metrics(inputs: Iterable[Path], outputs: Iterable[Path], wall: float, cpu: float,
+                   extra: Dict[str, object] | None = None) -> Dict[str, object]:
+    """Combine measured wall/CPU time, file sizes and peak RSS with what the stage itself reported
+    (lines_in, rows_out, dropped per reason, or a subprocess's cpu_s / peak_rss_kb).
+    """
+    extra = dict(extra or {})
+    extra.pop("wall_s", None)
+    rss = [v for v in (peak_rss_kb(), extra.pop("peak_rss_kb", None)) if v is not None]
+    m: Dict[str, object] = {
+        "wall_s": round(wall, 3),
+        "cpu_s": round(cpu + float(extra.pop("cpu_s", 0.0) or 0.0), 3),
+        "bytes_in": sum(p.stat().st_size for p in inputs if p.exists()),
+        "bytes_out": sum(p.stat().st_size for p in outputs if p.exists()),
+        "peak_rss_kb": max(rss) if rss else None,
+    }
+    for key in ("bytes_in", "bytes_out"):  # a stage's own count excludes side inputs (scripts, policy files)
+        if extra.get(key):
+            m[key] = extra[key]
+        extra.pop(key, None)
+    m.update(extra)
+    if isinstance(m.get("dropped"), dict):
+        m["dropped"] = {k: v for k, v in m["dropped"].items() if v}
+    if m.get("lines_in") and wall > 0:
+        m["lines_per_s"] = round(float(m["lines_in"]) / wall, 1)
+    return m
+
+
+def _append_metrics(path: Path, stage: str, metrics: Dict[str, object]) -> None:
+    """Append one stage record to a run's metrics.jsonl."""
+    rec = {"run": path.parent.name, "stage": stage, "ts": datetime.now().isoformat(timespec="seconds"), **metrics}
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+
+class _Stage:
+    """One pipeline step. It runs once every stage in `deps` is done, and is skipped when the hash of its
+    inputs and params matches the last successful run and all its outputs still exist. Stages without
+    outputs always run. `fn` may return a dict of metrics (lines_in, rows_out, dropped, ...).
+    """
+
+    def __init__(self, name: str, fn: Callable[[], object], deps: Iterable[str] = (),
+                 inputs: Iterable[Path] = (), outputs: Iterable[Path] = (),
+                 params: Dict[str, object] | None = None) -> None:
+        self.name = name
+        self.fn = fn
+        self.deps = list(deps)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = params or {}
+
+    def key(self) -> str:
+        ident = {"params": self.params, "inputs": {str(p): _path_sig(p) for p in self.inputs}}
+        return hashlib.sha256(json.dumps(ident, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def up_to_date(self, memo: Dict[str, object] | None, key: str) -> bool:
+        return bool(memo and self.outputs and memo.get("key") == key and all(p.exists() for p in self.outputs))
+
+
+def _run_stages(stages: List[_Stage], memo_path: Path, jobs: int = 1,
+                metrics_path: Path | None = None,
+                profiler: StageProfiler | None = None) -> Dict[str, Dict[str, object]]:
+    """Run stages in dependency order, up to `jobs` at a time; returns {name: {"status", "seconds", "metrics"}}.
+
+    Keys of finished stages are saved to `memo_path` as they complete, so an interrupted run resumes where it stopped.
+    Metrics of stages that ran are also appended to `metrics_path` (JSON lines) when given.
+    An enabled `profiler` forces one stage at a time, since its reports are per stage.
+    """
+    try:
+        memo: Dict[str, Dict[str, object]] = json.loads(memo_path.read_text("utf-8"))
+    except (FileNotFoundError, ValueError):
+        memo = {}
+    known = {st.name for st in stages}
+    for st in stages:
+        missing = [d for d in st.deps if d not in known]
+        if missing:
+            raise ValueError(f"stage {st.name} depends on unknown stage(s): {', '.join(missing)}")
+    profiler = profiler or StageProfiler(None)
+    jobs = 1 if profiler.enabled else max(1, jobs)
+    quiet = jobs > 1
+    pending = list(stages)
+    running: Dict[object, Tuple[_Stage, str]] = {}
+    report: Dict[str, Dict[str, object]] = {}
+
+    def _exec(stage: _Stage, submitted: float) -> Dict[str, object]:
+        _STAGE_LOCAL.quiet = quiet
+        t0 = time.perf_counter()
+        c0 = time.thread_time()
+        with tracing.span(stage.name, "stage", queued_ms=round((t0 - submitted) * 1000, 1)), \
+                profiler.stage(stage.name):
+            result = stage.fn()
+        wall = time.perf_counter() - t0
+        extra = result if isinstance(result, dict) else None
+        return _stage_metrics(stage.inputs, stage.outputs, wall, time.thread_time() - c0, extra)
+
+    def _save() -> None:
+        tmp = memo_path.with_name(memo_path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(memo, f, indent=2)
+            f.write("\n")
+        os.replace(tmp, memo_path)
+
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="stage") as pool:
+        try:
+            while pending or running:
+                launched = True
+                while launched and len(running) < jobs:
+                    launched = False
+                    for stage in list(pending):
+                        if len(running) >= jobs:
+                            break
+                        if any(d not in report for d in stage.deps):
+                            continue
+                        pending.remove(stage)
+                        launched = True
+                        key = stage.key()
+                        if stage.up_to_date(memo.get(stage.name), key):
+                            print(f"= {stage.name}: up to date, skipped")
+                            tracing.instant(f"{stage.name} skipped", "stage")
+                            report[stage.name] = {"status": "skipped", "seconds": 0.0}
+                            continue
+                        print(f"▶ {stage.name}")
+                        running[pool.submit(_exec, stage, time.perf_counter())] = (stage, key)
+                if not running:
+                    break
+                tracing.counter("stages", running=len(running), pending=len(pending))
+                with tracing.span("wait_stages", "scheduler", running=",".join(st.name for st, _ in running.values())):
+                    finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    stage, key = running.pop(fut)
+                    metrics = fut.result()
+                    seconds = float(metrics["wall_s"])
+                    print(f"✓ {stage.name} ({_fmt_eta(seconds)})")
+                    report[stage.name] = {"status": "ran", "seconds": round(seconds, 3), "metrics": metrics}
+                    if metrics_path is not None:
+                        _append_metrics(metrics_path, stage.name, metrics)
+                    if stage.outputs:
+                        memo[stage.name] = {"key": key, "seconds": round(seconds, 3)}
+                        _save()
+        except BaseException:
+            for fut in running:
+                fut.cancel()
+            raise
+    return report
+
+
 def wizard(args=None) -> int:
     print("Neologotron ETL Wizard — guided end-to-end setup")
     print("This will: download FR + Translingual dumps, transform, merge, and export to the app.")
-    url_fr = _prompt(DEFAULT_URL_FR, "Enter French (fr) extract URL if changed")
-    url_all = None if (args and args.fr_only) else _prompt(DEFAULT_URL_ALL_RAW, "Enter 'All languages raw' URL (for mul) if changed")
+    fr_only = bool(args and args.fr_only)
 
-    # Prepare run directory
-    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    # Prepare run directory (an existing one is resumed: up-to-date stages are skipped)
+    stamp = (args.run if args and getattr(args, "run", None) else None) or datetime.now().strftime("%Y%m%d-%H%M%S")
     run_dir = ETL_DIR / "runs" / stamp
+    prev: Dict[str, object] = {}
+    if (run_dir / "run.json").exists():
+        prev = json.loads((run_dir / "run.json").read_text("utf-8"))
+        print(f"Resuming run {stamp}")
+    assume_yes = bool(args and getattr(args, "yes", False))
+
+    def _ask(given: str | None, default: str, question: str) -> str:
+        # URLs given as flags, or --yes, skip the prompt (non-interactive runs)
+        if given:
+            return given
+        return default if assume_yes else _prompt(default, question)
+
+    url_fr = _ask(args and getattr(args, "fr_url", None), prev.get("fr_url") or DEFAULT_URL_FR,
+                  "Enter French (fr) extract URL if changed")
+    url_all = None if fr_only else _ask(args and getattr(args, "all_url", None),
+                                        prev.get("all_raw_url") or DEFAULT_URL_ALL_RAW,
+                                        "Enter 'All languages raw' URL (for mul) if changed")
+    assets_dir = Path(args.assets_dir) if args and getattr(args, "assets_dir", None) else None
     raw_dir = run_dir / "raw"
     out_fr = run_dir / "csv_fr"
     out_mul = run_dir / "csv_mul"
@@ -952,46 +2930,109 @@ def wizard(args=None) -> int:
     except FileNotFoundError:
         short_policy = {}
 
-    # 1) Download
     fr_path = raw_dir / "fr-extract.jsonl.gz"
     all_path = raw_dir / "raw-enwiktionary.jsonl.gz"
-    _download(url_fr, fr_path)
-    if not (args and args.fr_only):
-        _download(url_all, all_path)
-
-    # 2) Filter Translingual
-    mul_path = None
-    if not (args and args.fr_only):
-        mul_path = raw_dir / "mul-extract.jsonl.gz"
-        _filter_mul_lines(all_path, mul_path)
-
-    # 3) Transform
-    _run_transform(fr_path, out_fr, lang="fr", include_translingual=False, origin_filter="classical")
-    _apply_short_prefix_policy(out_fr, short_policy)
-    if not (args and args.fr_only):
-        _run_transform(mul_path, out_mul, lang="fr", include_translingual=True,
-                       roots_from_translingual=True, mul_fallback_classical=True, origin_filter="classical")
-        _apply_short_prefix_policy(out_mul, short_policy)
-
-    # 4) Merge, FR preferred
-    if args and args.fr_only:
-        # Use FR outputs directly as merged set
-        _ensure_dir(merged_dir)
-        for name in CSV_FILES:
-            shutil.copyfile(out_fr / name, merged_dir / name)
-    else:
-        _merge_csvs(out_fr, out_mul, merged_dir)
-
-    # 5) Export to app assets
-    _copy_to_assets(merged_dir)
+    mul_path = raw_dir / "mul-extract.jsonl.gz"
+    fr_opts = dict(lang="fr", include_translingual=False, origin_filter="classical", productivity_weights=True)
+    mul_opts = dict(lang="fr", include_translingual=True, roots_from_translingual=True, mul_fallback_classical=True,
+                    origin_filter="classical", productivity_weights=True)
+
+    def _with_policy(stats: Dict[str, object] | None, csv_dir: Path) -> Dict[str, object]:
+        stats = dict(stats or {})
+        dropped = dict(stats.get("dropped") or {})
+        for reason, n in _apply_short_prefix_policy(csv_dir, short_policy).items():
+            if n:
+                dropped[reason] = dropped.get(reason, 0) + n
+        stats["dropped"] = dropped
+        return stats
+
+    def _filter_mul() -> Dict[str, object]:
+        read, kept = _filter_mul_lines(all_path, mul_path)
+        return {"lines_in": read, "rows_out": kept, "dropped": {"not_mul": read - kept}}
+
+    profiler = StageProfiler(run_dir / "profile" if args and getattr(args, "profile", False) else None)
+
+    def _child_profile(name: str) -> Path | None:
+        return profiler.out_dir / name if profiler.out_dir else None
+
+    def _transform_fr() -> Dict[str, object]:
+        stats = _run_transform(fr_path, out_fr, stats_out=run_dir / "transform_fr.stats.json",
+                               profile_dir=_child_profile("transform_fr"), **fr_opts)
+        return _with_policy(stats, out_fr)
+
+    def _transform_mul() -> Dict[str, object]:
+        stats = _run_transform(mul_path, out_mul, lemmas=fr_path, stats_out=run_dir / "transform_mul.stats.json",
+                               profile_dir=_child_profile("transform_mul"), **mul_opts)
+        return _with_policy(stats, out_mul)
+
+    def _merge() -> Dict[str, object]:
+        # FR preferred; with --fr-only the FR outputs are the merged set
+        drops: Dict[str, int] = {}
+        if fr_only:
+            _ensure_dir(merged_dir)
+            for name in CSV_FILES:
+                shutil.copyfile(out_fr / name, merged_dir / name)
+            counts = {name: len(_load_csv(merged_dir / name)[1]) for name in CSV_FILES}
+        else:
+            counts = _merge_csvs(out_fr, out_mul, merged_dir, drops)
+        _write_generator_index(merged_dir)
+        return {"rows_out": counts, "dropped": drops}
+
+    fr_csvs = [out_fr / name for name in CSV_FILES]
+    mul_csvs = [out_mul / name for name in CSV_FILES]
+    merged_csvs = [merged_dir / name for name in CSV_FILES]
+    # side files: raw productivity counts (re-scaled by the merge) and the transform's own metrics
+    fr_side = [out_fr / PRODUCTIVITY_COUNTS_NAME, run_dir / "transform_fr.stats.json"]
+    mul_side = [out_mul / PRODUCTIVITY_COUNTS_NAME, run_dir / "transform_mul.stats.json"]
+    policy_in = [SHORT_PREFIX_POLICY_PATH, TRANSFORM_SCRIPT]
+    # The FR transform only needs the FR dump, so it overlaps the (much larger) ALL download.
+    stages = [
+        _Stage("download_fr", lambda: _download(url_fr, fr_path), outputs=[fr_path], params={"url": url_fr}),
+        _Stage("transform_fr", _transform_fr, deps=["download_fr"], inputs=[fr_path] + policy_in,
+               outputs=fr_csvs + fr_side, params=fr_opts),
+    ]
+    if not fr_only:
+        stages += [
+            _Stage("download_all", lambda: _download(url_all, all_path), outputs=[all_path], params={"url": url_all}),
+            _Stage("filter_mul", _filter_mul, deps=["download_all"],
+                   inputs=[all_path], outputs=[mul_path]),
+            _Stage("transform_mul", _transform_mul, deps=["filter_mul", "download_fr"],
+                   inputs=[mul_path, fr_path] + policy_in, outputs=mul_csvs + mul_side,
+                   params=mul_opts),
+        ]
+    stages += [
+        _Stage("merge", _merge, deps=["transform_fr"] + ([] if fr_only else ["transform_mul"]),
+               inputs=fr_csvs + ([] if fr_only else mul_csvs + [fr_side[0], mul_side[0]]),
+               outputs=merged_csvs + [merged_dir / GENERATOR_INDEX_NAME], params={"fr_only": fr_only}),
+        # the FR extract tells the store which merged rows came from csv_fr (provenance)
+        _Stage("store", lambda: _build_run_store(run_dir), deps=["merge"], inputs=merged_csvs + fr_csvs,
+               outputs=[run_dir / RUN_STORE_NAME]),
+        # Export always runs; unchanged files are skipped by hash anyway.
+        _Stage("export", lambda: _copy_to_assets(merged_dir, assets_dir), deps=["merge"]),
+    ]
+    jobs = getattr(args, "jobs", 1) if args else 1
+    if profiler.enabled and jobs > 1:
+        print("Profiling: stages run one at a time")
+    if args and getattr(args, "trace", False):
+        tracing.start(run_dir / TRACE_NAME, f"wizard {stamp}")
+    try:
+        report = _run_stages(stages, run_dir / STAGES_MEMO_NAME, jobs, run_dir / METRICS_NAME, profiler)
+    finally:
+        trace_path = tracing.stop()
+    if trace_path:
+        print(f"Trace: {trace_path} (open in https://ui.perfetto.dev or chrome://tracing)")
+    if profiler.enabled:
+        print(f"Profile reports: {profiler.out_dir} (transform internals under transform_fr/, transform_mul/)")
 
-    # 6) Run metadata
+    # Run metadata
     meta = {
         "timestamp": stamp,
         "fr_url": url_fr,
         "all_raw_url": url_all,
-        "fr_only": bool(args and args.fr_only),
+        "fr_only": fr_only,
+        "assets_dir": str(assets_dir or APP_SEED_DIR),
         "outputs": {name: str((merged_dir / name).resolve()) for name in CSV_FILES},
+        "stages": report,
     }
     with open(run_dir / "run.json", "w", encoding="utf-8") as f:
         json.dump(meta, f, ensure_ascii=False, indent=2)
@@ -1006,10 +3047,22 @@ def wizard(args=None) -> int:
 
 def main() -> int:
     ap = argparse.ArgumentParser(description="Neologotron ETL interactive CLI")
+    ap.add_argument("--profile", action="store_true",
+                    help="write cProfile/tracemalloc reports per stage under runs/<run>/profile/ "
+                         "(other subcommands: profile/<cmd>/)")
+    ap.add_argument("--trace", action="store_true",
+                    help="write a Chrome/Perfetto trace-event timeline to runs/<run>/trace.json "
+                         "(other subcommands: trace.<cmd>.json)")
     sub = ap.add_subparsers(dest="cmd", required=True)
 
     pw = sub.add_parser("wizard", help="Run the guided end-to-end flow (recommended)")
     pw.add_argument("--fr-only", action="store_true", help="only use FR extract (skip Translingual merge)")
+    pw.add_argument("--run", help="resume an existing run timestamp; stages whose inputs are unchanged are skipped")
+    pw.add_argument("--jobs", type=int, default=3, help="independent stages run at the same time (default 3)")
+    pw.add_argument("--yes", "-y", action="store_true", help="accept default (or resumed) URLs without prompting")
+    pw.add_argument("--fr-url", help="French extract URL (no prompt)")
+    pw.add_argument("--all-url", help="'All languages raw' URL for Translingual (no prompt)")
+    pw.add_argument("--assets-dir", help="export seeds here instead of app/src/main/assets/seed")
 
     pr = sub.add_parser("review", help="Interactive curation of merged CSVs; stores decisions for later application")
     pr.add_argument("--run", help="run timestamp under etl/runs; defaults to latest run")
@@ -1017,8 +3070,21 @@ def main() -> int:
     pr.add_argument("--limit", type=int, help="maximum items to review")
     pr.add_argument("--origin-lang", help="comma-separated language codes to include (matches ety_lang/root_lang), e.g. 'grc,la,mul'")
     pr.add_argument("--domains", help="comma-separated domain/tag substrings to include, case-insensitive (e.g. 'science,medecine,tech')")
-    pr.add_argument("--show-all", action="store_true", help="review all entries, not only 'uncertain'")
+    pr.add_argument("--show-all", action="store_true", help="review all entries, not only 'uncertain' (uncertainty > 0)")
     pr.add_argument("--ids-file", help="file with IDs (one per line) to restrict review to specific entries")
+    pr.add_argument("--query", help="full-text query over form, gloss, ety_desc and tags (FTS5 syntax accepted)")
+    pr.add_argument("--slice", help="K/N: review only the K-th of N disjoint slices (for parallel reviewers)")
+    pr.add_argument("--reviewer", default=os.environ.get("USER"), help="name recorded with each decision (default: $USER)")
+
+    pse = sub.add_parser("search", help="Ranked full-text search over the run store, with facet counts by origin and tag")
+    pse.add_argument("--run", help="run timestamp under etl/runs; defaults to latest run")
+    pse.add_argument("query", help="words to match (prefix match, all required) or an FTS5 query")
+    pse.add_argument("--limit", type=int, default=20, help="number of ranked hits to print (default 20)")
+    pse.add_argument("--facets", type=int, default=10, help="number of facet values to print (default 10)")
+
+    psc = sub.add_parser("score", help="Recompute review priority scores (uncertainty × impact) in the run store")
+    psc.add_argument("--run", help="run timestamp under etl/runs; defaults to latest run")
+    psc.add_argument("--top", type=int, default=10, help="number of top-priority rows to print (default 10)")
 
     pa = sub.add_parser("apply-review", help="Apply saved decisions to merged CSVs and export to app assets")
     pa.add_argument("--run", help="run timestamp under etl/runs; defaults to latest run")
@@ -1028,21 +3094,61 @@ def main() -> int:
     pp.add_argument("--run", help="run timestamp under etl/runs; defaults to latest run")
     pp.add_argument("--max-chars", type=int, default=80, help="max characters for gloss (default: 80)")
     pp.add_argument("--map", help="optional JSON mapping file for phrase→FR gloss replacements")
+    pp.add_argument("--no-phrases", action="store_true",
+                    help="only replace glosses that match a map key as a whole (no replacements inside glosses)")
     pp.add_argument("--out-dir", help="optional output dir (defaults to runs/<run>/polished)")
 
+    pst = sub.add_parser("shard-themes", help="Split seed CSVs into per-theme shards plus a global index for lazy loading")
+    pst.add_argument("--run", help="run timestamp under etl/runs; defaults to latest run")
+    pst.add_argument("--src", default="merged", help="CSV folder inside the run (merged, polished, export_reviewed, ...)")
+    pst.add_argument("--out-dir", help="optional output dir (defaults to runs/<run>/themes)")
+    pst.add_argument("--to-assets", action="store_true", help="also sync shards into app/src/main/assets/seed/themes")
+
+    pme = sub.add_parser("metrics", help="Show per-stage metrics of a run and compare them with a baseline run")
+    pme.add_argument("--run", help="run timestamp under etl/runs; defaults to latest run")
+    pme.add_argument("--baseline", help="run timestamp to compare against; exit status 1 on regressions")
+    pme.add_argument("--tolerance", type=float, default=0.2, help="relative increase counted as a regression (default 0.2)")
+
+    ptl = sub.add_parser("train-langid", help="Train the FR/EN gloss classifier used by prep-ai, scoring and polish")
+    ptl.add_argument("--run", help="run timestamp under etl/runs whose raw dumps to use; defaults to latest run")
+    ptl.add_argument("--fr", help="French wiktextract JSONL(.gz) (default: runs/<run>/raw/fr-extract.jsonl.gz)")
+    ptl.add_argument("--en", help="English wiktextract JSONL(.gz) (default: runs/<run>/raw/raw-enwiktionary.jsonl.gz)")
+    ptl.add_argument("--max", type=int, default=50_000,
+                     help="glosses sampled per language, uniformly over the dump (default 50000)")
+    ptl.add_argument("--scan-lines", type=int, help="read at most this many lines of each dump (default: whole dump)")
+    ptl.add_argument("--seed", type=int, default=0, help="sampling seed (default 0)")
+    ptl.add_argument("--out", help="model file (default etl/cache/langid.json, where the other commands look for it)")
+
     paip = sub.add_parser("prep-ai", help="Prepare a random set of EN/long glosses for AI polishing (no API calls)")
     paip.add_argument("--run", help="run timestamp under etl/runs; defaults to latest run")
     paip.add_argument("--count", type=int, default=10, help="number of candidates (default 10)")
     paip.add_argument("--min-len", type=int, default=90, help="minimum gloss length to consider 'long' (default 90)")
+    paip.add_argument("--en-threshold", type=float, default=0.5,
+                      help="English probability from the gloss classifier that makes a gloss a candidate (default 0.5)")
+    paip.add_argument("--no-group", action="store_true", help="one candidate per row instead of one per distinct gloss")
 
     pair = sub.add_parser("ai-run", help="Call a local LLM on prepared candidates with caching")
     pair.add_argument("--run", help="run timestamp under etl/runs; defaults to latest run")
     pair.add_argument("--endpoint", required=True, help="HTTP endpoint for the model")
     pair.add_argument("--model", required=True, help="model name")
-    pair.add_argument("--batch", type=int, default=1, help="number of prompts to process per batch")
+    pair.add_argument("--pack", "--batch", dest="pack", type=int, default=1,
+                      help="candidates packed into one prompt (default 1; --batch is an alias)")
+    pair.add_argument("--pack-tokens", type=int, default=0,
+                      help="pack candidates until this estimated prompt size in tokens (0 = count only)")
+    pair.add_argument("--concurrency", type=int, default=1, help="number of requests in flight (default 1)")
+    pair.add_argument("--retries", type=int, default=3, help="retries per request on timeouts, 429 and 5xx (default 3)")
+    pair.add_argument("--backoff", type=float, default=0.5, help="initial retry delay in seconds, doubled each retry")
+    pair.add_argument("--rps", type=float, default=0.0, help="max requests per second across workers (0 = unlimited)")
     pair.add_argument("--temperature", type=float, default=0.7, help="sampling temperature")
     pair.add_argument("--max-tokens", type=int, default=128, help="maximum tokens to generate")
     pair.add_argument("--timeout", type=float, default=60.0, help="request timeout in seconds")
+    pair.add_argument("--resume", action="store_true",
+                      help="keep output.jsonl and skip candidates listed in ai/checkpoint.txt")
+    pair.add_argument("--cache", help=f"shared answer cache (default {AI_CACHE_PATH.relative_to(REPO_ROOT)})")
+    pair.add_argument("--cache-max-mb", type=float, default=256.0,
+                      help="evict least recently used answers above this size (0 = no limit)")
+    pair.add_argument("--cache-max-age-days", type=float, default=90.0,
+                      help="drop answers older than this (0 = keep forever)")
 
     paii = sub.add_parser("import-ai", help="Apply AI JSONL (id→short_gloss_fr,pos_out) into merged CSVs, then suggest review")
     paii.add_argument("--run", help="run timestamp under etl/runs; defaults to latest run")
@@ -1050,14 +3156,56 @@ def main() -> int:
     paii.add_argument("--out-dir", help="optional output dir (defaults to runs/<run>/ai_imported)")
 
     args = ap.parse_args()
+    if (args.profile or args.trace) and args.cmd != "wizard":
+        return _dispatch_instrumented(args)
+    return _dispatch(args)
+
+
+def _dispatch_instrumented(args) -> int:
+    """Run a non-wizard subcommand under --profile/--trace.
+
+    Reports go to runs/<run>/profile/<cmd>/ and runs/<run>/trace.<cmd>.json, so they never replace
+    the wizard's profile/summary.* and trace.json.
+    """
+    run_dir = ETL_DIR / "runs" / args.run if getattr(args, "run", None) else _latest_run_dir()
+    if run_dir is None or not run_dir.exists():
+        print(f"[WARN] No run directory found; running '{args.cmd}' without --profile/--trace", file=sys.stderr)
+        return _dispatch(args)
+    name = args.cmd.replace("-", "_")
+    profiler = StageProfiler(run_dir / "profile" / name if args.profile else None)
+    if args.trace:
+        tracing.start(run_dir / f"{Path(TRACE_NAME).stem}.{name}.json", args.cmd)
+    try:
+        with tracing.span(name, "command"), profiler.stage(name):
+            rc = _dispatch(args)
+    finally:
+        trace_path = tracing.stop()
+    if profiler.enabled:
+        print(f"Profile reports: {profiler.out_dir}")
+    if trace_path:
+        print(f"Trace: {trace_path}")
+    return rc
+
+
+def _dispatch(args) -> int:
     if args.cmd == "wizard":
         return wizard(args)
     if args.cmd == "review":
         return cmd_review(args)
+    if args.cmd == "search":
+        return cmd_search(args)
+    if args.cmd == "score":
+        return cmd_score(args)
+    if args.cmd == "metrics":
+        return cmd_metrics(args)
     if args.cmd == "apply-review":
         return cmd_apply_review(args)
     if args.cmd == "polish":
         return cmd_polish(args)
+    if args.cmd == "shard-themes":
+        return cmd_shard_themes(args)
+    if args.cmd == "train-langid":
+        return cmd_train_langid(args)
     if args.cmd == "prep-ai":
         return cmd_prep_ai(args)
     if args.cmd == "ai-run":
@@ -0,0 +1,254 @@
+"""
+French vs English identification for glosses, from hashed character n-grams.
+
+Each gloss is case-folded, padded with spaces, and cut into 1- to 4-character n-grams; every
+n-gram is hashed into one of `dim` buckets. Training counts buckets per language (naive Bayes
+with additive smoothing) to get a per-bucket log-likelihood ratio. A gloss's score is the mean
+ratio over its n-grams, turned into P(English) by a logistic calibration fitted on held-out glosses.
+
+With NumPy, a whole batch of glosses is hashed and scored in a few array passes (one `bincount`
+per batch). Without it, the same hash and formulas run in pure Python, so the two paths give the
+same probabilities (up to float rounding).
+
+Glosses with fewer than MIN_LETTERS letters carry too little evidence: they are left unjudged
+(None) for the caller to decide by other means.
+"""
+from __future__ import annotations
+
+import base64
+import json
+import math
+import os
+import random
+import re
+import sys
+from array import array
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional; the pure-Python path computes the same scores
+    np = None
+
+NGRAMS = (1, 2, 3, 4)
+DIM = 1 << 16
+MIN_LETTERS = 10
+_P = 0x01000193  # FNV prime; hashes stay below 2**64 before masking, so NumPy uint64 math matches Python ints
+_MASK = 0xFFFFFFFF
+_SPACES = re.compile(r"\s+")
+
+
+def _prep(text: str) -> str:
+    return " " + _SPACES.sub(" ", text.casefold().replace("\x00", "")).strip() + " "
+
+
+def _letters(text: str) -> int:
+    return sum(ch.isalpha() for ch in text)
+
+
+def _buckets_py(text: str, dim: int) -> List[int]:
+    codes = [ord(c) for c in _prep(text)]
+    out: List[int] = []
+    for n in NGRAMS:
+        for i in range(len(codes) - n + 1):
+            h = n
+            for k in range(n):
+                h = (h * _P + codes[i + k]) & _MASK
+            out.append((h ^ (h >> 16)) & (dim - 1))
+    return out
+
+
+def _buckets_np(texts: Sequence[str], dim: int):
+    """(bucket, text index) arrays for every n-gram of every text, computed on one concatenated array."""
+    joined = "\x00".join(_prep(t) for t in texts) + "\x00"
+    codes = np.frombuffer(joined.encode("utf-32-le"), dtype="<u4").astype(np.uint64)
+    zeros = np.concatenate(([0], np.cumsum(codes == 0)))  # separators seen before each position
+    buckets, owners = [], []
+    for n in NGRAMS:
+        m = len(codes) - n + 1
+        if m <= 0:
+            continue
+        h = np.full(m, n, dtype=np.uint64)
+        for k in range(n):
+            h = (h * np.uint64(_P) + codes[k:k + m]) & np.uint64(_MASK)
+        valid = zeros[n:n + m] == zeros[:m]  # window does not cross a separator
+        h = h[valid]
+        buckets.append(((h ^ (h >> np.uint64(16))) & np.uint64(dim - 1)).astype(np.int64))
+        owners.append(zeros[:m][valid])
+    return np.concatenate(buckets), np.concatenate(owners)
+
+
+def _sigmoid(x: float) -> float:
+    if x >= 0:
+        return 1.0 / (1.0 + math.exp(-x))
+    z = math.exp(x)
+    return z / (1.0 + z)
+
+
+class LangId:
+    """Hashed n-gram model; `english_proba(texts)` scores a batch of glosses."""
+
+    def __init__(self, weights: Sequence[float], scale: float = 1.0, bias: float = 0.0, dim: int = DIM) -> None:
+        self.dim = dim
+        self.scale = scale
+        self.bias = bias
+        self.weights = np.asarray(weights, dtype=np.float64) if np is not None else array("d", weights)
+
+    # ---- scoring ----
+
+    def _mean_ratios(self, texts: Sequence[str]) -> List[float]:
+        if not texts:
+            return []
+        if np is not None:
+            buckets, owners = _buckets_np(texts, self.dim)
+            sums = np.bincount(owners, weights=self.weights[buckets], minlength=len(texts))
+            counts = np.bincount(owners, minlength=len(texts))
+            return (sums / np.maximum(counts, 1)).tolist()
+        out = []
+        for t in texts:
+            b = _buckets_py(t, self.dim)
+            out.append(sum(self.weights[i] for i in b) / max(1, len(b)))
+        return out
+
+    def english_proba(self, texts: Sequence[str]) -> List[Optional[float]]:
+        """P(English) per text; None for texts with fewer than MIN_LETTERS letters."""
+        texts = [t or "" for t in texts]
+        judged = [i for i, t in enumerate(texts) if _letters(t) >= MIN_LETTERS]
+        out: List[Optional[float]] = [None] * len(texts)
+        for i, s in zip(judged, self._mean_ratios([texts[i] for i in judged])):
+            out[i] = _sigmoid(self.scale * s + self.bias)
+        return out
+
+    # ---- training ----
+
+    @classmethod
+    def train(cls, fr_texts: Sequence[str], en_texts: Sequence[str], dim: int = DIM,
+              alpha: float = 0.5, holdout: int = 10) -> Tuple["LangId", float]:
+        """Fit on two lists of glosses; every `holdout`-th gloss is kept aside for calibration.
+
+        Returns the model and its accuracy on the held-out glosses.
+        """
+        fr = [t for t in fr_texts if _letters(t) >= MIN_LETTERS]
+        en = [t for t in en_texts if _letters(t) >= MIN_LETTERS]
+        if not fr or not en:
+            raise ValueError("training needs glosses in both languages")
+        fit_fr, cal_fr = _split(fr, holdout)
+        fit_en, cal_en = _split(en, holdout)
+        counts_fr = _bucket_counts(fit_fr, dim)
+        counts_en = _bucket_counts(fit_en, dim)
+        tot_fr, tot_en = sum(counts_fr), sum(counts_en)
+        weights = [
+            math.log((ce + alpha) / (tot_en + alpha * dim)) - math.log((cf + alpha) / (tot_fr + alpha * dim))
+            for cf, ce in zip(counts_fr, counts_en)
+        ]
+        model = cls(weights, dim=dim)
+        cal = cal_fr + cal_en
+        labels = [0.0] * len(cal_fr) + [1.0] * len(cal_en)
+        ratios = model._mean_ratios(cal)
+        model.scale, model.bias = _fit_logistic(ratios, labels)
+        probs = [_sigmoid(model.scale * s + model.bias) for s in ratios]
+        accuracy = sum((p >= 0.5) == (y == 1.0) for p, y in zip(probs, labels)) / len(labels)
+        return model, accuracy
+
+    # ---- persistence ----
+
+    def save(self, path: Path) -> None:
+        data = array("f", list(self.weights))
+        if sys.byteorder != "little":
+            data.byteswap()
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"format": 1, "dim": self.dim, "ngrams": list(NGRAMS), "scale": self.scale,
+                       "bias": self.bias, "weights_f32le": base64.b64encode(data.tobytes()).decode("ascii")}, f)
+            f.write("\n")
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["LangId"]:
+        """Model saved by `save`, or None when the file is missing or from an incompatible version."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if meta.get("format") != 1 or tuple(meta.get("ngrams") or ()) != NGRAMS:
+            return None
+        data = array("f")
+        data.frombytes(base64.b64decode(meta["weights_f32le"]))
+        if sys.byteorder != "little":
+            data.byteswap()
+        return cls(data, float(meta["scale"]), float(meta["bias"]), int(meta["dim"]))
+
+
+def _split(texts: Sequence[str], holdout: int) -> Tuple[List[str], List[str]]:
+    if len(texts) < holdout:
+        return list(texts), list(texts)
+    fit = [t for i, t in enumerate(texts) if i % holdout]
+    cal = [t for i, t in enumerate(texts) if not i % holdout]
+    return fit, cal
+
+
+def _bucket_counts(texts: Sequence[str], dim: int) -> List[float]:
+    if np is not None:
+        buckets, _ = _buckets_np(texts, dim)
+        return np.bincount(buckets, minlength=dim).astype(np.float64).tolist()
+    counts = [0.0] * dim
+    for t in texts:
+        for b in _buckets_py(t, dim):
+            counts[b] += 1.0
+    return counts
+
+
+def _fit_logistic(xs: Sequence[float], ys: Sequence[float], iters: int = 50) -> Tuple[float, float]:
+    """1-D logistic regression p = sigmoid(a·x + b) by Newton's method, lightly regularised."""
+    a, b = 1.0, 0.0
+    for _ in range(iters):
+        ga = gb = haa = hab = hbb = 0.0
+        for x, y in zip(xs, ys):
+            p = _sigmoid(a * x + b)
+            r = p - y
+            w = p * (1.0 - p)
+            ga += r * x
+            gb += r
+            haa += w * x * x
+            hab += w * x
+            hbb += w
+        ga += 1e-3 * a
+        haa += 1e-3
+        hbb += 1e-3
+        det = haa * hbb - hab * hab
+        if det <= 0:
+            break
+        da = (hbb * ga - hab * gb) / det
+        db = (haa * gb - hab * ga) / det
+        a, b = a - da, b - db
+        if abs(da) < 1e-9 and abs(db) < 1e-9:
+            break
+    return a, b
+
+
+def gloss_texts(entries: Iterable[dict], limit: int, seed: int = 0) -> List[str]:
+    """Uniform sample of up to `limit` gloss strings from all sense glosses of the entries.
+
+    Reservoir sampling in one pass: dumps are ordered (by title, by language), so their first
+    glosses are not representative of the rest.
+    """
+    rng = random.Random(seed)
+    out: List[str] = []
+    seen = 0
+    for e in entries:
+        for sense in e.get("senses") or []:
+            for g in sense.get("glosses") or []:
+                if not isinstance(g, str) or _letters(g) < MIN_LETTERS:
+                    continue
+                seen += 1
+                if len(out) < limit:
+                    out.append(g)
+                else:
+                    j = rng.randrange(seen)
+                    if j < limit:
+                        out[j] = g
+    return out
@@ -0,0 +1,122 @@
+"""
+Per-stage profiling for the ETL scripts (`--profile`).
+
+Each profiled stage gets a cProfile dump (`<stage>.prof`, readable with `python -m pstats`)
+and a text report (`<stage>.txt`) with the hottest functions and the tracemalloc peak and
+top allocation sites. `summary.txt` / `summary.json` rank stages and hot functions across
+the whole run.
+
+A disabled profiler (no output directory) costs one attribute check per stage.
+"""
+from __future__ import annotations
+
+import cProfile
+import io
+import json
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+
+def _func_label(key) -> str:
+    filename, line, name = key
+    if filename == "~":  # built-ins
+        return name
+    return f"{Path(filename).name}:{line}({name})"
+
+
+class StageProfiler:
+    """Collects cProfile and tracemalloc data per named stage. Stages must not overlap."""
+
+    def __init__(self, out_dir: Optional[Path], top: int = 15) -> None:
+        self.out_dir = Path(out_dir) if out_dir else None
+        self.top = top
+        self.stages: List[Dict[str, object]] = []
+
+    @property
+    def enabled(self) -> bool:
+        return self.out_dir is not None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if self.out_dir is None:
+            yield
+            return
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(10)
+        tracemalloc.reset_peak()
+        prof = cProfile.Profile()
+        t0 = time.perf_counter()
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+            wall = time.perf_counter() - t0
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            ])
+            if started_tracing:
+                tracemalloc.stop()
+            self._write_stage(name, prof, wall, peak, snapshot)
+
+    def _write_stage(self, name: str, prof: cProfile.Profile, wall: float, peak: int,
+                     snapshot: tracemalloc.Snapshot) -> None:
+        assert self.out_dir is not None
+        prof.dump_stats(str(self.out_dir / f"{name}.prof"))
+        stats = pstats.Stats(prof)
+        hot = sorted(stats.stats.items(), key=lambda kv: kv[1][2], reverse=True)[: self.top]
+        allocs = snapshot.statistics("lineno")[: self.top]
+        record = {
+            "stage": name,
+            "wall_s": round(wall, 3),
+            "tracemalloc_peak_bytes": peak,
+            "hot_functions": [
+                {"function": _func_label(key), "calls": nc, "tottime_s": round(tt, 4), "cumtime_s": round(ct, 4)}
+                for key, (_cc, nc, tt, ct, _callers) in hot
+            ],
+            "top_allocations": [
+                {"site": f"{Path(st.traceback[0].filename).name}:{st.traceback[0].lineno}",
+                 "bytes": st.size, "blocks": st.count}
+                for st in allocs
+            ],
+        }
+        self.stages.append(record)
+        buf = io.StringIO()
+        pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(self.top * 2)
+        lines = [f"Stage {name}: {wall:.2f}s wall, tracemalloc peak {peak / 1048576:.1f} MiB", "",
+                 "Top allocation sites:"]
+        lines += [f"  {a['bytes'] / 1024:10.1f} KiB  {a['blocks']:8d} blocks  {a['site']}"
+                  for a in record["top_allocations"]]
+        lines += ["", buf.getvalue()]
+        (self.out_dir / f"{name}.txt").write_text("\n".join(lines), encoding="utf-8")
+        self.write_summary()
+
+    def write_summary(self) -> None:
+        """Rank stages by wall time and functions by self time across all stages seen so far."""
+        if self.out_dir is None or not self.stages:
+            return
+        with open(self.out_dir / "summary.json", "w", encoding="utf-8") as f:
+            json.dump({"stages": self.stages}, f, indent=2)
+            f.write("\n")
+        merged: Dict[str, float] = {}
+        for st in self.stages:
+            for fn in st["hot_functions"]:
+                label = f"{fn['function']} [{st['stage']}]"
+                merged[label] = merged.get(label, 0.0) + fn["tottime_s"]
+        lines = ["Stages by wall time:"]
+        for st in sorted(self.stages, key=lambda s: s["wall_s"], reverse=True):
+            lines.append(f"  {st['wall_s']:9.2f}s  peak {st['tracemalloc_peak_bytes'] / 1048576:8.1f} MiB  {st['stage']}")
+        lines += ["", "Hot functions by self time:"]
+        for label, tt in sorted(merged.items(), key=lambda kv: kv[1], reverse=True)[: self.top]:
+            lines.append(f"  {tt:9.3f}s  {label}")
+        (self.out_dir / "summary.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Seeded generator of synthetic wiktextract/Kaikki JSONL dumps, for benchmarks and tests.
+
+Entries follow the shape of real dumps: `lang`/`lang_code`, `pos`, nested `senses` (glosses,
+topics, tags, examples), `forms`, `sounds`, `etymology_text` and `etymology_templates`,
+`derived` and `translations`. A configurable share of them are affixes (prefix, suffix,
+combining form) built on Greek/Latin stems; the other lemmas are compounds of the same stems,
+so productivity counting and the Translingual filter see realistic hit rates.
+
+The same seed and options always produce the same bytes. A `.gz` output path is gzip-compressed.
+
+Usage:
+  python3 etl/synth_wiktextract.py --out /tmp/synth.jsonl.gz --lines 1000000 --seed 7
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import gzip
+import io
+import json
+import random
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+LANG_NAMES = {
+    "fr": "French",
+    "mul": "Translingual",
+    "en": "English",
+    "la": "Latin",
+    "grc": "Ancient Greek",
+    "it": "Italian",
+    "de": "German",
+}
+
+# Shares of entries per lang_code; roughly a raw enwiktionary dump seen from the FR side.
+DEFAULT_LANGS = {"fr": 0.5, "en": 0.25, "mul": 0.05, "la": 0.06, "grc": 0.04, "it": 0.06, "de": 0.04}
+
+# (stem, origin, French gloss, English gloss)
+PREFIX_STEMS: List[Tuple[str, str, str, str]] = [
+    ("bio", "grc", "vie, vivant", "life"), ("morpho", "grc", "forme", "shape"),
+    ("photo", "grc", "lumière", "light"), ("géo", "grc", "terre", "earth"),
+    ("hydro", "grc", "eau", "water"), ("chrono", "grc", "temps", "time"),
+    ("astro", "grc", "astre, étoile", "star"), ("psycho", "grc", "âme, esprit", "mind"),
+    ("anthropo", "grc", "être humain", "human being"), ("neuro", "grc", "nerf", "nerve"),
+    ("cardio", "grc", "cœur", "heart"), ("thermo", "grc", "chaleur", "heat"),
+    ("micro", "grc", "petit", "small"), ("macro", "grc", "grand", "large"),
+    ("poly", "grc", "nombreux", "many"), ("mono", "grc", "seul, unique", "single"),
+    ("pseudo", "grc", "faux", "false"), ("techno", "grc", "art, technique", "craft"),
+    ("zoo", "grc", "animal", "animal"), ("phyto", "grc", "plante", "plant"),
+    ("aqua", "la", "eau", "water"), ("agri", "la", "champ", "field"),
+    ("multi", "la", "nombreux", "many"), ("omni", "la", "tout", "all"),
+    ("bene", "la", "bien", "well"), ("tri", "la", "trois", "three"),
+    ("sylvi", "la", "forêt", "forest"), ("lumi", "la", "lumière", "light"),
+    ("terri", "la", "terre", "land"), ("vita", "la", "vie", "life"),
+]
+SUFFIX_STEMS: List[Tuple[str, str, str, str]] = [
+    ("logie", "grc", "étude, discours", "study of"), ("graphie", "grc", "écriture, description", "writing"),
+    ("phobie", "grc", "peur", "fear of"), ("phile", "grc", "qui aime", "loving"),
+    ("cratie", "grc", "pouvoir", "rule by"), ("mètre", "grc", "mesure", "measure"),
+    ("scope", "grc", "qui observe", "instrument for viewing"), ("gène", "grc", "qui engendre", "producing"),
+    ("cide", "la", "qui tue", "killer of"), ("vore", "la", "qui mange", "eating"),
+    ("fère", "la", "qui porte", "bearing"), ("culture", "la", "culture, élevage", "cultivation of"),
+    ("pède", "la", "pied", "foot"), ("forme", "la", "en forme de", "shaped like"),
+]
+
+TOPICS = ["biology", "chemistry", "medicine", "technology", "linguistics", "astronomy", "physics",
+          "politics", "sociology", "botany", "zoology", "geology", "music", "law", "sports"]
+TAGS = ["", "", "", "rare", "dated", "figuratively", "informal", "archaic"]
+ORIGIN_FR = {"grc": "grec ancien", "la": "latin"}
+
+FR_WORDS = ["relatif", "à", "la", "le", "qui", "concerne", "étude", "des", "de", "propriété", "un", "une",
+            "ensemble", "petit", "grand", "forme", "manière", "état", "action", "science", "personne",
+            "objet", "lieu", "être", "vivant", "éléments", "mesure", "pratique", "relation", "caractère"]
+EN_WORDS = ["relating", "to", "the", "of", "a", "an", "which", "study", "form", "state", "action", "used",
+            "in", "with", "for", "by", "person", "object", "place", "living", "being", "measure",
+            "practice", "relation", "quality", "small", "large", "set", "that", "is"]
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "to", "vi", "pe", "da", "gon", "tri", "phi", "ster", "cal",
+             "den", "mor", "pla", "cro", "ven"]
+
+
+def parse_langs(spec: str) -> Dict[str, float]:
+    """'fr=0.6,en=0.3,mul=0.1' → {"fr": 0.6, ...}; weights need not sum to 1."""
+    out: Dict[str, float] = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        code, _, w = part.partition("=")
+        out[code.strip()] = float(w) if w else 1.0
+    if not out or sum(out.values()) <= 0:
+        raise ValueError(f"invalid language mix: {spec!r}")
+    return out
+
+
+class _Vocab:
+    """Stems plus seeded synthetic ones, so the affix inventory can grow past the real list."""
+
+    def __init__(self, rng: random.Random, extra_stems: int) -> None:
+        self.prefixes = list(PREFIX_STEMS)
+        self.suffixes = list(SUFFIX_STEMS)
+        seen = {s for s, *_ in self.prefixes + self.suffixes}
+        while extra_stems > 0:
+            stem = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+            if stem in seen:
+                continue
+            seen.add(stem)
+            gloss_fr = " ".join(rng.sample(FR_WORDS, 2))
+            gloss_en = " ".join(rng.sample(EN_WORDS, 2))
+            target = self.prefixes if extra_stems % 3 else self.suffixes
+            target.append((stem, rng.choice(("grc", "la")), gloss_fr, gloss_en))
+            extra_stems -= 1
+
+
+def _phrase(rng: random.Random, words: List[str], lo: int, hi: int) -> str:
+    return " ".join(rng.choice(words) for _ in range(rng.randint(lo, hi)))
+
+
+def _senses(rng: random.Random, head: str, english: bool, lo: int = 1, hi: int = 4) -> List[dict]:
+    words = EN_WORDS if english else FR_WORDS
+    senses = []
+    for i in range(rng.randint(lo, hi)):
+        sense: dict = {
+            "glosses": [head if i == 0 and head else _phrase(rng, words, 4, 14).capitalize() + "."],
+            "topics": rng.sample(TOPICS, rng.randint(0, 2)),
+            "tags": [t for t in (rng.choice(TAGS),) if t],
+        }
+        if rng.random() < 0.4:
+            sense["examples"] = [{"text": _phrase(rng, words, 6, 16).capitalize() + ".",
+                                  "ref": f"Auteur {rng.randint(1, 500)}, {rng.randint(1700, 2020)}"}]
+        if rng.random() < 0.2:
+            sense["raw_glosses"] = [f"({rng.choice(TOPICS)}) " + sense["glosses"][0]]
+        senses.append(sense)
+    return senses
+
+
+def _ety_templates(lang: str, origin: str, parts: List[str]) -> List[dict]:
+    tpls = [{"name": "bor" if lang != "mul" else "der", "args": {"1": lang, "2": origin},
+             "expansion": ORIGIN_FR.get(origin, origin)}]
+    if parts:
+        tpls.append({"name": "affix" if len(parts) > 1 else "prefix",
+                     "args": {"1": lang, **{str(i + 2): p for i, p in enumerate(parts)}}})
+    return tpls
+
+
+def make_affix(rng: random.Random, vocab: _Vocab, lang: str, pageid: int) -> dict:
+    english = lang == "en"
+    if rng.random() < 0.6:
+        stem, origin, g_fr, g_en = rng.choice(vocab.prefixes)
+        word, pos = stem + "-", "prefix"
+    else:
+        stem, origin, g_fr, g_en = rng.choice(vocab.suffixes)
+        word, pos = "-" + stem, "suffix"
+    if lang in ("mul", "grc", "la") and rng.random() < 0.5:
+        pos = "combining form"
+    derived = [stem + s for s, *_ in rng.sample(vocab.suffixes, 3)] if pos != "suffix" else \
+        [p + stem for p, *_ in rng.sample(vocab.prefixes, 3)]
+    entry = {
+        "lang": LANG_NAMES.get(lang, lang),
+        "lang_code": lang,
+        "word": word,
+        "pos": pos,
+        "pageid": pageid,
+        "senses": _senses(rng, g_en if english else g_fr, english, 1, 3),
+        "sounds": [{"ipa": f"/{stem}/"}],
+        "etymology_text": f"Du {ORIGIN_FR[origin]} {stem} (« {g_fr} »).",
+        "etymology_templates": _ety_templates(lang, origin, []),
+        "derived": [{"word": w} for w in derived],
+    }
+    if rng.random() < 0.3:
+        entry["forms"] = [{"form": word.replace("é", "e"), "tags": ["alternative"]}]
+    return entry
+
+
+def make_lemma(rng: random.Random, vocab: _Vocab, lang: str, pageid: int) -> dict:
+    english = lang == "en"
+    pos = rng.choice(("noun", "noun", "noun", "verb", "adj", "adv", "name"))
+    if rng.random() < 0.35:  # compound of known stems: what productivity counting looks for
+        p, origin, *_ = rng.choice(vocab.prefixes)
+        s, *_ = rng.choice(vocab.suffixes)
+        word = p + s
+        parts = [p + "-", "-" + s]
+    else:
+        word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        origin, parts = rng.choice(("la", "grc")), []
+    entry: dict = {
+        "lang": LANG_NAMES.get(lang, lang),
+        "lang_code": lang,
+        "word": word,
+        "pos": pos,
+        "pageid": pageid,
+        "senses": _senses(rng, "", english),
+        "sounds": [{"ipa": f"/{word[:6]}/"}] if rng.random() < 0.7 else [],
+    }
+    if pos in ("noun", "adj"):
+        entry["forms"] = [{"form": word + "s", "tags": ["plural"]}]
+    if rng.random() < 0.6:
+        entry["etymology_text"] = f"Composé de {' et '.join(parts)}." if parts else \
+            f"Du {ORIGIN_FR[origin]} {_phrase(rng, SYLLABLES, 1, 2).replace(' ', '')}."
+        entry["etymology_templates"] = _ety_templates(lang, origin, parts)
+    if rng.random() < 0.25:
+        entry["translations"] = [{"lang": LANG_NAMES[c], "code": c, "word": word + c[:1]}
+                                 for c in rng.sample(sorted(LANG_NAMES), 3)]
+    return entry
+
+
+def iter_entries(lines: int, seed: int = 0, affix_ratio: float = 0.02,
+                 langs: Optional[Dict[str, float]] = None, extra_stems: int = 200) -> Iterator[dict]:
+    """Yield `lines` synthetic entries; deterministic for a given seed and options."""
+    rng = random.Random(seed)
+    vocab = _Vocab(rng, extra_stems)
+    mix = langs or DEFAULT_LANGS
+    codes, weights = list(mix), list(mix.values())
+    for i in range(lines):
+        lang = rng.choices(codes, weights)[0]
+        if rng.random() < affix_ratio:
+            yield make_affix(rng, vocab, lang, 100000 + i)
+        else:
+            yield make_lemma(rng, vocab, lang, 100000 + i)
+
+
+def write_corpus(path: Path, lines: int, seed: int = 0, affix_ratio: float = 0.02,
+                 langs: Optional[Dict[str, float]] = None, extra_stems: int = 200,
+                 malformed_ratio: float = 0.0, compresslevel: int = 6) -> Dict[str, object]:
+    """Write a corpus to `path` (gzip if it ends in .gz); returns counts per lang_code and pos."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    noise = random.Random(seed + 1)
+    by_lang: Counter = Counter()
+    by_pos: Counter = Counter()
+    malformed = 0
+    with contextlib.ExitStack() as stack:
+        if path.suffix == ".gz":
+            # no mtime or file name in the gzip header, so equal inputs give equal bytes
+            raw = stack.enter_context(open(path, "wb"))
+            gz = stack.enter_context(gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=compresslevel,
+                                                   mtime=0, filename=""))
+            f = stack.enter_context(io.TextIOWrapper(gz, encoding="utf-8"))
+        else:
+            f = stack.enter_context(open(path, "w", encoding="utf-8"))
+        for e in iter_entries(lines, seed, affix_ratio, langs, extra_stems):
+            line = json.dumps(e, ensure_ascii=False)
+            if malformed_ratio and noise.random() < malformed_ratio:
+                line = line[: len(line) // 2]  # truncated record, as in a torn download
+                malformed += 1
+            f.write(line + "\n")
+            by_lang[e["lang_code"]] += 1
+            by_pos[e["pos"]] += 1
+    return {"lines": lines, "bytes": path.stat().st_size, "malformed": malformed,
+            "lang": dict(by_lang.most_common()), "pos": dict(by_pos.most_common())}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Write a synthetic wiktextract JSONL dump")
+    ap.add_argument("--out", required=True, help="output path; .gz for gzip")
+    ap.add_argument("--lines", type=int, default=100_000, help="number of entries (default 100000)")
+    ap.add_argument("--seed", type=int, default=0, help="random seed (default 0)")
+    ap.add_argument("--affix-ratio", type=float, default=0.02, help="share of affix entries (default 0.02)")
+    ap.add_argument("--langs", default=",".join(f"{k}={v}" for k, v in DEFAULT_LANGS.items()),
+                    help="lang_code=weight list (default: %(default)s)")
+    ap.add_argument("--extra-stems", type=int, default=200, help="synthetic stems added to the real ones (default 200)")
+    ap.add_argument("--malformed-ratio", type=float, default=0.0, help="share of truncated JSON lines (default 0)")
+    ap.add_argument("--compresslevel", type=int, default=6, help="gzip level for .gz outputs (default 6)")
+    args = ap.parse_args()
+    try:
+        langs = parse_langs(args.langs)
+    except ValueError as ex:
+        print(f"[ERROR] {ex}", file=sys.stderr)
+        return 2
+    info = write_corpus(Path(args.out), args.lines, args.seed, args.affix_ratio, langs, args.extra_stems,
+                        args.malformed_ratio, args.compresslevel)
+    print(f"Wrote {info['lines']:,} entries ({info['bytes']:,} bytes) → {args.out}")
+    print("  lang: " + ", ".join(f"{k}={v}" for k, v in info["lang"].items()))
+    print("  pos:  " + ", ".join(f"{k}={v}" for k, v in info["pos"].items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
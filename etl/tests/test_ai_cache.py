@@ -1,10 +1,10 @@
-import hashlib
+import time
 from pathlib import Path
 import sys
 
 sys.path.append(str(Path(__file__).resolve().parents[2]))
 
-from etl.cli import _ai_fetch
+from etl.cli import _AICache, _ai_cache_key, _ai_fetch
 
 
 class DummyArgs:
@@ -24,14 +24,19 @@ def test_ai_fetch_uses_cache(tmp_path: Path):
 
     args = DummyArgs()
     prompt = "hello"
-    cache_dir = tmp_path
-    first = _ai_fetch(prompt, args, cache_dir, request_fn=fake_request)
-    second = _ai_fetch(prompt, args, cache_dir, request_fn=fake_request)
+    cache = _AICache(tmp_path / "cache.sqlite")
+    first = _ai_fetch(prompt, args, cache, request_fn=fake_request)
+    second = _ai_fetch(prompt, args, cache, request_fn=fake_request)
     assert first == "{\"id\": \"1\"}"
     assert second == "{\"id\": \"1\"}"
     assert len(calls) == 1
-    key = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
-    assert (cache_dir / f"{key}.txt").exists()
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    cache.close()
+    # shared between runs: a fresh handle on the same file still hits
+    again = _AICache(tmp_path / "cache.sqlite")
+    assert _ai_fetch(prompt, args, again, request_fn=fake_request) == first
+    assert len(calls) == 1
 
 
 def test_ai_fetch_misses_cache(tmp_path: Path):
@@ -42,8 +47,36 @@ def test_ai_fetch_misses_cache(tmp_path: Path):
         yield "ok"
 
     args = DummyArgs()
-    cache_dir = tmp_path
-    _ai_fetch("a", args, cache_dir, request_fn=fake_request)
-    _ai_fetch("b", args, cache_dir, request_fn=fake_request)
+    cache = _AICache(tmp_path / "cache.sqlite")
+    _ai_fetch("a", args, cache, request_fn=fake_request)
+    _ai_fetch("b", args, cache, request_fn=fake_request)
     assert calls == ["a", "b"]
 
+
+def test_cache_key_covers_model_parameters():
+    a, b = DummyArgs(), DummyArgs()
+    b.temperature = 0.7
+    assert _ai_cache_key("p", a) != _ai_cache_key("p", b)
+    b = DummyArgs()
+    b.model = "other"
+    assert _ai_cache_key("p", a) != _ai_cache_key("p", b)
+
+
+def test_cache_evicts_least_recently_used(tmp_path: Path):
+    cache = _AICache(tmp_path / "cache.sqlite", max_bytes=25)
+    cache.put("a", "x" * 10)
+    cache.put("b", "y" * 10)
+    time.sleep(0.01)
+    assert cache.get("a") == "x" * 10
+    cache.put("c", "z" * 10)
+    assert cache.evict() == 1
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_cache_drops_expired_entries(tmp_path: Path):
+    cache = _AICache(tmp_path / "cache.sqlite", max_age=0.05)
+    cache.put("a", "x")
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert cache.evict() == 1
@@ -0,0 +1,300 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import sys
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from etl import cli
+
+
+class _StubModel(BaseHTTPRequestHandler):
+    """Echoes each candidate id after `latency` seconds; the first `fail_first` requests get a 503.
+
+    Ids listed in `drop_ids` are left out of packed answers (multi-candidate prompts).
+    """
+
+    latency = 0.2
+    fail_first = 0
+    drop_ids: set = set()
+    prompts: list = []
+    lock = threading.Lock()
+    seen = 0
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with _StubModel.lock:
+            _StubModel.seen += 1
+            fail = _StubModel.seen <= _StubModel.fail_first
+            _StubModel.prompts.append(payload["prompt"])
+        time.sleep(self.latency)
+        if fail:
+            self.send_response(503)
+            self.end_headers()
+            return
+        cands = [json.loads(l) for l in payload["prompt"].splitlines()[1:]]
+        if len(cands) > 1:
+            cands = [c for c in cands if c["id"] not in _StubModel.drop_ids]
+        body = "\n".join(json.dumps({"id": c["id"], "short_gloss_fr": c["gloss"].upper()}) for c in cands)
+        body = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    _StubModel.seen = 0
+    _StubModel.fail_first = 0
+    _StubModel.drop_ids = set()
+    _StubModel.prompts = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubModel)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1/completions"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def cache(tmp_path: Path):
+    store = cli._AICache(tmp_path / "cache.sqlite")
+    yield store
+    store.close()
+
+
+def _args(endpoint, **kw):
+    base = dict(endpoint=endpoint, model="stub", temperature=0.0, max_tokens=32, timeout=5.0,
+                concurrency=1, retries=0, backoff=0.01, rps=0.0, pack=1, pack_tokens=0)
+    base.update(kw)
+    return argparse.Namespace(**base)
+
+
+def _lines(n):
+    return [json.dumps({"id": f"pre_{i}", "gloss": f"g{i}"}) for i in range(n)]
+
+
+def test_concurrent_requests_keep_input_order(stub_server, cache):
+    args = _args(stub_server, concurrency=4)
+    pool = cli.ThreadPoolExecutor(max_workers=4)
+    start = time.perf_counter()
+    try:
+        out = list(cli._ai_responses(_lines(8), "tmpl", args, cache, pool, cli._RateLimiter(0)))
+    finally:
+        pool.shutdown()
+    elapsed = time.perf_counter() - start
+    assert [json.loads(o)["id"] for o in out] == [f"pre_{i}" for i in range(8)]
+    assert elapsed < 8 * _StubModel.latency * 0.6
+
+
+def test_retries_with_backoff_then_succeeds(stub_server, cache):
+    _StubModel.fail_first = 2
+    args = _args(stub_server, retries=2)
+    assert json.loads(cli._ai_fetch("tmpl\n" + _lines(1)[0], args, cache))["id"] == "pre_0"
+    assert _StubModel.seen == 3
+
+
+def test_gives_up_after_retries(stub_server, cache):
+    _StubModel.fail_first = 5
+    args = _args(stub_server, retries=1)
+    calls = cli._AICalls()
+    assert list(cli._ai_responses(_lines(1), "tmpl", args, cache, calls=calls)) == [""]
+    (call,) = calls.calls
+    assert call["error"] == "HTTPError" and call["retries"] == 1 and call["latency"] > 0
+    m = cli._ai_metrics(calls.calls, 1.0)
+    assert (m["requests"], m["failed"], m["retries"], m["errors"]) == (1, 1, 1, {"HTTPError": 1})
+
+
+def test_rate_limiter_spaces_requests():
+    limiter = cli._RateLimiter(20.0)
+    start = time.perf_counter()
+    for _ in range(5):
+        limiter.acquire()
+    assert time.perf_counter() - start >= 4 / 20.0 * 0.9
+
+
+def test_packing_sends_one_prompt_per_group(stub_server, cache):
+    args = _args(stub_server, pack=3)
+    out = list(cli._ai_responses(_lines(7), "tmpl", args, cache))
+    assert [json.loads(o)["id"] for o in out] == [f"pre_{i}" for i in range(7)]
+    assert _StubModel.seen == 3
+    assert cache.stats()["entries"] == 7
+
+
+def test_packing_retries_missing_ids_alone(stub_server, cache):
+    _StubModel.drop_ids = {"pre_1"}
+    args = _args(stub_server, pack=3)
+    out = list(cli._ai_responses(_lines(3), "tmpl", args, cache))
+    assert [json.loads(o)["id"] for o in out] == ["pre_0", "pre_1", "pre_2"]
+    assert _StubModel.prompts[1] == "tmpl\n" + _lines(3)[1]
+
+
+def test_repacking_hits_per_item_cache(stub_server, cache):
+    list(cli._ai_responses(_lines(4), "tmpl", _args(stub_server, pack=2), cache))
+    _StubModel.seen = 0
+    out = list(cli._ai_responses(_lines(5), "tmpl", _args(stub_server, pack=5), cache))
+    assert len(out) == 5
+    assert _StubModel.seen == 1
+    assert _StubModel.prompts[-1] == "tmpl\n" + _lines(5)[4]
+
+
+def test_pack_groups_respect_token_budget():
+    lines = ["x" * 40] * 5  # ~10 tokens each
+    groups = list(cli._pack_groups(lines, 0, token_budget=35, base_tokens=5))
+    assert [len(g) for g in groups] == [3, 2]
+    assert [len(g) for g in cli._pack_groups(lines, 2)] == [2, 2, 1]
+
+
+def _streamed(chunks, consumed, closed):
+    def request(endpoint, payload, timeout):
+        try:
+            for chunk in chunks:
+                consumed.append(chunk)
+                yield chunk
+        finally:
+            closed.append(True)
+    return request
+
+
+def test_stream_stops_once_expected_object_is_complete(cache):
+    answer = '{"id": "pre_0", "short_gloss_fr": "G0"}\n'
+    tokens = [answer[i:i + 5] for i in range(0, len(answer), 5)] + ["trailing chatter"] * 50
+    sse = [f"data: {json.dumps({'choices': [{'text': t}]})}\n" for t in tokens] + ["data: [DONE]\n"]
+    consumed, closed = [], []
+    calls = cli._AICalls()
+    args = _args("http://unused")
+    out = cli._ai_fetch("tmpl\n" + _lines(1)[0], args, cache, _streamed(sse, consumed, closed), calls=calls)
+    assert json.loads(out) == {"id": "pre_0", "short_gloss_fr": "G0"}
+    assert len(consumed) < len(tokens) and closed == [True]
+    (call,) = calls.calls
+    assert call["early_stop"] and call["ids"] == ["pre_0"]
+    assert 0 <= call["ttft"] <= call["latency"]
+
+
+def test_stream_skips_malformed_fragments(cache):
+    text = 'noise {"id": "pre_0", "short\n{oops}\n{"id": "pre_0", "short_gloss_fr": "G0"}\n'
+    tokens = [text[i:i + 7] for i in range(0, len(text), 7)] + ["trailing chatter"] * 50
+    sse = [f"data: {json.dumps({'choices': [{'text': t}]})}\n" for t in tokens] + ["data: [DONE]\n"]
+    consumed, closed = [], []
+    calls = cli._AICalls()
+    out = cli._ai_fetch("tmpl\n" + _lines(1)[0], _args("http://unused"), cache, _streamed(sse, consumed, closed),
+                        calls=calls)
+    assert list(cli._ai_objects(out)) == [{"id": "pre_0", "short_gloss_fr": "G0"}]
+    assert len(consumed) < len(tokens) and closed == [True]
+    assert calls.calls[0]["early_stop"]
+
+
+def test_stream_unwraps_ollama_ndjson_and_waits_for_all_packed_ids(cache):
+    answers = ['{"id": "pre_0", "short_gloss_fr": "A"}\n', '{"id": "pre_1", "short_gloss_fr": "B"}\n']
+    chunks = [json.dumps({"response": piece, "done": False}) + "\n" for a in answers for piece in (a[:10], a[10:])]
+    chunks += [json.dumps({"response": "ignored", "done": True}) + "\n"]
+    consumed, closed = [], []
+    out = cli._ai_fetch_packed(_lines(2), "tmpl", _args("http://unused"), cache, _streamed(chunks, consumed, closed))
+    assert [json.loads(o)["short_gloss_fr"] for o in out] == ["A", "B"]
+    assert len(consumed) == 4 and closed == [True]
+
+
+def test_chunk_text_envelopes():
+    assert cli._ai_chunk_text('data: {"choices": [{"delta": {"content": "x"}}]}') == "x"
+    assert cli._ai_chunk_text('{"message": {"content": "y"}, "done": false}') == "y"
+    assert cli._ai_chunk_text("data: [DONE]") is None
+    assert cli._ai_chunk_text('{"id": "pre_0"}\n') == '{"id": "pre_0"}\n'
+
+
+def test_group_candidates_by_normalized_gloss():
+    cands = [
+        {"id": "pre_a", "type": "prefix", "gloss": "Water, liquid."},
+        {"id": "pre_b", "type": "prefix", "gloss": "water liquid"},
+        {"id": "suf_c", "type": "suffix", "gloss": "water, liquid"},
+        {"id": "pre_d", "type": "prefix", "gloss": "Éther"},
+        {"id": "pre_e", "type": "prefix", "gloss": "ether"},
+    ]
+    groups = cli._group_candidates(cands)
+    assert [[c["id"] for c in g] for g in groups] == [["pre_a", "pre_b"], ["suf_c"], ["pre_d", "pre_e"]]
+
+
+def test_fan_out_rewrites_ids():
+    resp = json.dumps({"id": "pre_a", "short_gloss_fr": "eau", "keep": True})
+    out = cli._fan_out(resp, {"pre_a": ["pre_a", "pre_b"]})
+    assert [json.loads(o)["id"] for o in out] == ["pre_a", "pre_b"]
+    assert {json.loads(o)["short_gloss_fr"] for o in out} == {"eau"}
+    assert cli._fan_out("not json", {"pre_a": ["pre_a"]}) == ["not json"]
+
+
+def _ai_run_dir(tmp_path: Path, monkeypatch, n):
+    monkeypatch.setattr(cli, "ETL_DIR", tmp_path / "etl")
+    ai_dir = tmp_path / "etl" / "runs" / "20250101-000000" / "ai"
+    ai_dir.mkdir(parents=True)
+    (ai_dir / "candidates.jsonl").write_text("\n".join(_lines(n)) + "\n", encoding="utf-8")
+    (ai_dir / "prompt.txt").write_text("tmpl\n", encoding="utf-8")
+    return ai_dir
+
+
+def _run_args(endpoint, tmp_path, **kw):
+    base = dict(run=None, resume=False, cache=str(tmp_path / "cache.sqlite"), cache_max_mb=0, cache_max_age_days=0)
+    base.update(kw)
+    return _args(endpoint, **base)
+
+
+def test_ai_run_resume_skips_checkpointed_candidates(stub_server, tmp_path: Path, monkeypatch):
+    _StubModel.latency = 0.0
+    ai_dir = _ai_run_dir(tmp_path, monkeypatch, 4)
+    _StubModel.fail_first = 1
+    try:
+        assert cli.cmd_ai_run(_run_args(stub_server, tmp_path)) == 0
+        assert (ai_dir / cli.AI_CHECKPOINT_NAME).read_text("utf-8").split() == ["pre_1", "pre_2", "pre_3"]
+        # simulate a crash after an answer was written but before it was checkpointed, plus a torn line
+        with (ai_dir / "output.jsonl").open("a", encoding="utf-8") as f:
+            f.write('{"id": "pre_0", "short_gloss_fr": "STALE"}\n{"id": "pre_')
+        _StubModel.seen = _StubModel.fail_first = 0
+        assert cli.cmd_ai_run(_run_args(stub_server, tmp_path, resume=True)) == 0
+    finally:
+        _StubModel.latency = 0.2
+    assert _StubModel.seen == 1
+    out = [json.loads(l) for l in (ai_dir / "output.jsonl").read_text("utf-8").splitlines()]
+    assert sorted(o["id"] for o in out) == [f"pre_{i}" for i in range(4)]
+    assert "STALE" not in {o["short_gloss_fr"] for o in out}
+
+
+def test_usage_is_read_from_stream_envelopes():
+    usage = {}
+    assert cli._ai_chunk_text('data: {"choices": [], "usage": {"prompt_tokens": 12, "completion_tokens": 5}}',
+                              usage) == ""
+    assert usage == {"prompt_tokens": 12, "completion_tokens": 5}
+    usage = {}
+    cli._ai_chunk_text('{"response": "", "done": true, "prompt_eval_count": 30, "eval_count": 7}', usage)
+    assert usage == {"prompt_tokens": 30, "completion_tokens": 7}
+
+
+def test_metrics_summary(stub_server, cache):
+    _StubModel.latency = 0.0
+    calls = cli._AICalls()
+    try:
+        list(cli._ai_responses(_lines(3), "tmpl", _args(stub_server), cache, calls=calls))
+        list(cli._ai_responses(_lines(4), "tmpl", _args(stub_server), cache, calls=calls))
+    finally:
+        _StubModel.latency = 0.2
+    m = cli._ai_metrics(calls.calls, 1.0)
+    assert (m["lookups"], m["cache_hits"], m["requests"]) == (7, 3, 4)
+    assert m["hit_rate"] == pytest.approx(3 / 7)
+    assert sum(m["latency_histogram"]["count"]) == 4
+    assert m["latency_s"]["p50"] <= m["latency_s"]["p99"] <= m["latency_s"]["max"]
+    assert m["tokens"]["estimated"] and m["tokens"]["completion"] > 0
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert cli._percentile(values, 50) == 50.0
+    assert cli._percentile(values, 99) == 99.0
+    assert cli._percentile(values, 100) == 100.0
+    assert cli._percentile([], 50) is None
@@ -0,0 +1,59 @@
+import gzip
+import json
+from collections import Counter
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from etl import bench, cli, synth_wiktextract as synth
+from etl import wiktextract_to_neologotron as w2n
+
+
+def test_corpus_is_seeded_and_realistic(tmp_path: Path):
+    a, b = tmp_path / "a.jsonl.gz", tmp_path / "b.jsonl"
+    info = synth.write_corpus(a, 2000, seed=3, affix_ratio=0.1, langs={"fr": 0.7, "mul": 0.3})
+    synth.write_corpus(b, 2000, seed=3, affix_ratio=0.1, langs={"fr": 0.7, "mul": 0.3})
+    assert gzip.decompress(a.read_bytes()) == b.read_bytes()
+    again = tmp_path / "sub" / "again.jsonl.gz"
+    synth.write_corpus(again, 2000, seed=3, affix_ratio=0.1, langs={"fr": 0.7, "mul": 0.3})
+    assert again.read_bytes() == a.read_bytes()  # no mtime or file name in the header
+    assert set(info["lang"]) == {"fr", "mul"}
+    affixes = sum(info["pos"].get(p, 0) for p in ("prefix", "suffix", "combining form"))
+    assert 120 < affixes < 280
+    entries = list(w2n.read_jsonl(str(a)))
+    assert all(e["senses"] and "glosses" in e["senses"][0] for e in entries)
+    prefixes, roots, suffixes = w2n.extract_rows(entries, {"fr"}, True)
+    assert prefixes and suffixes and roots
+
+
+def test_malformed_lines_are_counted(tmp_path: Path):
+    path = tmp_path / "c.jsonl"
+    info = synth.write_corpus(path, 500, seed=1, malformed_ratio=0.1)
+    stats = Counter()
+    assert len(list(w2n.read_jsonl(str(path), stats=stats))) == 500 - info["malformed"]
+    assert stats["malformed"] == info["malformed"] > 0
+
+
+def test_parse_langs():
+    assert synth.parse_langs("fr=0.6, en=0.4") == {"fr": 0.6, "en": 0.4}
+
+
+def test_bench_runs_every_case_in_a_sandbox(tmp_path: Path):
+    etl_dir = cli.ETL_DIR
+    report = bench.run_bench(tmp_path, 1500, repeat=1)
+    assert cli.ETL_DIR == etl_dir
+    assert list(report["cases"]) == ["read_jsonl", "extract_rows", "write_csv", "filter_mul", "merge",
+                                     "short_prefix_policy", "polish"]
+    assert report["cases"]["read_jsonl"]["items"] == 1500
+    assert all(r["items_per_s"] and r["peak_mem_kb"] >= 0 for r in report["cases"].values())
+    assert (tmp_path / "etl" / "runs" / "bench" / "polished").exists()
+    json.dumps(report)
+
+
+def test_bench_baseline_gates_memory():
+    base = {"merge": {"wall_s": 1.0, "cpu_s": 1.0, "peak_mem_kb": 10_000}}
+    cur = {"merge": {"wall_s": 1.1, "cpu_s": 1.0, "peak_mem_kb": 20_000}}
+    assert cli._metric_regressions(cur, base, 0.2) == []  # the wizard floors know no peak_mem_kb
+    (found,) = cli._metric_regressions(cur, base, 0.2, bench.BENCH_FLOORS)
+    assert found.startswith("merge.peak_mem_kb: 10000 → 20000")
@@ -0,0 +1,91 @@
+import csv
+import json
+from pathlib import Path
+import sys
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from etl import cli
+
+
+def _write(path: Path, rows):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        w.writeheader()
+        w.writerows(rows)
+
+
+def _alias_probabilities(prob, alias):
+    n = len(prob)
+    out = [p / n for p in prob]
+    for i, a in enumerate(alias):
+        out[a] += (1.0 - prob[i]) / n
+    return out
+
+
+def test_alias_table_reproduces_weights():
+    weights = [1.0, 3.0, 0.0, 6.0]
+    prob, alias = cli._alias_table(weights)
+    got = _alias_probabilities(prob, alias)
+    assert got == pytest.approx([w / 10.0 for w in weights], abs=1e-6)
+
+
+def test_alias_table_all_zero_is_uniform():
+    prob, alias = cli._alias_table([0.0, 0.0])
+    assert _alias_probabilities(prob, alias) == pytest.approx([0.5, 0.5])
+
+
+def test_generator_index_postings(tmp_path: Path):
+    _write(tmp_path / "neologotron_prefixes.csv", [
+        {"id": "pre_bio", "form": "bio-", "tags": "science, Médecine", "weight": "2"},
+        {"id": "pre_astro", "form": "astro-", "tags": "cosmos", "weight": ""},
+        {"id": "pre_neo", "form": "néo-", "tags": "", "weight": "1"},
+    ])
+    _write(tmp_path / "neologotron_racines.csv", [
+        {"id": "root_cephal", "form": "céphal", "domain": "médecine", "weight": "1"},
+    ])
+    out = cli._write_generator_index(tmp_path)
+    index = json.loads(out.read_text("utf-8"))
+    assert index["tags"] == ["cosmos", "médecine", "science"]
+    pre = index["prefixes"]
+    assert pre["ids"] == ["pre_bio", "pre_astro", "pre_neo"]
+    assert [p["rows"] for p in pre["postings"]] == [[1], [0], [0]]
+    assert pre["postings"][1]["total"] == 2.0
+    assert _alias_probabilities(pre["prob"], pre["alias"]) == pytest.approx([0.5, 0.25, 0.25], abs=1e-6)
+    assert [p["rows"] for p in index["roots"]["postings"]] == [[], [0], []]
+    assert index["suffixes"]["ids"] == []
+
+
+def _effective_weight(base, tags, selected, intensity):
+    """GeneratorService.effectiveWeight, transcribed."""
+    if not selected:
+        return base
+    matches = len(set(cli._split_tags(tags)) & selected)
+    return 0.0 if matches == 0 else base * (1.0 + matches * intensity)
+
+
+def test_index_draws_match_the_app_weighting(tmp_path: Path):
+    rows = [
+        {"id": "pre_bio", "form": "bio-", "tags": "science, médecine", "weight": "2"},
+        {"id": "pre_astro", "form": "astro-", "tags": "cosmos, science", "weight": "1"},
+        {"id": "pre_cardio", "form": "cardio-", "tags": "médecine", "weight": "3"},
+        {"id": "pre_neo", "form": "néo-", "tags": "", "weight": "1"},
+    ]
+    _write(tmp_path / "neologotron_prefixes.csv", rows)
+    index = cli._build_generator_index(tmp_path)
+    pre = index["prefixes"]
+    for selected in ({"science"}, {"science", "médecine"}, {"science", "médecine", "cosmos"}):
+        for intensity in (0.0, 0.5, 2.0):
+            # exact distribution of the README procedure: tag by total, row by the tag's table, accept/redraw
+            tag_ids = [index["tags"].index(t) for t in selected]
+            grand = sum(pre["postings"][t]["total"] for t in tag_ids)
+            kept = [0.0] * len(rows)
+            for t in tag_ids:
+                post = pre["postings"][t]
+                for row, p in zip(post["rows"], _alias_probabilities(post["prob"], post["alias"])):
+                    m = len(set(cli._split_tags(rows[row]["tags"])) & selected)
+                    kept[row] += post["total"] / grand * p * (1 / m + intensity) / (1 + intensity)
+            want = [_effective_weight(float(r["weight"]), r["tags"], selected, intensity) for r in rows]
+            assert [k / sum(kept) for k in kept] == pytest.approx([w / sum(want) for w in want], abs=1e-6)
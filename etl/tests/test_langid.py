@@ -0,0 +1,130 @@
+import argparse
+import csv
+import json
+from pathlib import Path
+import sys
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from etl import cli
+from etl import langid
+
+
+FR = [
+    "qui concerne la vie et les êtres vivants",
+    "relatif à la terre et au sol",
+    "action de faire quelque chose de nouveau",
+    "personne qui étudie les astres du ciel",
+    "petit animal qui vit dans l'eau douce",
+    "science qui étudie les maladies du corps",
+    "qualité de ce qui est très grand",
+    "instrument servant à mesurer la chaleur",
+    "état de celui qui est malade depuis longtemps",
+    "ensemble des arbres d'une forêt",
+    "qui a la forme d'une étoile",
+    "manière de parler propre à une région",
+    "lieu où l'on garde les livres anciens",
+    "qui se rapporte à la lumière du soleil",
+    "mouvement des eaux de la mer",
+    "partie de la plante qui porte les fleurs",
+    "celui qui fabrique des objets en bois",
+    "qui n'a pas de couleur visible",
+    "pièce de la maison où l'on dort",
+    "tendance à devenir plus petit avec le temps",
+]
+EN = [
+    "relating to life and living things",
+    "of or pertaining to the earth and soil",
+    "the act of making something new",
+    "a person who studies the stars in the sky",
+    "small animal that lives in fresh water",
+    "the science that studies diseases of the body",
+    "the quality of being very large",
+    "an instrument used to measure heat",
+    "the state of having been ill for a long time",
+    "all the trees of a forest",
+    "having the shape of a star",
+    "a way of speaking specific to a region",
+    "a place where old books are kept",
+    "relating to the light of the sun",
+    "the movement of the waters of the sea",
+    "the part of the plant that bears the flowers",
+    "one who makes objects out of wood",
+    "having no visible colour",
+    "the room of the house where one sleeps",
+    "the tendency to become smaller over time",
+]
+
+
+def _model():
+    model, accuracy = langid.LangId.train(FR, EN, dim=1 << 12)
+    return model, accuracy
+
+
+def test_trained_model_separates_languages():
+    model, accuracy = _model()
+    assert accuracy == 1.0
+    fr, en = model.english_proba(["qui étudie la forme des plantes", "of or relating to the shape of plants"])
+    assert fr < 0.5 < en
+
+
+def test_short_glosses_are_not_judged():
+    model, _ = _model()
+    assert model.english_proba(["the sun", "", "vie"]) == [None, None, None]
+
+
+def test_short_glosses_fall_back_to_heuristic(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(cli, "ETL_DIR", tmp_path / "etl")
+    _model()[0].save(tmp_path / "etl" / "cache" / cli.LANGID_MODEL_NAME)
+    scores = cli._english_scores(["study of", "fear of", "the act of", "vie", "relating to the light of the sun"])
+    assert scores[:4] == [1.0, 1.0, 1.0, 0.0]
+    assert scores[4] > 0.5
+
+
+def test_gloss_sample_covers_the_whole_dump():
+    entries = [{"senses": [{"glosses": [f"gloss number {i:05d}"]}]} for i in range(5000)]
+    sample = langid.gloss_texts(entries, 100, seed=1)
+    assert len(sample) == 100 == len(set(sample))
+    assert max(int(g.split()[-1]) for g in sample) > 2500
+    assert sample == langid.gloss_texts(entries, 100, seed=1)
+
+
+def test_pure_python_path_matches(monkeypatch):
+    model, _ = _model()
+    texts = ["the movement of the stars", "qui concerne les étoiles du ciel", "œuvre d'art"]
+    expected = model.english_proba(texts)
+    monkeypatch.setattr(langid, "np", None)
+    slow = langid.LangId(list(model.weights), model.scale, model.bias, model.dim)
+    assert slow.english_proba(texts) == pytest.approx(expected, abs=1e-9)
+
+
+def test_save_load_round_trip(tmp_path: Path):
+    model, _ = _model()
+    path = tmp_path / "cache" / "langid.json"
+    model.save(path)
+    loaded = langid.LangId.load(path)
+    texts = ["a place where books are kept", "lieu où l'on garde les livres"]
+    assert loaded.english_proba(texts) == pytest.approx(model.english_proba(texts), abs=1e-5)
+    assert langid.LangId.load(tmp_path / "missing.json") is None
+
+
+def test_prep_ai_uses_trained_model(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(cli, "ETL_DIR", tmp_path / "etl")
+    _model()[0].save(tmp_path / "etl" / "cache" / cli.LANGID_MODEL_NAME)
+    merged = tmp_path / "etl" / "runs" / "r1" / "merged"
+    merged.mkdir(parents=True)
+    recs = [
+        {"id": "root_a", "form": "astro", "gloss": "the study of stars and planets", "root_lang": "grc"},
+        {"id": "root_b", "form": "bio", "gloss": "qui concerne les êtres vivants", "root_lang": "grc"},
+    ]
+    with open(merged / "neologotron_racines.csv", "w", encoding="utf-8", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=list(recs[0]))
+        w.writeheader()
+        w.writerows(recs)
+    args = argparse.Namespace(run="r1", count=10, min_len=90, no_group=True, en_threshold=0.5)
+    assert cli.cmd_prep_ai(args) == 0
+    out = tmp_path / "etl" / "runs" / "r1" / "ai" / "candidates.jsonl"
+    picked = [json.loads(line)["id"] for line in out.read_text("utf-8").splitlines()]
+    assert picked == ["root_a"]
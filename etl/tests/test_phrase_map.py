@@ -0,0 +1,76 @@
+import argparse
+import csv
+import json
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from etl import cli
+
+
+GLOSSARY = {
+    "Head.": "tête",
+    "new": "nouveau",
+    "new world": "nouveau monde",
+    "light": "lumière",
+    "very small": "très petit",
+    "street": "rue",
+}
+
+
+def test_whole_gloss_lookup_is_case_folded():
+    pm = cli._PhraseMap(GLOSSARY)
+    assert pm.apply("Head.") == "tête"
+    assert pm.apply("  VERY SMALL ") == "très petit"
+    assert pm.exact_hits == 2 and pm.phrase_hits == 0
+
+
+def test_phrases_leftmost_longest_on_word_boundaries():
+    pm = cli._PhraseMap(GLOSSARY)
+    assert pm.apply("of the New World; light") == "of the Nouveau monde; lumière"
+    assert pm.apply("news, lightning") == "news, lightning"
+    assert pm.apply("new-light") == "nouveau-lumière"
+    assert pm.phrase_hits == 4
+
+
+def test_offsets_survive_length_changing_case_folds():
+    pm = cli._PhraseMap({"strasse": "rue", "new": "nouveau"})
+    assert pm.apply("Straße, new") == "Rue, nouveau"
+
+
+def test_whole_gloss_only_mode():
+    pm = cli._PhraseMap(GLOSSARY, phrases=False)
+    assert pm.apply("new") == "nouveau"
+    assert pm.apply("a new light") == "a new light"
+
+
+def test_polish_applies_map_across_csvs(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(cli, "ETL_DIR", tmp_path / "etl")
+    monkeypatch.setattr(cli, "APP_SEED_DIR", tmp_path / "assets")
+    merged = tmp_path / "etl" / "runs" / "r1" / "merged"
+    merged.mkdir(parents=True)
+    rows = {
+        "neologotron_prefixes.csv": [{"id": "pre_photo", "form": "photo-", "gloss": "light, new light"}],
+        "neologotron_suffixes.csv": [{"id": "suf_x", "form": "-x", "gloss": "Head."}],
+    }
+    for name, recs in rows.items():
+        with open(merged / name, "w", encoding="utf-8", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=list(recs[0]))
+            w.writeheader()
+            w.writerows(recs)
+    gloss_map = tmp_path / "map.json"
+    gloss_map.write_text(json.dumps(GLOSSARY), encoding="utf-8")
+    built = []
+    real = cli._PhraseMap
+    monkeypatch.setattr(cli, "_PhraseMap", lambda *a, **k: built.append(1) or real(*a, **k))
+    args = argparse.Namespace(run="r1", max_chars=80, map=str(gloss_map), out_dir=None)
+    assert cli.cmd_polish(args) == 0
+    assert len(built) == 1
+    out = tmp_path / "etl" / "runs" / "r1" / "polished"
+    with open(out / "neologotron_prefixes.csv", encoding="utf-8", newline="") as f:
+        assert next(csv.DictReader(f))["gloss"] == "lumière, nouveau lumière"
+    with open(out / "neologotron_suffixes.csv", encoding="utf-8", newline="") as f:
+        assert next(csv.DictReader(f))["gloss"] == "tête"
+    metrics = json.loads((out.parent / cli.METRICS_NAME).read_text("utf-8").splitlines()[-1])
+    assert metrics["map_whole"] == 1 and metrics["map_phrases"] == 3
@@ -0,0 +1,77 @@
+import csv
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from etl import cli
+from etl import wiktextract_to_neologotron as w2n
+
+
+def test_aho_corasick_finds_overlapping_matches():
+    ac = w2n.AhoCorasick()
+    for p in ("he", "she", "his", "hers"):
+        ac.add(p, p)
+    ac.build()
+    found = sorted((s, e, v) for s, e, v in ac.iter_matches("ushers"))
+    assert found == [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")]
+
+
+def test_count_productivity_respects_positions_and_templates():
+    rows = [
+        w2n.PrefixRow(id="pre_bio", form="bio-"),
+        w2n.SuffixRow(id="suf_logie", form="-logie"),
+        w2n.RootRow(id="root_morph", form="morpho-"),
+    ]
+    lemmas = [
+        {"lang_code": "fr", "word": "biologie", "pos": "noun"},
+        {"lang_code": "fr", "word": "symbiose", "pos": "noun"},  # 'bio' not at start
+        {"lang_code": "fr", "word": "amorphologie", "pos": "noun"},  # root counts anywhere
+        {"lang_code": "fr", "word": "bio", "pos": "noun"},  # equal to base: not derived
+        {"lang_code": "en", "word": "biology", "pos": "noun"},  # other language
+        {"lang_code": "fr", "word": "-logie", "pos": "suffix"},  # affix entries are skipped
+        {"lang_code": "fr", "word": "vie", "pos": "noun",
+         "etymology_templates": [{"name": "affix", "args": {"1": "fr", "2": "bio-", "3": "-logie"}}]},
+    ]
+    counts = w2n.count_productivity(lemmas, rows, {"fr"})
+    assert counts == [2, 3, 1]
+    w2n.apply_productivity_weights(rows, counts)
+    assert [r.weight for r in rows] == [2.481, 3.0, 1.75]
+
+
+def _transform_out(out_dir: Path, rows, counts) -> None:
+    w2n.apply_productivity_weights(rows, counts)
+    out_dir.mkdir()
+    w2n.write_csv(str(out_dir / "neologotron_prefixes.csv"), w2n.PREFIX_HEADERS, rows)
+    for name in ("neologotron_racines.csv", "neologotron_suffixes.csv"):
+        (out_dir / name).write_text("id,form,weight\n", encoding="utf-8")
+    w2n.write_productivity_counts(str(out_dir / w2n.PRODUCTIVITY_COUNTS_NAME),
+                                  {"neologotron_prefixes.csv": (rows, counts)})
+
+
+def test_merge_puts_fr_and_mul_weights_on_one_scale(tmp_path: Path):
+    _transform_out(tmp_path / "fr", [w2n.PrefixRow(id="pre_bio", form="bio-"),
+                                     w2n.PrefixRow(id="pre_xeno", form="xéno-")], [4, 0])
+    _transform_out(tmp_path / "mul", [w2n.PrefixRow(id="pre_neo", form="neo-"),
+                                      w2n.PrefixRow(id="pre_bio_mul", form="bio-")], [100, 50])
+    drops = {}
+    cli._merge_csvs(tmp_path / "fr", tmp_path / "mul", tmp_path / "merged", drops)
+    with open(tmp_path / "merged" / "neologotron_prefixes.csv", encoding="utf-8", newline="") as f:
+        weights = {r["id"]: float(r["weight"]) for r in csv.DictReader(f)}
+    # alone, FR's top form (bio-, 4 lemmas) would weigh 3.0 like MUL's neo- with 100
+    assert weights == {"pre_bio": w2n.productivity_weight(4, 100), "pre_xeno": 0.5, "pre_neo": 3.0}
+    assert weights["pre_bio"] < 1.5
+    assert drops == {"empty_form": 0, "duplicate_form": 1}
+
+
+def test_transform_writes_counts_only_with_productivity_weights(tmp_path: Path, monkeypatch):
+    sample = Path(w2n.__file__).with_name("sample_wiktextract.jsonl")
+    argv = ["w2n", "--input", str(sample), "--out-dir", str(tmp_path)]
+    monkeypatch.setattr(sys, "argv", argv + ["--productivity-weights"])
+    assert w2n.main() == 0
+    files = w2n.load_productivity_counts(str(tmp_path))
+    with open(tmp_path / "neologotron_prefixes.csv", encoding="utf-8", newline="") as f:
+        assert set(files["neologotron_prefixes.csv"]) == {r["id"] for r in csv.DictReader(f)}
+    monkeypatch.setattr(sys, "argv", argv)
+    assert w2n.main() == 0
+    assert w2n.load_productivity_counts(str(tmp_path)) is None
@@ -0,0 +1,64 @@
+import json
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from etl import cli
+from etl.profiling import StageProfiler
+
+
+def _busy(n):
+    return sum(i * i for i in range(n))
+
+
+def test_stage_reports_and_summary(tmp_path: Path):
+    prof = StageProfiler(tmp_path / "profile")
+    with prof.stage("alloc"):
+        blob = [bytes(1024) for _ in range(2000)]
+        _busy(50_000)
+    del blob
+    with prof.stage("compute"):
+        _busy(200_000)
+    out = tmp_path / "profile"
+    for name in ("alloc", "compute"):
+        assert (out / f"{name}.prof").exists()
+        assert "Top allocation sites" in (out / f"{name}.txt").read_text("utf-8")
+    summary = json.loads((out / "summary.json").read_text("utf-8"))
+    alloc, compute = summary["stages"]
+    assert alloc["tracemalloc_peak_bytes"] >= 2000 * 1024
+    assert any("_busy" in f["function"] or "genexpr" in f["function"] for f in compute["hot_functions"])
+    assert "Hot functions by self time" in (out / "summary.txt").read_text("utf-8")
+
+
+def test_disabled_profiler_writes_nothing(tmp_path: Path):
+    prof = StageProfiler(None)
+    with prof.stage("noop"):
+        _busy(10)
+    assert not prof.enabled and prof.stages == []
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_run_stages_profiles_each_stage(tmp_path: Path):
+    prof = StageProfiler(tmp_path / "profile")
+    stages = [cli._Stage("a", lambda: _busy(1000)), cli._Stage("b", lambda: _busy(1000))]
+    cli._run_stages(stages, tmp_path / "stages.json", jobs=4, profiler=prof)
+    assert [s["stage"] for s in prof.stages] == ["a", "b"]
+
+
+def test_subcommand_reports_do_not_replace_the_wizard_ones(tmp_path: Path, monkeypatch, capsys):
+    monkeypatch.setattr(cli, "ETL_DIR", tmp_path / "etl")
+    run_dir = tmp_path / "etl" / "runs" / "r1"
+    (run_dir / "profile").mkdir(parents=True)
+    (run_dir / "profile" / "summary.txt").write_text("wizard", encoding="utf-8")
+    (run_dir / cli.TRACE_NAME).write_text("wizard", encoding="utf-8")
+    monkeypatch.setattr(sys, "argv", ["cli.py", "--profile", "--trace", "metrics", "--run", "r1"])
+    assert cli.main() == 2  # no metrics recorded yet; still profiled and traced
+    assert (run_dir / "profile" / "summary.txt").read_text("utf-8") == "wizard"
+    assert (run_dir / cli.TRACE_NAME).read_text("utf-8") == "wizard"
+    assert (run_dir / "profile" / "metrics" / "summary.txt").exists()
+    assert json.loads((run_dir / "trace.metrics.json").read_text("utf-8"))["traceEvents"]
+
+    monkeypatch.setattr(sys, "argv", ["cli.py", "--trace", "metrics", "--run", "missing"])
+    assert cli.main() == 2
+    assert "running 'metrics' without --profile/--trace" in capsys.readouterr().err
@@ -0,0 +1,231 @@
+import argparse
+import csv
+import json
+from pathlib import Path
+import sys
+import threading
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from etl import cli
+
+
+PREFIX_ROWS = [
+    {"id": "pre_bio", "form": "bio-", "gloss": "vie", "origin": "grec", "tags": "science", "weight": "1", "ety_lang": "grc"},
+    {"id": "pre_neo", "form": "néo-", "gloss": "nouveau", "origin": "grec", "tags": "", "weight": "1", "ety_lang": "grc"},
+    {"id": "pre_astro", "form": "astro-", "gloss": "astre", "origin": "", "tags": "cosmos", "weight": "1", "ety_lang": "la"},
+]
+
+
+def _make_run(tmp_path: Path, monkeypatch) -> Path:
+    monkeypatch.setattr(cli, "ETL_DIR", tmp_path / "etl")
+    monkeypatch.setattr(cli, "APP_SEED_DIR", tmp_path / "assets")
+    run_dir = tmp_path / "etl" / "runs" / "20250101-000000"
+    merged = run_dir / "merged"
+    merged.mkdir(parents=True)
+    with open(merged / "neologotron_prefixes.csv", "w", encoding="utf-8", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=list(PREFIX_ROWS[0].keys()))
+        w.writeheader()
+        w.writerows(PREFIX_ROWS)
+    return run_dir
+
+
+def _review_args(**kw):
+    base = dict(run=None, csv="all", limit=None, origin_lang=None, domains=None, show_all=True, ids_file=None,
+                slice=None, reviewer=None)
+    base.update(kw)
+    return argparse.Namespace(**base)
+
+
+def test_store_is_built_lazily_and_keeps_order(tmp_path: Path, monkeypatch):
+    run_dir = _make_run(tmp_path, monkeypatch)
+    conn = cli._open_run_store(run_dir)
+    try:
+        assert list(cli._store_files(conn)) == ["neologotron_prefixes.csv"]
+        assert [r["id"] for r in cli._store_rows(conn, "neologotron_prefixes.csv")] == ["pre_bio", "pre_neo", "pre_astro"]
+        tagged = conn.execute("SELECT r.id FROM row_tags t JOIN rows r ON r.rid = t.rid WHERE t.tag = 'cosmos'").fetchall()
+        assert [r["id"] for r in tagged] == ["pre_astro"]
+    finally:
+        conn.close()
+    assert (run_dir / cli.RUN_STORE_NAME).exists()
+
+
+def test_review_then_apply_review_uses_store(tmp_path: Path, monkeypatch):
+    run_dir = _make_run(tmp_path, monkeypatch)
+    answers = iter(["r", "e", "gloss=astre, étoile"])
+    monkeypatch.setattr("builtins.input", lambda *_: next(answers))
+    assert cli.cmd_review(_review_args(origin_lang="grc", domains="sci")) == 0  # only pre_bio
+    assert cli.cmd_review(_review_args(origin_lang="la")) == 0  # only pre_astro
+
+    out_dir = tmp_path / "reviewed"
+    assert cli.cmd_apply_review(argparse.Namespace(run=None, out_dir=str(out_dir))) == 0
+    with open(out_dir / "neologotron_prefixes.csv", encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [r["id"] for r in rows] == ["pre_neo", "pre_astro"]
+    assert rows[1]["gloss"] == "astre"  # edits split on commas: "gloss=astre" and " étoile"
+    manifest = json.loads((tmp_path / "assets" / cli.SEED_MANIFEST_NAME).read_text("utf-8"))
+    assert "neologotron_prefixes.csv" in manifest["files"]
+
+
+def test_parallel_reviewers_interleave_on_disjoint_slices(tmp_path: Path, monkeypatch):
+    run_dir = _make_run(tmp_path, monkeypatch)
+    cli._open_run_store(run_dir).close()  # built by the wizard before anyone reviews
+    ana_waiting, bob_done = threading.Event(), threading.Event()
+    prompts = {"ana": 0, "bob": 0}
+    results = {}
+
+    def _input(*_):
+        who = threading.current_thread().name
+        prompts[who] += 1
+        if who == "ana" and prompts[who] == 2:
+            ana_waiting.set()  # first decision made, session still open at the next prompt
+            assert bob_done.wait(10)
+        if who == "bob":
+            assert ana_waiting.wait(10)
+        return "a"
+
+    def _review(who: str, k: int) -> None:
+        try:
+            results[who] = cli.cmd_review(_review_args(slice=f"{k}/2", reviewer=who))
+        except Exception as ex:  # e.g. "database is locked"
+            results[who] = ex
+        finally:
+            if who == "bob":
+                bob_done.set()
+
+    monkeypatch.setattr("builtins.input", _input)
+    threads = [threading.Thread(target=_review, args=(who, k), name=who) for who, k in (("ana", 2), ("bob", 1))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(30)
+    assert results == {"ana": 0, "bob": 0}
+    assert prompts == {"ana": 2, "bob": 1}
+    seen = {}
+    conn = cli._open_run_store(run_dir)
+    try:
+        for rid in ("pre_bio", "pre_neo", "pre_astro"):
+            dec = cli._decision_for(conn, rid)
+            assert dec["action"] == "accept"
+            seen.setdefault(dec["reviewer"], []).append(rid)
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    finally:
+        conn.close()
+    assert seen == {"ana": ["pre_bio", "pre_astro"], "bob": ["pre_neo"]}
+    assert cli.cmd_review(_review_args(slice="3/2")) == 2
+
+
+def test_review_queue_serves_by_priority_and_sinks_skips(tmp_path: Path, monkeypatch):
+    run_dir = _make_run(tmp_path, monkeypatch)
+    conn = cli._open_run_store(run_dir)
+    try:
+        scores = {r["id"]: r for r in conn.execute("SELECT r.id, s.priority, s.reasons FROM scores s JOIN rows r ON r.rid = s.rid")}
+        # pre_astro: short gloss and no origin; pre_bio: short gloss; pre_neo: only missing tags
+        assert scores["pre_astro"]["reasons"] == "short_gloss,no_origin"
+        assert scores["pre_astro"]["priority"] > scores["pre_bio"]["priority"] > scores["pre_neo"]["priority"]
+        order = [rec["id"] for rec, _ in cli._review_queue(conn, cli.CSV_FILES, "1", [], True)]
+        assert order == ["pre_astro", "pre_bio", "pre_neo"]
+    finally:
+        conn.close()
+
+    answers = iter(["s", "q"])
+    monkeypatch.setattr("builtins.input", lambda *_: next(answers))
+    cli.cmd_review(_review_args())
+    conn = cli._open_run_store(run_dir)
+    try:
+        order = [rec["id"] for rec, _ in cli._review_queue(conn, cli.CSV_FILES, "1", [], True)]
+        assert order == ["pre_bio", "pre_neo", "pre_astro"]
+    finally:
+        conn.close()
+
+
+def test_search_ranks_matches_and_counts_facets(tmp_path: Path, monkeypatch):
+    run_dir = _make_run(tmp_path, monkeypatch)
+    conn = cli._open_run_store(run_dir)
+    try:
+        hits = cli._search(conn, "astr")
+        assert [h["id"] for h in hits] == ["pre_astro"]
+        assert [h["id"] for h in cli._search(conn, "neo")] == ["pre_neo"]  # diacritics folded
+        where, params = cli._search_rids(conn, "vie OR nouveau")
+        facets = cli._facet_counts(conn, where, params)
+        assert facets["origin"] == [("grc", 2)]
+        assert facets["tag"] == [("science", 1)]
+    finally:
+        conn.close()
+
+    shown = []
+    monkeypatch.setattr("builtins.input", lambda *_: "s")
+    monkeypatch.setattr(cli, "_review_loop", lambda queue, *a, **k: shown.extend(r["id"] for r, _ in queue) or 0)
+    assert cli.cmd_review(_review_args(query="nouveau")) == 0
+    assert shown == ["pre_neo"]
+
+
+def test_malformed_search_falls_back_to_plain_words(tmp_path: Path, monkeypatch, capsys):
+    run_dir = _make_run(tmp_path, monkeypatch)
+    conn = cli._open_run_store(run_dir)
+    try:
+        for text in ("vie:", "bio AND", "--", "C++ OR", 'astre"'):
+            query = cli._checked_search_query(conn, text)
+            cli._search(conn, query)
+            where, params = cli._search_rids(conn, query)
+            cli._facet_counts(conn, where, params)
+        assert [h["id"] for h in cli._search(conn, cli._checked_search_query(conn, "vie:"))] == ["pre_bio"]
+        assert cli._checked_search_query(conn, "vie OR astre") == "vie OR astre"
+    finally:
+        conn.close()
+    assert "Search syntax not understood" in capsys.readouterr().err
+    assert cli.cmd_search(argparse.Namespace(run=None, query="bio AND", limit=5, facets=5)) == 0
+
+
+def test_prep_ai_groups_shared_glosses(tmp_path: Path, monkeypatch):
+    run_dir = _make_run(tmp_path, monkeypatch)
+    with open(run_dir / "merged" / "neologotron_prefixes.csv", "a", encoding="utf-8", newline="") as f:
+        f.write("pre_vita,vita-,Vie,latin,,1,la\n")
+    args = argparse.Namespace(run=None, count=10, min_len=1, no_group=False)
+    assert cli.cmd_prep_ai(args) == 0
+    cands = [json.loads(l) for l in (run_dir / "ai" / "candidates.jsonl").read_text("utf-8").splitlines()]
+    assert len(cands) == 3
+    groups = json.loads((run_dir / "ai" / cli.AI_GROUPS_NAME).read_text("utf-8"))
+    assert list(groups.values()) in ([["pre_bio", "pre_vita"]], [["pre_vita", "pre_bio"]])
+
+
+def test_empty_glosses_are_never_grouped():
+    cands = [{"id": f"suf_{i}", "type": "suffix", "gloss": g} for i, g in enumerate(["", "  ", "-", "Étude", "etude."])]
+    groups = cli._group_candidates(cands)
+    assert [[c["id"] for c in g] for g in groups] == [["suf_0"], ["suf_1"], ["suf_2"], ["suf_3", "suf_4"]]
+
+
+def test_wizard_rebuild_keeps_review_state(tmp_path: Path, monkeypatch):
+    from etl import wizard_bench
+
+    monkeypatch.setattr(cli, "ETL_DIR", tmp_path / "etl")
+    monkeypatch.setattr("builtins.input", lambda *_: "")
+
+    def _wizard(seed: int) -> None:
+        wizard_bench.make_dumps(tmp_path / "dumps", 300, 0, seed)
+        with wizard_bench.serve(tmp_path / "dumps") as base:
+            args = argparse.Namespace(fr_only=True, run="r1", jobs=1, yes=True, profile=False, trace=False,
+                                      fr_url=f"{base}/{wizard_bench.FR_NAME}", all_url=None,
+                                      assets_dir=str(tmp_path / "assets"))
+            assert cli.wizard(args) == 0
+
+    _wizard(seed=1)
+    run_dir = tmp_path / "etl" / "runs" / "r1"
+    conn = cli._open_run_store(run_dir)
+    try:
+        key = conn.execute("SELECT key FROM rows ORDER BY rid LIMIT 1").fetchone()["key"]
+        cli._record_decision(conn, {"id": key, "action": "reject"}, "ana")
+        conn.execute("INSERT INTO review_skips(key, n) VALUES ('gone', 2)")
+        conn.commit()
+    finally:
+        conn.close()
+    merged = (run_dir / "merged" / "neologotron_prefixes.csv").read_bytes()
+    _wizard(seed=2)  # new FR dump: transform, merge and store run again
+    assert (run_dir / "merged" / "neologotron_prefixes.csv").read_bytes() != merged
+    assert not (run_dir / (cli.RUN_STORE_NAME + "-wal")).exists()
+    conn = cli._open_run_store(run_dir)
+    try:
+        assert cli._decision_for(conn, key)["reviewer"] == "ana"
+        assert conn.execute("SELECT n FROM review_skips WHERE key = 'gone'").fetchone()["n"] == 2
+    finally:
+        conn.close()
@@ -0,0 +1,105 @@
+import csv
+import json
+from pathlib import Path
+import sys
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from etl import cli
+
+
+def _write(path: Path, rows):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=["id", "form", "gloss"])
+        w.writeheader()
+        w.writerows(rows)
+
+
+def test_seed_delta_tracks_added_changed_removed(tmp_path: Path):
+    assets = tmp_path / "assets"
+    run = tmp_path / "run"
+    name = "neologotron_prefixes.csv"
+    _write(assets / name, [
+        {"id": "pre_bio", "form": "bio-", "gloss": "vie"},
+        {"id": "pre_neo", "form": "néo-", "gloss": "nouveau"},
+    ])
+    _write(run / name, [
+        {"id": "pre_bio", "form": "bio-", "gloss": "vie, vivant"},
+        {"id": "pre_astro", "form": "astro-", "gloss": "astre"},
+    ])
+    path = cli._write_seed_delta(run, assets)
+    delta = json.loads(path.read_text("utf-8"))
+    assert delta["version"] == 1 and delta["base_version"] is None
+    assert delta["on_base_mismatch"] == "full_reseed"
+    entry = delta["files"][name]
+    assert [r["id"] for r in entry["added"]] == ["pre_astro"]
+    assert [r["gloss"] for r in entry["changed"]] == ["vie, vivant"]
+    assert entry["removed"] == ["pre_neo"]
+    assert entry["sha256"] == cli._file_sha256(run / name)
+
+    # Once exported, the same content yields no new version
+    (assets / name).write_bytes((run / name).read_bytes())
+    assert cli._write_seed_delta(run, assets) is None
+    _write(run / name, [{"id": "pre_bio", "form": "bio-", "gloss": "vie"}])
+    delta = json.loads(cli._write_seed_delta(run, assets).read_text("utf-8"))
+    assert (delta["version"], delta["base_version"]) == (2, 1)
+    assert delta["files"][name]["removed"] == ["pre_astro"]
+
+
+def test_copy_to_assets_skips_unchanged_and_writes_manifest(tmp_path: Path, monkeypatch):
+    assets = tmp_path / "assets"
+    run = tmp_path / "run"
+    monkeypatch.setattr(cli, "APP_SEED_DIR", assets)
+    for name in cli.CSV_FILES:
+        _write(run / name, [{"id": f"x_{name[:5]}", "form": "x", "gloss": "y"}])
+    cli._copy_to_assets(run)
+    first = {name: (assets / name).stat().st_mtime_ns for name in cli.CSV_FILES}
+    manifest = json.loads((assets / cli.SEED_MANIFEST_NAME).read_text("utf-8"))
+    for name in cli.CSV_FILES:
+        assert (assets / name).read_bytes() == (run / name).read_bytes()
+        assert manifest["files"][name]["sha256"] == cli._file_sha256(run / name)
+        assert manifest["files"][name]["bytes"] == (run / name).stat().st_size
+
+    _write(run / cli.CSV_FILES[0], [{"id": "pre_new", "form": "new", "gloss": "z"}])
+    cli._copy_to_assets(run)
+    assert (assets / cli.CSV_FILES[0]).read_bytes() == (run / cli.CSV_FILES[0]).read_bytes()
+    for name in cli.CSV_FILES[1:]:
+        assert (assets / name).stat().st_mtime_ns == first[name]
+    assert not list(assets.glob(".*.tmp"))
+
+
+def test_failed_copy_leaves_the_previous_delta(tmp_path: Path, monkeypatch):
+    assets = tmp_path / "assets"
+    run = tmp_path / "run"
+    monkeypatch.setattr(cli, "APP_SEED_DIR", assets)
+    for name in cli.CSV_FILES:
+        _write(run / name, [{"id": f"x_{name[:5]}", "form": "x", "gloss": "y"}])
+    cli._copy_to_assets(run)
+    assert json.loads((assets / cli.SEED_DELTA_NAME).read_text("utf-8"))["version"] == 1
+
+    for name in cli.CSV_FILES:
+        _write(run / name, [{"id": f"x_{name[:5]}", "form": "x", "gloss": "z"}])
+    sync = cli._sync_file
+    copied = []
+
+    def flaky(src, dst):
+        if copied:
+            raise OSError("disk full")
+        copied.append(src.name)
+        return sync(src, dst)
+
+    monkeypatch.setattr(cli, "_sync_file", flaky)
+    with pytest.raises(OSError):
+        cli._copy_to_assets(run)
+    assert json.loads((assets / cli.SEED_DELTA_NAME).read_text("utf-8"))["version"] == 1
+
+    monkeypatch.setattr(cli, "_sync_file", sync)
+    cli._copy_to_assets(run)
+    delta = json.loads((assets / cli.SEED_DELTA_NAME).read_text("utf-8"))
+    assert (delta["version"], delta["base_version"]) == (2, 1)
+    manifest = json.loads((assets / cli.SEED_MANIFEST_NAME).read_text("utf-8"))
+    assert manifest["files"][cli.SEED_DELTA_NAME]["sha256"] == cli._file_sha256(assets / cli.SEED_DELTA_NAME)
+    assert not list(assets.glob(".*.tmp")) and not list(run.glob(".*.tmp"))
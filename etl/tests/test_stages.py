@@ -0,0 +1,143 @@
+import json
+import subprocess
+import time
+from pathlib import Path
+import sys
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from etl import cli
+
+
+def _writer(path: Path, text_fn, log, name, delay=0.0):
+    def fn():
+        log.append((name, "start", time.perf_counter()))
+        time.sleep(delay)
+        path.write_text(text_fn(), encoding="utf-8")
+        log.append((name, "end", time.perf_counter()))
+    return fn
+
+
+def _pipeline(tmp_path: Path, log, source="v1", delay=0.0):
+    a, b, c = tmp_path / "a.txt", tmp_path / "b.txt", tmp_path / "c.txt"
+    return [
+        cli._Stage("a", _writer(a, lambda: source, log, "a", delay), outputs=[a], params={"src": source}),
+        cli._Stage("b", _writer(b, lambda: "b", log, "b", delay), outputs=[b]),
+        cli._Stage("c", _writer(c, lambda: a.read_text() + b.read_text(), log, "c"), deps=["a", "b"],
+                   inputs=[a, b], outputs=[c]),
+    ]
+
+
+def test_independent_stages_overlap(tmp_path: Path):
+    log = []
+    report = cli._run_stages(_pipeline(tmp_path, log, delay=0.2), tmp_path / "stages.json", jobs=2)
+    assert {k: v["status"] for k, v in report.items()} == {"a": "ran", "b": "ran", "c": "ran"}
+    times = {(n, ev): t for n, ev, t in log}
+    assert times[("b", "start")] < times[("a", "end")]  # a and b ran together
+    assert times[("c", "start")] >= max(times[("a", "end")], times[("b", "end")])
+    assert (tmp_path / "c.txt").read_text() == "v1b"
+
+
+def test_rerun_skips_up_to_date_and_rebuilds_changed(tmp_path: Path):
+    memo = tmp_path / "stages.json"
+    cli._run_stages(_pipeline(tmp_path, []), memo)
+    log = []
+    report = cli._run_stages(_pipeline(tmp_path, log), memo)
+    assert {v["status"] for v in report.values()} == {"skipped"} and log == []
+
+    log = []
+    report = cli._run_stages(_pipeline(tmp_path, log, source="v2"), memo)
+    assert [report[n]["status"] for n in "abc"] == ["ran", "skipped", "ran"]
+    assert (tmp_path / "c.txt").read_text() == "v2b"
+
+    (tmp_path / "b.txt").unlink()
+    report = cli._run_stages(_pipeline(tmp_path, [], source="v2"), memo)
+    assert [report[n]["status"] for n in "abc"] == ["skipped", "ran", "skipped"]  # same b content: c unchanged
+
+
+def test_failed_stage_stops_dependents(tmp_path: Path):
+    ran = []
+
+    def boom():
+        raise RuntimeError("boom")
+
+    stages = [cli._Stage("a", boom, outputs=[tmp_path / "a"]),
+              cli._Stage("b", lambda: ran.append("b"), deps=["a"])]
+    with pytest.raises(RuntimeError):
+        cli._run_stages(stages, tmp_path / "stages.json")
+    assert ran == []
+    assert not (tmp_path / "stages.json").exists()
+
+
+def test_unknown_dependency_is_rejected(tmp_path: Path):
+    with pytest.raises(ValueError):
+        cli._run_stages([cli._Stage("a", lambda: None, deps=["nope"])], tmp_path / "stages.json")
+
+
+def test_concurrent_stages_silence_progress_lines(tmp_path: Path):
+    seen = {}
+
+    def probe(name):
+        def fn():
+            seen[name] = cli._live_progress()
+        return fn
+
+    cli._run_stages([cli._Stage("a", probe("a"))], tmp_path / "m1.json", jobs=1)
+    cli._run_stages([cli._Stage("b", probe("b"))], tmp_path / "m2.json", jobs=2)
+    assert seen == {"a": True, "b": False}
+
+
+def test_stage_metrics_are_recorded(tmp_path: Path):
+    src = tmp_path / "in.txt"
+    src.write_text("x" * 100)
+    out = tmp_path / "out.txt"
+
+    def fn():
+        out.write_text("y" * 40)
+        return {"lines_in": 10, "rows_out": 4, "dropped": {"short": 6}, "cpu_s": 1.5, "peak_rss_kb": 1}
+
+    metrics_path = tmp_path / "metrics.jsonl"
+    report = cli._run_stages([cli._Stage("s", fn, inputs=[src], outputs=[out])], tmp_path / "stages.json",
+                             metrics_path=metrics_path)
+    m = report["s"]["metrics"]
+    assert (m["bytes_in"], m["bytes_out"], m["rows_out"], m["dropped"]) == (100, 40, 4, {"short": 6})
+    assert m["cpu_s"] >= 1.5 and m["lines_per_s"] > 0
+    if cli.peak_rss_kb() is not None:
+        assert m["peak_rss_kb"] > 1
+    (rec,) = [json.loads(l) for l in metrics_path.read_text().splitlines()]
+    assert rec["stage"] == "s" and rec["run"] == tmp_path.name
+
+
+def test_metric_regressions_use_tolerance_and_floor():
+    base = {"transform_fr": {"wall_s": 10.0, "cpu_s": 9.0, "peak_rss_kb": 100_000}}
+    cur = {"transform_fr": {"wall_s": 13.0, "cpu_s": 9.4, "peak_rss_kb": 200_000}}
+    found = cli._metric_regressions(cur, base, tolerance=0.2)
+    assert [f.split(":")[0] for f in found] == ["transform_fr.wall_s", "transform_fr.peak_rss_kb"]
+    assert cli._metric_regressions({"x": {"wall_s": 0.3}}, {"x": {"wall_s": 0.1}}) == []
+
+
+def test_merge_counts_empty_forms_on_both_sides(tmp_path: Path):
+    for side, forms in (("fr", ["bio-", "", "", "néo-"]), ("mul", ["bio-", "", "xeno-"])):
+        (tmp_path / side).mkdir()
+        for name in cli.CSV_FILES:
+            lines = ["id,form"] + [f"{side}_{i},{f}" for i, f in enumerate(forms)]
+            (tmp_path / side / name).write_text("\n".join(lines) + "\n", encoding="utf-8")
+    drops = {}
+    counts = cli._merge_csvs(tmp_path / "fr", tmp_path / "mul", tmp_path / "merged", drops)
+    assert set(counts.values()) == {3}  # bio- and néo- from FR, xeno- from MUL
+    per_csv = len(cli.CSV_FILES)
+    assert drops == {"empty_form": 3 * per_csv, "duplicate_form": 1 * per_csv}
+
+
+def test_transform_writes_stats(tmp_path: Path):
+    script = Path(cli.__file__).with_name("wiktextract_to_neologotron.py")
+    sample = script.with_name("sample_wiktextract.jsonl")
+    stats_path = tmp_path / "stats.json"
+    subprocess.run([sys.executable, str(script), "--input", str(sample), "--out-dir", str(tmp_path),
+                    "--stats-out", str(stats_path)], check=True, capture_output=True)
+    stats = json.loads(stats_path.read_text("utf-8"))
+    assert stats["lines_in"] == 4
+    assert sum(stats["rows_out"].values()) + sum(stats["dropped"].values()) == 4
+    assert stats["bytes_in"] == sample.stat().st_size
@@ -0,0 +1,62 @@
+import argparse
+import csv
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from etl import cli
+
+
+def _write_prefixes(path: Path, rows) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=["id", "form", "tags"])
+        w.writeheader()
+        w.writerows(rows)
+
+
+def test_rows_live_in_one_shard_and_are_referenced_elsewhere(tmp_path: Path):
+    src = tmp_path / "merged"
+    rows = [
+        {"id": "pre_bio", "form": "bio-", "tags": "Science, médecine"},
+        {"id": "pre_astro", "form": "astro-", "tags": "cosmos"},
+        {"id": "pre_neo", "form": "néo-", "tags": ""},
+    ]
+    _write_prefixes(src / "neologotron_prefixes.csv", rows)
+    out = tmp_path / "themes"
+    index = cli._shard_by_theme(src, out)
+    themes = index["themes"]
+    assert sorted(themes) == ["_untagged", "cosmos", "medecine", "science"]
+    assert themes["medecine"]["label"] == "médecine"
+    assert themes["science"]["files"]["neologotron_prefixes.csv"]["rows"] == 1
+    assert "neologotron_prefixes.csv" not in themes["medecine"]["files"]
+
+    [[home, offset, length]] = themes["medecine"]["refs"]["neologotron_prefixes.csv"]
+    data = (out / home / "neologotron_prefixes.csv").read_bytes()
+    line = data[offset:offset + length].decode("utf-8")
+    assert next(csv.reader([line]))[:2] == ["pre_bio", "bio-"]
+    with open(out / "_untagged" / "neologotron_prefixes.csv", encoding="utf-8", newline="") as f:
+        assert [r["id"] for r in csv.DictReader(f)] == ["pre_neo"]
+
+
+def test_reshard_removes_stale_themes_here_and_in_assets(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(cli, "ETL_DIR", tmp_path / "etl")
+    monkeypatch.setattr(cli, "APP_SEED_DIR", tmp_path / "assets")
+    merged = tmp_path / "etl" / "runs" / "r1" / "merged" / "neologotron_prefixes.csv"
+    _write_prefixes(merged, [{"id": "pre_bio", "form": "bio-", "tags": "science"},
+                             {"id": "pre_astro", "form": "astro-", "tags": "cosmos"}])
+    args = argparse.Namespace(run="r1", src="merged", out_dir=None, to_assets=True)
+    assert cli.cmd_shard_themes(args) == 0
+    out = tmp_path / "etl" / "runs" / "r1" / cli.THEMES_DIR_NAME
+    assets = tmp_path / "assets" / cli.THEMES_DIR_NAME
+    assert (out / "cosmos" / "neologotron_prefixes.csv").exists()
+    assert (assets / "cosmos" / "neologotron_prefixes.csv").exists()
+    (out / "notes.txt").write_text("kept", encoding="utf-8")
+
+    _write_prefixes(merged, [{"id": "pre_bio", "form": "bio-", "tags": "science"},
+                             {"id": "pre_astro", "form": "astro-", "tags": "science"}])
+    assert cli.cmd_shard_themes(args) == 0
+    for root in (out, assets):
+        assert sorted(p.name for p in root.iterdir() if p.is_dir()) == ["science"]
+    assert (out / "notes.txt").read_text(encoding="utf-8") == "kept"
@@ -0,0 +1,66 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from etl import cli, tracing
+
+
+def _events(path: Path):
+    return json.loads(path.read_text("utf-8"))["traceEvents"]
+
+
+def test_disabled_tracing_records_nothing():
+    assert not tracing.enabled()
+    with tracing.span("noop", x=1) as span:
+        span["y"] = 2
+    tracing.counter("c", n=1)
+    assert tracing.stop() is None
+    assert tracing.child_path("x") is None
+
+
+def test_stage_spans_on_worker_threads(tmp_path: Path):
+    def _sleep():
+        time.sleep(0.05)
+
+    stages = [cli._Stage("a", _sleep), cli._Stage("b", _sleep), cli._Stage("c", _sleep, deps=["a", "b"])]
+    tracing.start(tmp_path / "trace.json", "test")
+    try:
+        cli._run_stages(stages, tmp_path / "stages.json", jobs=2)
+    finally:
+        path = tracing.stop()
+    events = _events(path)
+    spans = {e["name"]: e for e in events if e["ph"] == "X" and e["cat"] == "stage"}
+    assert set(spans) == {"a", "b", "c"}
+    assert spans["a"]["tid"] != spans["b"]["tid"]
+    assert spans["c"]["ts"] >= max(spans[n]["ts"] + spans[n]["dur"] for n in "ab")
+    names = {e["tid"]: e["args"]["name"] for e in events if e["name"] == "thread_name"}
+    assert names[spans["a"]["tid"]].startswith("stage")
+    assert any(e["name"] == "wait_stages" for e in events)
+
+
+def test_ordered_map_records_consumer_stalls(tmp_path: Path):
+    tracing.start(tmp_path / "trace.json", "test")
+    try:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            assert list(cli._ordered_map(lambda x: time.sleep(0.02) or x, range(4), pool, 2)) == [0, 1, 2, 3]
+    finally:
+        events = _events(tracing.stop())
+    assert any(e["name"] == "wait_result" for e in events)
+    assert any(e["ph"] == "C" and e["name"] == "pool inflight" for e in events)
+
+
+def test_transform_trace_is_merged(tmp_path: Path):
+    sample = Path(cli.__file__).with_name("sample_wiktextract.jsonl")
+    tracing.start(tmp_path / "trace.json", "test")
+    try:
+        cli._run_transform(sample, tmp_path / "csv_fr", lang="fr", include_translingual=False)
+    finally:
+        events = _events(tracing.stop())
+    parent = next(e for e in events if e["name"] == "transform")
+    child = [e for e in events if e["pid"] == parent["args"]["child_pid"] and e["ph"] == "X"]
+    assert {e["name"] for e in child} >= {"extract_rows", "write_csv"}
+    assert not list(tmp_path.glob("trace.*.json"))
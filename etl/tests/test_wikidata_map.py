@@ -0,0 +1,69 @@
+import csv
+import io
+import json
+import os
+from pathlib import Path
+import sys
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from etl import wikidata_map as wdm
+from etl import wiktextract_to_neologotron as w2n
+
+
+def test_json_is_streamed_across_chunk_boundaries(monkeypatch):
+    monkeypatch.setattr(wdm, "_CHUNK", 7)
+    doc = {"bio-#fr": "Q1", "-logie#fr": "Q22", "é\"x#mul": "Q333", "n#fr": 12, "æon#la": "Q4"}
+    pairs = list(wdm.iter_json_pairs(io.StringIO(json.dumps(doc, indent=1, ensure_ascii=False))))
+    assert pairs == [("bio-#fr", "Q1"), ("-logie#fr", "Q22"), ("é\"x#mul", "Q333"), ("æon#la", "Q4")]
+    assert list(wdm.iter_json_pairs(io.StringIO(" { } "))) == []
+    with pytest.raises(ValueError):
+        list(wdm.iter_json_pairs(io.StringIO('{"a#fr": "Q1" "b#fr": "Q2"}')))
+
+
+def test_tsv_store_lookups_and_rebuild_on_change(tmp_path: Path):
+    src = tmp_path / "qids.tsv"
+    src.write_text("lemma\tlang\tqid\nbio-\tfr\tQ1\n# comment\n-logie#fr\tQ2\nbad\tline\tX\n", encoding="utf-8")
+    with wdm.open_store(src) as store:
+        assert len(store) == 2
+        assert store.get("bio-", "fr") == "Q1" and store.get("-logie", "fr") == "Q2"
+        assert store.get("bio-", "mul") is None
+        assert (store.lookups, store.hits) == (3, 2)
+    built = src.with_name("qids.tsv.sqlite")
+    assert built.exists()
+    stamp = built.stat().st_mtime_ns
+    wdm.open_store(src).close()
+    assert built.stat().st_mtime_ns == stamp  # reused
+    src.write_text("bio-#fr\tQ9\n", encoding="utf-8")
+    os.utime(src, ns=(stamp + 10**9, stamp + 10**9))
+    with wdm.open_store(src) as store:
+        assert store.get("bio-", "fr") == "Q9" and len(store) == 1
+    with wdm.open_store(built) as store:  # a built store can be passed directly
+        assert store.get("bio-", "fr") == "Q9"
+    with pytest.raises(ValueError):
+        wdm.QidStore(src)
+
+
+def test_transform_fills_wikidata_qid_column(tmp_path: Path, monkeypatch):
+    entries = [
+        {"lang_code": "fr", "word": "bio-", "pos": "prefix", "senses": [{"glosses": ["vie"]}],
+         "etymology_text": "Du grec ancien βίος"},
+        {"lang_code": "fr", "word": "-logie", "pos": "suffix", "senses": [{"glosses": ["étude"]}],
+         "etymology_text": "Du grec ancien λόγος"},
+    ]
+    dump = tmp_path / "in.jsonl"
+    dump.write_text("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entries), encoding="utf-8")
+    qmap = tmp_path / "qids.json"
+    qmap.write_text(json.dumps({"bio-#fr": "Q2248623"}), encoding="utf-8")
+    out = tmp_path / "out"
+    stats = tmp_path / "stats.json"
+    monkeypatch.setattr(sys, "argv", ["w2n", "--input", str(dump), "--out-dir", str(out),
+                                      "--wikidata-map", str(qmap), "--stats-out", str(stats)])
+    assert w2n.main() == 0
+    with open(out / "neologotron_prefixes.csv", encoding="utf-8", newline="") as f:
+        assert [r["wikidata_qid"] for r in csv.DictReader(f)] == ["Q2248623"]
+    with open(out / "neologotron_suffixes.csv", encoding="utf-8", newline="") as f:
+        assert [r["wikidata_qid"] for r in csv.DictReader(f)] == [""]
+    assert json.loads(stats.read_text("utf-8"))["wikidata"] == {"lookups": 2, "hits": 1}
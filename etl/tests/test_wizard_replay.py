@@ -0,0 +1,70 @@
+import argparse
+import json
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from etl import cli, wizard_bench
+
+
+def test_replay_runs_every_stage_offline(tmp_path: Path, monkeypatch):
+    def _no_prompt(*_):
+        raise AssertionError("wizard prompted in non-interactive mode")
+
+    monkeypatch.setattr("builtins.input", _no_prompt)
+    etl_dir = cli.ETL_DIR
+    report = wizard_bench.run_replay(tmp_path, 400, 800, seed=2)
+    assert cli.ETL_DIR == etl_dir
+    assert report["exit"] == 0
+    assert set(report["stages"]) == {"download_fr", "download_all", "filter_mul", "transform_fr",
+                                     "transform_mul", "merge", "store", "export"}
+    assert report["stages"]["filter_mul"]["lines_in"] == 800
+    assert (tmp_path / "assets" / cli.SEED_MANIFEST_NAME).exists()
+    run_json = next((tmp_path / "etl" / "runs").glob("*/run.json"))
+    assert json.loads(run_json.read_text("utf-8"))["assets_dir"] == str(tmp_path / "assets")
+
+
+def test_baseline_gate_fails_on_regression(tmp_path: Path, monkeypatch, capsys):
+    work = tmp_path / "work"
+    baseline = tmp_path / "base.json"
+    argv = ["wizard_bench.py", "--fr-lines", "300", "--all-lines", "300", "--fr-only", "--work-dir", str(work)]
+    monkeypatch.setattr(sys, "argv", argv + ["--json", str(baseline)])
+    assert wizard_bench.main() == 0
+    base = json.loads(baseline.read_text("utf-8"))
+    base["stages"]["transform_fr"]["wall_s"] = 0.0001
+    baseline.write_text(json.dumps(base), encoding="utf-8")
+    monkeypatch.setattr(cli, "REGRESSION_FLOORS", {"wall_s": 0.0})
+    monkeypatch.setattr(sys, "argv", argv + ["--baseline", str(baseline)])
+    assert wizard_bench.main() == 1
+    assert "[REGRESSION] transform_fr.wall_s" in capsys.readouterr().out
+
+
+def test_side_files_are_stage_inputs_and_outputs(tmp_path: Path, monkeypatch, capsys):
+    monkeypatch.setattr(cli, "ETL_DIR", tmp_path / "etl")
+    monkeypatch.setattr("builtins.input", lambda *_: "")
+    wizard_bench.make_dumps(tmp_path / "dumps", 300, 600, 3)
+    run_dir = tmp_path / "etl" / "runs" / "r1"
+
+    def _skipped() -> set:
+        with wizard_bench.serve(tmp_path / "dumps") as base:
+            args = argparse.Namespace(fr_only=False, run="r1", jobs=1, yes=True, profile=False, trace=False,
+                                      fr_url=f"{base}/{wizard_bench.FR_NAME}",
+                                      all_url=f"{base}/{wizard_bench.ALL_NAME}",
+                                      assets_dir=str(tmp_path / "assets"))
+            capsys.readouterr()
+            assert cli.wizard(args) == 0
+        out = capsys.readouterr().out
+        return {line[2:].split(":")[0] for line in out.splitlines() if line.endswith("up to date, skipped")}
+
+    _skipped()
+    assert {"transform_fr", "transform_mul", "merge", "store"} <= _skipped()
+    counts = run_dir / "csv_fr" / cli.PRODUCTIVITY_COUNTS_NAME
+    body = counts.read_text("utf-8")
+    counts.unlink()
+    skipped = _skipped()  # a missing output reruns its stage; the same counts come back, so the merge is kept
+    assert "transform_fr" not in skipped and {"transform_mul", "merge"} <= skipped
+    assert counts.read_text("utf-8") == body
+    counts.write_text(json.dumps({"format": 1, "files": {}}), encoding="utf-8")
+    skipped = _skipped()  # changed counts: the merge re-scales
+    assert "transform_fr" in skipped and "merge" not in skipped
@@ -0,0 +1,160 @@
+"""
+Span tracing for the ETL scripts (`--trace`), written as Chrome trace-event JSON.
+
+Open the file in https://ui.perfetto.dev or chrome://tracing. Each thread gets its own track
+(wizard stages, AI workers, the main thread waiting on them, transform subprocesses), so
+overlapping stages, idle workers and queue stalls show up as spans and the gaps between them.
+
+Tracing is off until `start()` is called. While it is off, `span()` returns a no-op context
+manager and `counter()` / `instant()` return immediately, so instrumented code costs one global
+lookup per call.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+
+def _now_us() -> int:
+    # Wall clock rather than perf_counter: traces from child processes are merged on the same time axis.
+    return time.time_ns() // 1000
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> Dict[str, object]:
+        return {}
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Tracer:
+    """Collects trace events in memory; `write()` dumps them as {"traceEvents": [...]}."""
+
+    def __init__(self, path: Path, process_name: str) -> None:
+        self.path = Path(path)
+        self.pid = os.getpid()
+        self.events: List[Dict[str, object]] = [
+            {"ph": "M", "name": "process_name", "pid": self.pid, "tid": 0, "args": {"name": process_name}},
+        ]
+        self._named: set = set()
+        self._lock = threading.Lock()
+
+    def _emit(self, ev: Dict[str, object]) -> None:
+        tid = threading.get_native_id()
+        ev["pid"] = self.pid
+        ev["tid"] = tid
+        with self._lock:
+            if tid not in self._named:
+                self._named.add(tid)
+                self.events.append({"ph": "M", "name": "thread_name", "pid": self.pid, "tid": tid,
+                                    "args": {"name": threading.current_thread().name}})
+            self.events.append(ev)
+
+    @contextmanager
+    def span(self, name: str, cat: str, args: Dict[str, object]) -> Iterator[Dict[str, object]]:
+        """Complete event around the block; keys added to the yielded dict end up in its args."""
+        t0 = _now_us()
+        try:
+            yield args
+        finally:
+            self._emit({"ph": "X", "name": name, "cat": cat, "ts": t0, "dur": _now_us() - t0, "args": args})
+
+    def counter(self, name: str, values: Dict[str, float]) -> None:
+        self._emit({"ph": "C", "name": name, "ts": _now_us(), "args": values})
+
+    def instant(self, name: str, cat: str, args: Dict[str, object]) -> None:
+        self._emit({"ph": "i", "s": "t", "name": name, "cat": cat, "ts": _now_us(), "args": args})
+
+    def merge(self, path: Path) -> int:
+        """Append the events of another trace file (e.g. a child process); returns how many were added."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                events = json.load(f).get("traceEvents") or []
+        except (FileNotFoundError, ValueError):
+            return 0
+        with self._lock:
+            self.events.extend(events)
+        return len(events)
+
+    def write(self) -> Path:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with self._lock:
+            events = list(self.events)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+            f.write("\n")
+        os.replace(tmp, self.path)
+        return self.path
+
+
+_active: Optional[Tracer] = None
+
+
+def start(path: Path, process_name: str) -> Tracer:
+    """Turn tracing on for this process; events go to `path` when `stop()` is called."""
+    global _active
+    _active = Tracer(path, process_name)
+    return _active
+
+
+def stop() -> Optional[Path]:
+    """Write the trace (if tracing was on) and turn tracing off; returns the file written."""
+    global _active
+    tracer, _active = _active, None
+    return tracer.write() if tracer is not None else None
+
+
+def enabled() -> bool:
+    return _active is not None
+
+
+def span(name: str, cat: str = "etl", **args: object):
+    tracer = _active
+    if tracer is None:
+        return _NO_SPAN
+    return tracer.span(name, cat, args)
+
+
+def counter(name: str, **values: float) -> None:
+    tracer = _active
+    if tracer is not None:
+        tracer.counter(name, values)
+
+
+def instant(name: str, cat: str = "etl", **args: object) -> None:
+    tracer = _active
+    if tracer is not None:
+        tracer.instant(name, cat, args)
+
+
+def child_path(label: str) -> Optional[Path]:
+    """Trace file for a child process, next to this process's trace (None when tracing is off)."""
+    tracer = _active
+    if tracer is None:
+        return None
+    return tracer.path.with_name(f"{tracer.path.stem}.{label}{tracer.path.suffix}")
+
+
+def merge(path: Optional[Path], remove: bool = True) -> None:
+    """Fold a child's trace file into the active trace, then delete it."""
+    tracer = _active
+    if tracer is None or path is None:
+        return
+    tracer.merge(path)
+    if remove:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
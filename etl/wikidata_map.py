@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Disk-backed `<lemma>#<lang>` → Wikidata QID map for `wiktextract_to_neologotron.py --wikidata-map`.
+
+Lemma→QID maps run to millions of keys, too many to hold as a dict. The source (a JSON object
+or a TSV, optionally .gz) is streamed once into a SQLite key-value table, stored next to it as
+`<source>.sqlite`, and lookups during extraction are single primary-key probes on a memory-mapped
+file. The store records the source's size and mtime and is rebuilt when the source changes.
+
+Accepted sources:
+  - JSON: {"bio-#fr": "Q123", ...}, parsed incrementally (never loaded whole)
+  - TSV:  `<lemma>#<lang>\\tQID` or `<lemma>\\t<lang>\\tQID`; `#` comments and header lines are skipped
+  - an existing store (.sqlite / .db), used as is
+
+Usage:
+  python3 etl/wikidata_map.py lemma_qids.tsv.gz            # build lemma_qids.tsv.gz.sqlite
+  python3 etl/wikidata_map.py lemma_qids.json --out qids.sqlite
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, Optional, TextIO, Tuple
+
+STORE_SUFFIXES = (".sqlite", ".db")
+_QID = re.compile(r"^Q[1-9][0-9]*$")
+_WS = re.compile(r"\s*")
+_CHUNK = 1 << 20
+_BATCH = 50_000
+
+
+def map_key(lemma: str, lang: str) -> str:
+    return f"{lemma}#{lang}"
+
+
+def _open_text(path: Path) -> TextIO:
+    if path.name.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def _is_json(path: Path) -> bool:
+    name = path.name[:-3] if path.name.endswith(".gz") else path.name
+    if name.endswith(".json"):
+        return True
+    if name.endswith((".tsv", ".txt")):
+        return False
+    with _open_text(path) as f:
+        return f.read(64).lstrip().startswith("{")
+
+
+def iter_json_pairs(f: TextIO) -> Iterator[Tuple[str, str]]:
+    """(key, value) pairs of a flat JSON object, decoded chunk by chunk."""
+    dec = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buf, pos, eof
+        if eof:
+            return False
+        chunk = f.read(_CHUNK)
+        buf = buf[pos:] + chunk
+        pos = 0
+        eof = not chunk
+        return bool(chunk)
+
+    def skip_ws() -> None:
+        nonlocal pos
+        while True:
+            pos = _WS.match(buf, pos).end()
+            if pos < len(buf) or not fill():
+                return
+
+    def token() -> object:
+        nonlocal pos
+        while True:
+            try:
+                value, end = dec.raw_decode(buf, pos)
+            except ValueError:
+                if fill():  # the value may continue in the next chunk
+                    continue
+                raise ValueError(f"malformed JSON near: {buf[pos:pos + 40]!r}")
+            if end == len(buf) and not eof and fill():  # a number may continue in the next chunk
+                continue
+            pos = end
+            return value
+
+    def expect(chars: str) -> str:
+        nonlocal pos
+        skip_ws()
+        if pos >= len(buf) or buf[pos] not in chars:
+            raise ValueError(f"expected one of {chars!r} near: {buf[pos:pos + 40]!r}")
+        pos += 1
+        return buf[pos - 1]
+
+    fill()
+    expect("{")
+    skip_ws()
+    if pos < len(buf) and buf[pos] == "}":
+        return
+    while True:
+        skip_ws()
+        key = token()
+        expect(":")
+        skip_ws()
+        value = token()
+        if isinstance(key, str) and isinstance(value, str):
+            yield key, value
+        if expect(",}") == "}":
+            return
+
+
+def iter_tsv_pairs(f: TextIO, skipped: Optional[Dict[str, int]] = None) -> Iterator[Tuple[str, str]]:
+    for line in f:
+        line = line.rstrip("\r\n")
+        if not line or line.startswith("#"):
+            continue
+        cols = line.split("\t")
+        qid = cols[-1].strip()
+        if len(cols) == 2:
+            key = cols[0]
+        elif len(cols) == 3:
+            key = map_key(cols[0], cols[1].strip())
+        else:
+            key = ""
+        if not key or not _QID.match(qid):  # header rows and junk
+            if skipped is not None:
+                skipped["lines"] = skipped.get("lines", 0) + 1
+            continue
+        yield key, qid
+
+
+def _source_stamp(source: Path) -> str:
+    st = source.stat()
+    return json.dumps({"path": str(source.resolve()), "size": st.st_size, "mtime_ns": st.st_mtime_ns})
+
+
+def build_store(source: Path, out: Path) -> Dict[str, object]:
+    """Stream `source` into a fresh SQLite store at `out` (written aside, then renamed into place)."""
+    t0 = time.perf_counter()
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(out.name + ".tmp")
+    if tmp.exists():
+        tmp.unlink()
+    conn = sqlite3.connect(str(tmp))
+    skipped: Dict[str, int] = {}
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("CREATE TABLE qid (key TEXT PRIMARY KEY, qid TEXT NOT NULL) WITHOUT ROWID")
+        conn.execute("CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        with _open_text(source) as f:
+            pairs = iter_json_pairs(f) if _is_json(source) else iter_tsv_pairs(f, skipped)
+            batch = []
+            for pair in pairs:
+                batch.append(pair)
+                if len(batch) >= _BATCH:
+                    conn.executemany("INSERT OR REPLACE INTO qid VALUES (?, ?)", batch)
+                    batch.clear()
+            conn.executemany("INSERT OR REPLACE INTO qid VALUES (?, ?)", batch)
+        keys = conn.execute("SELECT COUNT(*) FROM qid").fetchone()[0]
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [("source", _source_stamp(source)), ("keys", str(keys))])
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp, out)
+    return {"keys": keys, "skipped": skipped.get("lines", 0), "seconds": round(time.perf_counter() - t0, 3)}
+
+
+class QidStore:
+    """Read-only lookups in a store built by `build_store`; `get(lemma, lang)` returns the QID or None.
+
+    Raises ValueError when `path` is not such a store.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        try:
+            self._conn = sqlite3.connect(self.path.resolve().as_uri() + "?mode=ro", uri=True, check_same_thread=False)
+            self._conn.execute("PRAGMA mmap_size=268435456")
+            self._conn.execute("SELECT qid FROM qid LIMIT 1").fetchall()
+        except sqlite3.Error as ex:
+            raise ValueError(f"not a Wikidata store ({ex})") from None
+        self.lookups = 0
+        self.hits = 0
+
+    def __len__(self) -> int:
+        row = self._conn.execute("SELECT value FROM meta WHERE name = 'keys'").fetchone()
+        return int(row[0]) if row else self._conn.execute("SELECT COUNT(*) FROM qid").fetchone()[0]
+
+    def get(self, lemma: str, lang: Optional[str]) -> Optional[str]:
+        self.lookups += 1
+        row = self._conn.execute("SELECT qid FROM qid WHERE key = ?", (map_key(lemma, lang or ""),)).fetchone()
+        if row is None:
+            return None
+        self.hits += 1
+        return row[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "QidStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _store_source(store: Path) -> Optional[str]:
+    try:
+        conn = sqlite3.connect(store.resolve().as_uri() + "?mode=ro", uri=True)
+    except sqlite3.Error:
+        return None
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE name = 'source'").fetchone()
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+def open_store(path: str | Path, store: Optional[str | Path] = None, log: Optional[TextIO] = None) -> QidStore:
+    """Open the store for `path`, building or rebuilding it first when missing or older than its source."""
+    source = Path(path)
+    if source.name.endswith(STORE_SUFFIXES):
+        return QidStore(source)
+    out = Path(store) if store else source.with_name(source.name + ".sqlite")
+    if not out.exists() or _store_source(out) != _source_stamp(source):
+        info = build_store(source, out)
+        if log is not None:
+            print(f"Built Wikidata store {out}: {info['keys']:,} keys in {info['seconds']:.1f}s"
+                  + (f" ({info['skipped']:,} lines skipped)" if info["skipped"] else ""), file=log)
+    return QidStore(out)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Build the SQLite store behind --wikidata-map from a JSON or TSV map")
+    ap.add_argument("source", help="JSON object or TSV (optionally .gz) mapping '<lemma>#<lang>' to QIDs")
+    ap.add_argument("--out", help="store file (default: <source>.sqlite)")
+    args = ap.parse_args()
+    source = Path(args.source)
+    if not source.exists():
+        print(f"[ERROR] {source} not found", file=sys.stderr)
+        return 2
+    out = Path(args.out) if args.out else source.with_name(source.name + ".sqlite")
+    try:
+        info = build_store(source, out)
+    except ValueError as ex:
+        print(f"[ERROR] {source}: {ex}", file=sys.stderr)
+        return 2
+    print(f"Wrote {out}: {info['keys']:,} keys in {info['seconds']:.1f}s"
+          + (f", {info['skipped']:,} lines skipped" if info["skipped"] else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
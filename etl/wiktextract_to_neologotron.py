@@ -9,8 +9,9 @@ ETL: wiktextract (frwiktionary) JSONL → Neologotron seed CSVs
     * neologotron_racines.csv
     * neologotron_suffixes.csv
 
-Designed to run offline. If you want to attach Wikidata QIDs, provide a local mapping file
-via --wikidata-map.
+Designed to run offline. If you want to attach Wikidata QIDs (wikidata_qid column), provide a
+local `<lemma>#<lang>` → QID mapping file via --wikidata-map; it is converted once into a
+disk-backed store (see wikidata_map.py).
 
 Wiktionary licensing: CC BY-SA. Ensure attribution wherever content is shown.
 """
@@ -20,12 +21,29 @@ from __future__ import annotations
 import argparse
 import csv
 import json
+import math
 import os
 import re
 import sys
+import time
+from collections import Counter, deque
 from dataclasses import dataclass, asdict
 from typing import Dict, Iterable, List, Optional, Set, Tuple
 
+try:
+    import resource
+except ImportError:  # not available on Windows; peak RSS is then omitted
+    resource = None
+
+try:
+    from etl import tracing
+    from etl.profiling import StageProfiler
+    from etl.wikidata_map import QidStore, open_store
+except ImportError:  # run as a script from etl/
+    import tracing
+    from profiling import StageProfiler
+    from wikidata_map import QidStore, open_store
+
 
 # ---------------------------
 # Output schemas / CSV headers
@@ -36,6 +54,7 @@ PREFIX_HEADERS = [
     "id", "form", "alt_forms", "gloss", "origin", "connector", "phon_rules", "tags", "weight",
     # Extended, optional columns (safe to ignore in app)
     "ety_lang", "ety_desc", "ety_lineage", "proto_form", "ipa", "attest_from", "cognates", "sources", "examples",
+    "wikidata_qid",
 ]
 
 SUFFIX_HEADERS = [
@@ -43,13 +62,14 @@ SUFFIX_HEADERS = [
     "id", "form", "alt_forms", "gloss", "origin", "pos_out", "def_template", "tags", "weight",
     # Extended
     "ety_lang", "ety_desc", "ety_lineage", "proto_form", "ipa", "attest_from", "cognates", "sources", "examples",
+    "wikidata_qid",
 ]
 
 ROOT_HEADERS = [
     # App seed columns (current)
     "id", "form", "alt_forms", "gloss", "origin", "domain", "connector_pref", "examples", "weight",
     # Extended
-    "root_lang", "proto_root", "ety_desc", "ety_lineage", "semantic_field", "sources",
+    "root_lang", "proto_root", "ety_desc", "ety_lineage", "semantic_field", "sources", "wikidata_qid",
 ]
 
 
@@ -307,6 +327,7 @@ class PrefixRow:
     cognates: Optional[str] = None
     sources: Optional[str] = None
     examples: Optional[str] = None
+    wikidata_qid: Optional[str] = None
 
 
 @dataclass
@@ -329,6 +350,7 @@ class SuffixRow:
     cognates: Optional[str] = None
     sources: Optional[str] = None
     examples: Optional[str] = None
+    wikidata_qid: Optional[str] = None
 
 
 @dataclass
@@ -348,19 +370,13 @@ class RootRow:
     ety_lineage: Optional[str] = None
     semantic_field: Optional[str] = None
     sources: Optional[str] = None
+    wikidata_qid: Optional[str] = None
 
 
 # ---------------------------
 # Core ETL
 # ---------------------------
 
-def load_wikidata_map(path: Optional[str]) -> Dict[str, str]:
-    if not path:
-        return {}
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-
 def extract_rows(
     entries: Iterable[dict],
     lang_filter: Set[str],
@@ -369,7 +385,13 @@ def extract_rows(
     cap_root: Optional[int] = None,
     cap_suffix: Optional[int] = None,
     roots_from_translingual: bool = False,
+    drops: Optional[Counter] = None,
+    qids: Optional[QidStore] = None,
 ) -> Tuple[List[PrefixRow], List[RootRow], List[SuffixRow]]:
+    """Build rows from entries; when `drops` is given, skipped entries are counted there by reason.
+
+    With `qids`, each row's wikidata_qid is looked up by `<word>#<lang>` of its entry.
+    """
     prefixes: List[PrefixRow] = []
     roots: List[RootRow] = []
     suffixes: List[SuffixRow] = []
@@ -384,11 +406,17 @@ def extract_rows(
         # Prefer lang_code if present
         lang = norm_lang(e.get("lang_code") or e.get("lang"))
         if lang not in lang_filter and not (include_translingual and lang == "mul"):
+            if drops is not None:
+                drops["lang"] += 1
             continue
         if not is_affix(e):
+            if drops is not None:
+                drops["not_affix"] += 1
             continue
         word = (e.get("word") or e.get("title") or "").strip()
         if not word:
+            if drops is not None:
+                drops["no_word"] += 1
             continue
         alt_forms = []
         for fm in e.get("forms", []) or []:
@@ -403,6 +431,7 @@ def extract_rows(
         ety_lineage = ety_lineage_from_templates(e)
         origin = origin_fr_label(lang)
         src = f"wiktionary:fr:{e.get('pageid', '') or ''}:{e.get('word', '')}#{e.get('pos', '')}"
+        qid = qids.get(word, lang) if qids is not None else None
 
         if is_prefix(e):
             row = PrefixRow(
@@ -424,6 +453,7 @@ def extract_rows(
                 cognates=None,
                 sources=src,
                 examples=join_unique(exs, "; ") or None,
+                wikidata_qid=qid,
             )
             prefixes.append(row)
             # Optionally also treat translingual classical prefixes as roots
@@ -452,6 +482,7 @@ def extract_rows(
                     ety_lineage=ety_lineage,
                     semantic_field=",".join(tags) or None,
                     sources=src,
+                    wikidata_qid=qid,
                 )
                 roots.append(rrow)
         elif is_suffix(e):
@@ -474,6 +505,7 @@ def extract_rows(
                 cognates=None,
                 sources=src,
                 examples=join_unique(exs, "; ") or None,
+                wikidata_qid=qid,
             )
             suffixes.append(row)
             # Optionally also treat translingual classical suffixes as roots
@@ -501,6 +533,7 @@ def extract_rows(
                     ety_lineage=ety_lineage,
                     semantic_field=",".join(tags) or None,
                     sources=src,
+                    wikidata_qid=qid,
                 )
                 roots.append(rrow)
         elif is_combining_root(e):
@@ -520,8 +553,11 @@ def extract_rows(
                 ety_lineage=ety_lineage,
                 semantic_field=",".join(tags) or None,
                 sources=src,
+                wikidata_qid=qid,
             )
             roots.append(row)
+        elif drops is not None:
+            drops["unclassified_affix"] += 1
 
         # Early stop when caps reached (for quicker sampling on large dumps)
         done_prefix = cap_prefix is not None and len(prefixes) >= cap_prefix
@@ -539,8 +575,11 @@ def extract_rows(
     return prefixes, roots, suffixes
 
 
-def read_jsonl(path: str, limit_lines: Optional[int] = None, skip_lines: Optional[int] = None) -> Iterable[dict]:
-    """Stream JSONL with optional skip and cap. Supports .gz files."""
+def read_jsonl(path: str, limit_lines: Optional[int] = None, skip_lines: Optional[int] = None,
+               stats: Optional[Counter] = None) -> Iterable[dict]:
+    """Stream JSONL with optional skip and cap. Supports .gz files.
+    When `stats` is given, counts `lines` read and `malformed` lines.
+    """
     import gzip
     opener = gzip.open if path.endswith(".gz") else open
     with opener(path, "rt", encoding="utf-8") as f:
@@ -549,12 +588,18 @@ def read_jsonl(path: str, limit_lines: Optional[int] = None, skip_lines: Optiona
                 continue
             if limit_lines is not None and i > limit_lines:
                 break
+            if stats is not None:
+                stats["lines"] += 1
+            if not i % 100_000:
+                tracing.counter(f"read {os.path.basename(path)}", lines=i)
             line = line.strip()
             if not line:
                 continue
             try:
                 yield json.loads(line)
             except Exception as ex:
+                if stats is not None:
+                    stats["malformed"] += 1
                 print(f"[WARN] Skipping malformed JSON at line {i}: {ex}", file=sys.stderr)
 
 
@@ -568,13 +613,184 @@ def write_csv(path: str, headers: List[str], rows: List[dataclass]) -> None:
             w.writerow({h: rec.get(h) for h in headers})
 
 
+# ---------------------------
+# Productivity weights
+# ---------------------------
+
+class AhoCorasick:
+    """Multi-pattern substring matcher: one left-to-right scan per text finds every pattern.
+
+    Patterns are added with an attached value; after build(), iter_matches(text) yields
+    (start, end, value) for each occurrence (end exclusive), including overlapping ones.
+    """
+
+    def __init__(self) -> None:
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, object]]] = [[]]
+
+    def add(self, pattern: str, value: object) -> None:
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((len(pattern), value))
+
+    def build(self) -> "AhoCorasick":
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                cand = self._goto[f].get(ch, 0)
+                self._fail[nxt] = cand if cand != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        return self
+
+    def iter_matches(self, text: str) -> Iterable[Tuple[int, int, object]]:
+        node = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length, value in out[node]:
+                yield i + 1 - length, i + 1, value
+
+
+# Etymology templates that name the morphemes a word is built from ({{affix|fr|bio-|-logie}}, ...)
+DERIVATION_TEMPLATES = {"affix", "af", "prefix", "pfx", "suffix", "suf", "confix", "compound", "com", "surf"}
+
+
+def _affix_base(form: str) -> str:
+    return form.strip().lower().strip("-")
+
+
+def count_productivity(
+    lemmas: Iterable[dict],
+    rows: List[object],
+    lang_filter: Set[str],
+) -> List[int]:
+    """Count, per row, how many distinct lemmas contain or are derived from its form.
+
+    Single streaming pass: every lemma is matched once against an Aho-Corasick automaton
+    of all affix bases. Prefixes only count at the start of a lemma, suffixes at the end,
+    roots and interfixes anywhere; a lemma equal to the base does not count. Lemmas whose
+    etymology templates cite the exact form (e.g. {{affix|fr|bio-|-logie}}) count too.
+    Counts live in one int per row, so memory is bounded by the affix set, not the dump.
+    """
+    matcher = AhoCorasick()
+    by_form: Dict[str, List[int]] = {}
+    for idx, row in enumerate(rows):
+        form = (getattr(row, "form", "") or "").strip().lower()
+        base = _affix_base(form)
+        if not base:
+            continue
+        if isinstance(row, RootRow) or (form.startswith("-") and form.endswith("-")):
+            mode = "any"
+        elif form.endswith("-"):
+            mode = "start"
+        elif form.startswith("-"):
+            mode = "end"
+        else:
+            mode = "any"
+        matcher.add(base, (idx, mode))
+        by_form.setdefault(form, []).append(idx)
+    matcher.build()
+    counts = [0] * len(rows)
+    for e in lemmas:
+        lang = norm_lang(e.get("lang_code") or e.get("lang"))
+        if lang not in lang_filter or is_affix(e):
+            continue
+        word = (e.get("word") or e.get("title") or "").strip().lower()
+        if not word:
+            continue
+        hit: Set[int] = set()
+        n = len(word)
+        for start, end, (idx, mode) in matcher.iter_matches(word):
+            if end - start >= n:
+                continue
+            if mode == "start" and start != 0:
+                continue
+            if mode == "end" and end != n:
+                continue
+            hit.add(idx)
+        for tpl in e.get("etymology_templates", []) or []:
+            if tpl.get("name") not in DERIVATION_TEMPLATES:
+                continue
+            for v in (tpl.get("args") or {}).values():
+                if isinstance(v, str):
+                    hit.update(by_form.get(v.strip().lower(), ()))
+        for idx in hit:
+            counts[idx] += 1
+    return counts
+
+
+# Raw counts written next to the CSVs, so outputs of several transforms can be put on one scale
+PRODUCTIVITY_COUNTS_NAME = "productivity_counts.json"
+
+
+def productivity_weight(count: int, top: int, lo: float = 0.5, hi: float = 3.0) -> float:
+    """Weight in [lo, hi] for `count` on a log scale whose top is `top` (which must be > 0)."""
+    return round(lo + (hi - lo) * math.log1p(count) / math.log1p(top), 3)
+
+
+def apply_productivity_weights(rows: List[object], counts: List[int],
+                               lo: float = 0.5, hi: float = 3.0) -> None:
+    """Map counts to weights in [lo, hi] on a log scale (unproductive → lo, most productive → hi).
+    Leaves weights untouched when nothing matched at all.
+    """
+    top = max(counts, default=0)
+    if top <= 0:
+        return
+    for row, c in zip(rows, counts):
+        row.weight = productivity_weight(c, top, lo, hi)
+
+
+def write_productivity_counts(path: str, files: Dict[str, Tuple[List[object], List[int]]]) -> None:
+    """Write {"files": {csv name: {row id: count}}} for `files` mapping csv name → (rows, counts)."""
+    out = {name: {getattr(r, "id", ""): c for r, c in zip(rows, counts)} for name, (rows, counts) in files.items()}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"format": 1, "files": out}, f, ensure_ascii=False)
+        f.write("\n")
+
+
+def load_productivity_counts(out_dir: str) -> Optional[Dict[str, Dict[str, int]]]:
+    """Counts written by --productivity-weights in `out_dir`, or None when there are none."""
+    try:
+        with open(os.path.join(out_dir, PRODUCTIVITY_COUNTS_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)["files"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def peak_rss_kb() -> Optional[int]:
+    """Peak resident set size of this process in KiB (None where the resource module is missing)."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
 def main() -> int:
     ap = argparse.ArgumentParser(description="wiktextract JSONL → Neologotron CSVs")
     ap.add_argument("--input", required=True, help="wiktextract JSONL file (frwiktionary)")
     ap.add_argument("--out-dir", required=True, help="output directory for CSVs")
     ap.add_argument("--lang", default="fr", help="target language code (default: fr)")
     ap.add_argument("--include-translingual", action="store_true", help="also include Translingual entries")
-    ap.add_argument("--wikidata-map", help="optional local JSON mapping { '<lemma>#<lang>': 'QID' }")
+    ap.add_argument("--wikidata-map",
+                    help="optional local mapping '<lemma>#<lang>' → QID: JSON object, TSV (optionally .gz) or a built .sqlite store;"
+                         " fills the wikidata_qid column")
+    ap.add_argument("--wikidata-store", help="where to build the store for --wikidata-map (default: <map>.sqlite)")
     ap.add_argument("--limit-lines", type=int, help="read at most this many JSONL lines")
     ap.add_argument("--skip-lines", type=int, help="skip this many lines first (coarse paging)")
     ap.add_argument("--match", help="regex to filter entry forms (word/title)")
@@ -590,17 +806,41 @@ def main() -> int:
         help="filter outputs by likely classical (Greek/Latin) origin (default: classical). Use 'none' to keep all."
     )
     ap.add_argument("--roots-from-translingual", action="store_true", help="treat Translingual classical prefixes/suffixes as roots as well")
+    ap.add_argument(
+        "--productivity-weights",
+        action="store_true",
+        help="derive the weight column from how many lemmas contain or derive from each form (one extra streaming pass)",
+    )
+    ap.add_argument("--lemmas", help="JSONL(.gz) of lemmas for --productivity-weights (default: --input)")
     ap.add_argument(
         "--mul-fallback-classical",
         action="store_true",
         help="when filtering for classical, accept Translingual affix-looking forms even if etymology markers are missing"
     )
+    ap.add_argument("--stats-out", help="write run metrics (time, lines, rows, drops per reason, peak RSS) as JSON here")
+    ap.add_argument("--profile", metavar="DIR",
+                    help="write per-stage cProfile/tracemalloc reports (extract_rows, productivity, write_csv) to DIR")
+    ap.add_argument("--trace", metavar="FILE", help="write a Chrome/Perfetto trace-event timeline of the stages to FILE")
     args = ap.parse_args()
+    profiler = StageProfiler(args.profile)
+    if args.trace:
+        tracing.start(args.trace, f"transform {os.path.basename(args.input)}")
+    try:
+        return _run(args, profiler)
+    finally:
+        tracing.stop()
+
+
+def _run(args, profiler: StageProfiler) -> int:
 
+    started = time.perf_counter()
     os.makedirs(args.out_dir, exist_ok=True)
     lang_filter = {args.lang}
+    read_stats: Counter = Counter()
+    drops: Counter = Counter()
 
-    entries_iter = read_jsonl(args.input, limit_lines=args.limit_lines, skip_lines=args.skip_lines)
+    entries_iter = read_jsonl(args.input, limit_lines=args.limit_lines, skip_lines=args.skip_lines,
+                              stats=read_stats)
 
     # Optional early filter by regex on the word/title
     if args.match:
@@ -615,6 +855,8 @@ def main() -> int:
                 w = (e.get("word") or e.get("title") or "")
                 if rx.search(w or ""):
                     yield e
+                else:
+                    drops["match"] += 1
 
         entries = _filtered()
     else:
@@ -622,7 +864,6 @@ def main() -> int:
 
     # Optional debug scan to understand filtering
     if args.debug:
-        from collections import Counter
         c_total = 0
         c_rx = 0
         c_lang_ok = 0
@@ -689,26 +930,45 @@ def main() -> int:
                 print(f"    - {s['type']}: {s['word']}  lang={s['lang']}  pos={s['pos']}", file=sys.stderr)
 
         # Rebuild the entry iterator for extraction after scan
-        entries_iter = read_jsonl(args.input, limit_lines=args.limit_lines, skip_lines=args.skip_lines)
+        read_stats.clear()
+        entries_iter = read_jsonl(args.input, limit_lines=args.limit_lines, skip_lines=args.skip_lines,
+                                  stats=read_stats)
         if args.match:
             def _filtered2():
                 for e in entries_iter:
                     w = (e.get("word") or e.get("title") or "")
                     if rx.search(w or ""):
                         yield e
+                    else:
+                        drops["match"] += 1
             entries = _filtered2()
         else:
             entries = entries_iter
 
-    prefixes, roots, suffixes = extract_rows(
-        entries,
-        lang_filter,
-        args.include_translingual,
-        cap_prefix=args.limit_prefix,
-        cap_root=args.limit_root,
-        cap_suffix=args.limit_suffix,
-        roots_from_translingual=args.roots_from_translingual,
-    )
+    qids: Optional[QidStore] = None
+    if args.wikidata_map:
+        try:
+            with tracing.span("wikidata_store"):
+                qids = open_store(args.wikidata_map, args.wikidata_store, log=sys.stderr)
+        except (OSError, ValueError) as ex:
+            print(f"[ERROR] --wikidata-map {args.wikidata_map}: {ex}", file=sys.stderr)
+            return 2
+    try:
+        with tracing.span("extract_rows"), profiler.stage("extract_rows"):  # includes read_jsonl, which extract_rows consumes
+            prefixes, roots, suffixes = extract_rows(
+                entries,
+                lang_filter,
+                args.include_translingual,
+                cap_prefix=args.limit_prefix,
+                cap_root=args.limit_root,
+                cap_suffix=args.limit_suffix,
+                roots_from_translingual=args.roots_from_translingual,
+                drops=drops,
+                qids=qids,
+            )
+    finally:
+        if qids is not None:
+            qids.close()
 
     # Light post-filters: keep only affixes/roots that look Greek/Latin for initial dataset
     # Apply optional origin filter
@@ -743,6 +1003,7 @@ def main() -> int:
         suffixes = [r for r in suffixes if likely_classical_row(r)]
         roots = [r for r in roots if likely_classical_row(r)]
     post_counts = (len(prefixes), len(roots), len(suffixes))
+    drops["origin_filter"] += sum(pre_counts) - sum(post_counts)
     if args.debug:
         print(
             f"[DEBUG] Origin filter '{args.origin_filter}': prefixes {pre_counts[0]}→{post_counts[0]}, roots {pre_counts[1]}→{post_counts[1]}, suffixes {pre_counts[2]}→{post_counts[2]}",
@@ -760,14 +1021,60 @@ def main() -> int:
         suffixes = suffixes[: max(0, args.limit_suffix)]
     if args.limit_root is not None:
         roots = roots[: max(0, args.limit_root)]
-
-    write_csv(out_prefix, PREFIX_HEADERS, prefixes)
-    write_csv(out_suffix, SUFFIX_HEADERS, suffixes)
-    write_csv(out_root, ROOT_HEADERS, roots)
+    drops["row_limit"] += sum(post_counts) - (len(prefixes) + len(roots) + len(suffixes))
+
+    if args.productivity_weights:
+        all_rows: List[object] = [*prefixes, *roots, *suffixes]
+        lemma_path = args.lemmas or args.input
+        lemma_iter = read_jsonl(lemma_path) if args.lemmas else read_jsonl(
+            lemma_path, limit_lines=args.limit_lines, skip_lines=args.skip_lines)
+        with tracing.span("productivity", rows=len(all_rows)), profiler.stage("productivity"):
+            counts = count_productivity(lemma_iter, all_rows, lang_filter)
+            apply_productivity_weights(all_rows, counts)
+        n_pre, n_root = len(prefixes), len(roots)
+        write_productivity_counts(os.path.join(args.out_dir, PRODUCTIVITY_COUNTS_NAME), {
+            os.path.basename(out_prefix): (prefixes, counts[:n_pre]),
+            os.path.basename(out_root): (roots, counts[n_pre:n_pre + n_root]),
+            os.path.basename(out_suffix): (suffixes, counts[n_pre + n_root:]),
+        })
+        if args.debug:
+            top = sorted(zip(counts, (r.form for r in all_rows)), reverse=True)[:args.debug_samples]
+            print(f"[DEBUG] Productivity (lemmas from {lemma_path}): " +
+                  ", ".join(f"{f}:{c}" for c, f in top), file=sys.stderr)
+    elif os.path.exists(os.path.join(args.out_dir, PRODUCTIVITY_COUNTS_NAME)):
+        os.remove(os.path.join(args.out_dir, PRODUCTIVITY_COUNTS_NAME))  # counts of an earlier run
+
+    with tracing.span("write_csv"), profiler.stage("write_csv"):
+        write_csv(out_prefix, PREFIX_HEADERS, prefixes)
+        write_csv(out_suffix, SUFFIX_HEADERS, suffixes)
+        write_csv(out_root, ROOT_HEADERS, roots)
 
     print(f"Wrote: {out_prefix} ({len(prefixes)})")
     print(f"Wrote: {out_suffix} ({len(suffixes)})")
     print(f"Wrote: {out_root} ({len(roots)})")
+    if qids is not None:
+        print(f"Wikidata QIDs: {qids.hits} of {qids.lookups} entries matched")
+    if profiler.enabled:
+        print(f"Profile: {os.path.join(args.profile, 'summary.txt')}")
+    if args.stats_out:
+        wall = time.perf_counter() - started
+        stats = {
+            "wall_s": round(wall, 3),
+            "cpu_s": round(time.process_time(), 3),
+            "bytes_in": os.path.getsize(args.input),
+            "bytes_out": sum(os.path.getsize(p) for p in (out_prefix, out_suffix, out_root)),
+            "lines_in": read_stats["lines"],
+            "lines_per_s": round(read_stats["lines"] / wall, 1) if wall > 0 else None,
+            "malformed": read_stats["malformed"],
+            "rows_out": {"prefixes": len(prefixes), "roots": len(roots), "suffixes": len(suffixes)},
+            "dropped": {k: v for k, v in sorted(drops.items()) if v},
+            "peak_rss_kb": peak_rss_kb(),
+        }
+        if qids is not None:
+            stats["wikidata"] = {"lookups": qids.lookups, "hits": qids.hits}
+        with open(args.stats_out, "w", encoding="utf-8") as f:
+            json.dump(stats, f, indent=2)
+            f.write("\n")
     return 0
 
 
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end replay of `cli.py wizard`, with a regression gate.
+
+Synthetic FR and all-languages dumps (see synth_wiktextract.py) are served as gzip files by a
+local HTTP server, and the wizard runs non-interactively against them: download, Translingual
+filter, both transforms, merge, run store and export, with the usual stage overlap (`--jobs`).
+Runs, dumps and exported seeds all live in a scratch directory.
+
+Per-stage metrics come from the run's `run.json`. `--json` saves them; `--baseline` compares
+with saved ones (same rule and noise floors as `cli.py metrics`) and exits 1 on a regression.
+
+Usage:
+  python3 etl/wizard_bench.py --fr-lines 50000 --all-lines 200000 --json wizard_baseline.json
+  python3 etl/wizard_bench.py --fr-lines 50000 --all-lines 200000 --baseline wizard_baseline.json
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+try:
+    from etl import cli
+    from etl import synth_wiktextract as synth
+except ImportError:  # run as a script from etl/
+    import cli
+    import synth_wiktextract as synth
+
+FR_NAME = "fr-extract.jsonl.gz"
+ALL_NAME = "raw-wiktextract-data.jsonl.gz"
+# The FR extract is mostly French; the raw dump is the default mix, Translingual included.
+FR_LANGS = {"fr": 0.85, "mul": 0.03, "la": 0.04, "grc": 0.03, "en": 0.05}
+
+
+class _DumpHandler(SimpleHTTPRequestHandler):
+    rate = 0.0  # bytes per second; 0 = as fast as possible
+
+    def copyfile(self, source, outputfile) -> None:
+        if self.rate <= 0:
+            return super().copyfile(source, outputfile)
+        chunk = 64 * 1024
+        while True:
+            buf = source.read(chunk)
+            if not buf:
+                break
+            outputfile.write(buf)
+            time.sleep(len(buf) / self.rate)
+
+    def log_message(self, format, *args) -> None:  # keep the wizard's output readable
+        pass
+
+
+@contextlib.contextmanager
+def serve(directory: Path, rate: float = 0.0) -> Iterator[str]:
+    """Serve `directory` over HTTP on a free localhost port; yields the base URL."""
+    handler = type("_Handler", (_DumpHandler,), {"rate": rate})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(handler, directory=str(directory)))
+    thread = threading.Thread(target=server.serve_forever, name="http-dumps", daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def make_dumps(dump_dir: Path, fr_lines: int, all_lines: int, seed: int = 0) -> Dict[str, Dict[str, object]]:
+    """Write both synthetic dumps into `dump_dir` (reused when already there for the same sizes and seed)."""
+    dump_dir.mkdir(parents=True, exist_ok=True)
+    stamp = dump_dir / "dumps.json"
+    want = {"fr_lines": fr_lines, "all_lines": all_lines, "seed": seed}
+    if stamp.exists() and (dump_dir / FR_NAME).exists() and (dump_dir / ALL_NAME).exists():
+        info = json.loads(stamp.read_text("utf-8"))
+        if info.get("params") == want:
+            return info["dumps"]
+    dumps = {
+        FR_NAME: synth.write_corpus(dump_dir / FR_NAME, fr_lines, seed, langs=FR_LANGS),
+        ALL_NAME: synth.write_corpus(dump_dir / ALL_NAME, all_lines, seed + 1),
+    }
+    stamp.write_text(json.dumps({"params": want, "dumps": dumps}, indent=2) + "\n", encoding="utf-8")
+    return dumps
+
+
+def run_replay(work_dir: Path, fr_lines: int, all_lines: int, seed: int = 0, jobs: int = 3,
+               rate: float = 0.0, fr_only: bool = False, log_path: Optional[Path] = None) -> Dict[str, object]:
+    """Generate and serve the dumps, run the wizard once, and return its per-stage report."""
+    dumps = make_dumps(work_dir / "dumps", fr_lines, all_lines, seed)
+    saved = cli.ETL_DIR
+    cli.ETL_DIR = work_dir / "etl"  # runs/ go to the scratch dir; scripts and policy stay in place
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")  # always a fresh run: a resumed one would skip stages
+    log = open(log_path or work_dir / "wizard.log", "w", encoding="utf-8")
+    try:
+        with serve(work_dir / "dumps", rate) as base, contextlib.redirect_stdout(log):
+            args = argparse.Namespace(fr_only=fr_only, run=stamp, jobs=jobs, yes=True, profile=False, trace=False,
+                                      fr_url=f"{base}/{FR_NAME}", all_url=f"{base}/{ALL_NAME}",
+                                      assets_dir=str(work_dir / "assets"))
+            t0 = time.perf_counter()
+            rc = cli.wizard(args)
+            wall = time.perf_counter() - t0
+        meta = json.loads((cli.ETL_DIR / "runs" / stamp / "run.json").read_text("utf-8"))
+    finally:
+        cli.ETL_DIR = saved
+        log.close()
+    stages = {name: st["metrics"] for name, st in meta["stages"].items() if st.get("status") == "ran"}
+    return {
+        "exit": rc,
+        "wall_s": round(wall, 3),
+        "jobs": jobs,
+        "dumps": {name: {"lines": d["lines"], "bytes": d["bytes"]} for name, d in dumps.items()},
+        "stages": stages,
+    }
+
+
+def print_report(report: Dict[str, object]) -> None:
+    print(f"Wizard replay: {report['wall_s']:.2f}s wall, jobs={report['jobs']}")
+    for name, d in report["dumps"].items():
+        print(f"  {name}: {d['lines']:,} lines, {cli._fmt_bytes(d['bytes'])}")
+    print(f"{'stage':<14} {'wall':>8} {'cpu':>8} {'lines/s':>10} {'peak RSS':>10}")
+    for stage, m in report["stages"].items():
+        rss = m.get("peak_rss_kb")
+        print(f"{stage:<14} {m['wall_s']:>7.2f}s {m['cpu_s']:>7.2f}s {m.get('lines_per_s') or '':>10} "
+              f"{cli._fmt_bytes(rss * 1024) if rss else 'n/a':>10}")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Replay the wizard offline against synthetic dumps and gate on a baseline")
+    ap.add_argument("--fr-lines", type=int, default=20_000, help="entries in the FR extract (default 20000)")
+    ap.add_argument("--all-lines", type=int, default=50_000, help="entries in the all-languages dump (default 50000)")
+    ap.add_argument("--seed", type=int, default=0, help="corpus seed (default 0)")
+    ap.add_argument("--jobs", type=int, default=3, help="wizard --jobs (default 3)")
+    ap.add_argument("--rate-mb", type=float, default=0.0, help="throttle each download to this many MB/s (default: no limit)")
+    ap.add_argument("--fr-only", action="store_true", help="replay wizard --fr-only")
+    ap.add_argument("--work-dir", help="keep dumps and runs here (dumps are reused between replays); default: temp dir")
+    ap.add_argument("--json", help="write the report (per-stage metrics) to this file, e.g. to use as a baseline")
+    ap.add_argument("--baseline", help="earlier --json report; exit status 1 when a stage regressed")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="relative increase counted as a regression (default 0.2)")
+    args = ap.parse_args()
+
+    work_dir = Path(args.work_dir) if args.work_dir else Path(tempfile.mkdtemp(prefix="neologotron-replay-"))
+    try:
+        report = run_replay(work_dir, args.fr_lines, args.all_lines, args.seed, args.jobs,
+                            args.rate_mb * 1024 * 1024, args.fr_only)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    print_report(report)
+    if report["exit"] != 0:
+        print(f"[ERROR] wizard exited with status {report['exit']}", file=sys.stderr)
+        return 2
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    if args.baseline:
+        base = json.loads(Path(args.baseline).read_text("utf-8"))["stages"]
+        regressions = cli._metric_regressions(report["stages"], base, args.tolerance)
+        for line in regressions:
+            print(f"[REGRESSION] {line}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())